@@ -0,0 +1,230 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+
+from enums.error_code import SignatureStatus
+from exceptions.invalid_parameter import InvalidParamException
+from validation.argument_validator import ArgumentValidator
+from handler.error_handler import error_handler
+import avalon_crypto_utils.worker_signing as worker_signing
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedKey(object):
+    """
+    Encryption key entry held by EncryptionKeyCache.
+    """
+
+    def __init__(self, response, fetched_at, verified_with, read):
+        self.response = response
+        self.fetched_at = fetched_at
+        # Verifying key the signature was verified with, None if it was
+        # not verified
+        self.verified_with = verified_with
+        # Whether get() returned the entry since it was fetched
+        self.read = read
+        self.timer = None
+
+    def nonce(self):
+        """Return encryptionKeyNonce of the cached key."""
+        return self.response["result"].get("encryptionKeyNonce")
+
+
+class EncryptionKeyCache(object):
+    """
+    Per-worker cache of the responses returned by
+    JRPCWorkOrderImpl.encryption_key_get.
+
+    A key is fetched from the listener and its signature is verified once,
+    after which it is served from memory until it expires. Keys are
+    refreshed in the background shortly before expiry, as long as they
+    were read since the previous refresh. The refresh passes the nonce of
+    the cached key as lastUsedKeyNonce so that the listener hands out a
+    key newer than the one already held.
+    """
+
+    def __init__(self, work_order, key_ttl_secs=3600,
+                 refresh_ahead_secs=60, background_refresh=True):
+        """
+        Parameters:
+        work_order          Work order implementation used to fetch keys,
+                            e.g. JRPCWorkOrderImpl
+        key_ttl_secs        Lifetime of a cached key in seconds
+        refresh_ahead_secs  How long before expiry the background refresh
+                            of a key is started
+        background_refresh  If False, expired keys are only refreshed on
+                            the next get()
+        """
+        if key_ttl_secs <= 0 or refresh_ahead_secs < 0 or \
+                refresh_ahead_secs >= key_ttl_secs:
+            raise ValueError(
+                "refresh_ahead_secs must be less than key_ttl_secs")
+        self.__work_order = work_order
+        self.__key_ttl_secs = key_ttl_secs
+        self.__refresh_ahead_secs = refresh_ahead_secs
+        self.__background_refresh = background_refresh
+        self.__signer = worker_signing.WorkerSign()
+        self.__verifying_keys = {}
+        self.__entries = {}
+        self.__lock = threading.RLock()
+        self.validation = ArgumentValidator.getInstance()
+
+    @error_handler
+    def get(self, worker_id, requester_id, verifying_key=None, id=None):
+        """
+        Return the encryption key of a worker, fetching it from the
+        listener only if there is no valid cached key.
+
+        Parameters:
+        worker_id     Worker ID of the worker whose encryption key
+                      is requested
+        requester_id  ID of the requester that plans to use the key
+        verifying_key Optional worker verification key (PEM). If it is
+                      provided, the key signature is verified before the
+                      key is served, also if it was cached unverified or
+                      verified with another key. The verifying key is
+                      remembered and used for later background refreshes.
+        id            Optional JSON RPC request ID
+
+        Returns:
+        JSON RPC response of dictionary type, the same as returned by
+        encryption_key_get.
+        """
+        self.validation.not_null(id, worker_id, requester_id)
+
+        cache_key = (worker_id, requester_id)
+        with self.__lock:
+            if verifying_key is not None:
+                self.__verifying_keys[cache_key] = verifying_key
+            entry = self.__entries.get(cache_key)
+            if entry is not None and not self.__is_expired(entry) and \
+                    (verifying_key is None or
+                     entry.verified_with == verifying_key):
+                entry.read = True
+                return entry.response
+        if entry is not None and not self.__is_expired(entry):
+            if self.__verify(entry.response, verifying_key):
+                with self.__lock:
+                    entry.verified_with = verifying_key
+                    entry.read = True
+                return entry.response
+            logger.warning("Cached encryption key of worker %s does not " +
+                           "verify, fetching it again", worker_id)
+            with self.__lock:
+                if self.__entries.get(cache_key) is entry:
+                    self.__drop(cache_key)
+        last_used_key_nonce = entry.nonce() if entry is not None else None
+        return self.__fetch(cache_key, last_used_key_nonce, id, True)
+
+    def invalidate(self, worker_id, requester_id=None):
+        """
+        Drop cached keys of a worker, e.g. after the worker rejected a
+        work order encrypted with a stale key.
+
+        Parameters:
+        worker_id    Worker ID whose keys are to be dropped
+        requester_id Optional requester ID. If it is not provided, keys
+                     cached for all requesters of the worker are dropped.
+        """
+        with self.__lock:
+            for cache_key in list(self.__entries):
+                if cache_key[0] != worker_id:
+                    continue
+                if requester_id is not None and \
+                        cache_key[1] != requester_id:
+                    continue
+                self.__drop(cache_key)
+
+    def clear(self):
+        """Drop all cached keys and cancel pending background refreshes."""
+        with self.__lock:
+            for cache_key in list(self.__entries):
+                self.__drop(cache_key)
+
+    def __is_expired(self, entry):
+        return time.monotonic() - entry.fetched_at >= self.__key_ttl_secs
+
+    def __drop(self, cache_key):
+        entry = self.__entries.pop(cache_key)
+        if entry.timer is not None:
+            entry.timer.cancel()
+
+    def __verify(self, response, verifying_key):
+        """Return True if the signature of a key response verifies."""
+        result = response["result"]
+        status = self.__signer.verify_encryption_key_signature(
+            result["signature"], result["encryptionKey"], verifying_key)
+        return status == SignatureStatus.PASSED
+
+    def __fetch(self, cache_key, last_used_key_nonce, id, read):
+        """
+        Fetch a key from the listener, verify it and cache it, as read
+        if it is returned by get().
+        Raises InvalidParamException if the key signature does not verify.
+        Error responses from the listener are returned as is
+        without being cached.
+        """
+        worker_id, requester_id = cache_key
+        response = self.__work_order.encryption_key_get(
+            worker_id, requester_id,
+            last_used_key_nonce=last_used_key_nonce, id=id)
+        if response is None or "result" not in response:
+            return response
+
+        with self.__lock:
+            verifying_key = self.__verifying_keys.get(cache_key)
+        if verifying_key is not None and \
+                not self.__verify(response, verifying_key):
+            logger.error("Encryption key signature verification " +
+                         "failed for worker %s", worker_id)
+            raise InvalidParamException(
+                "Encryption key signature verification failed", id)
+
+        entry = _CachedKey(response, time.monotonic(), verifying_key, read)
+        with self.__lock:
+            old_entry = self.__entries.get(cache_key)
+            if old_entry is not None and old_entry.timer is not None:
+                old_entry.timer.cancel()
+            self.__entries[cache_key] = entry
+            if self.__background_refresh:
+                entry.timer = threading.Timer(
+                    self.__key_ttl_secs - self.__refresh_ahead_secs,
+                    self.__refresh, args=(cache_key, entry))
+                entry.timer.daemon = True
+                entry.timer.start()
+        return response
+
+    def __refresh(self, cache_key, entry):
+        """Background refresh of a key that is about to expire."""
+        with self.__lock:
+            if self.__entries.get(cache_key) is not entry:
+                # Entry was dropped or replaced in the meantime
+                return
+            if not entry.read:
+                # Not used since the last refresh; let it expire, the
+                # next get() fetches the key again
+                logger.debug("Encryption key of worker %s unused, not " +
+                             "refreshed", cache_key[0])
+                return
+        try:
+            self.__fetch(cache_key, entry.nonce(), None, False)
+        except Exception as err:
+            # Keep serving the current key until it expires;
+            # the next get() after expiry retries the fetch.
+            logger.warning("Background refresh of encryption key " +
+                           "for worker %s failed: %s", cache_key[0], err)
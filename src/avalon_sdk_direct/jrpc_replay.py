@@ -0,0 +1,446 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Replay of JSON RPC traffic recorded with handler.jrpc_recording.
+
+ReplayListener serves a recording as a local listener: every request is
+answered with the recorded response to the same method and parameters,
+after the recorded latency, so the SDK can be run and benchmarked
+against captured traffic without a listener. Requests that were not
+recorded with the same parameters, e.g. those of work orders with new
+IDs, get the recorded responses of their method in turn.
+
+Replayer sends the recorded requests to a live listener, at their
+recorded times or at a scaled rate, and reports the latency per method
+next to the recorded one, and the requests whose outcome (success, JSON
+RPC error code or HTTP status) differs from the recorded one:
+
+    avalon-jrpc-replay drive traffic.jsonl.gz --url http://host:1947/ \\
+        --speed 2
+    avalon-jrpc-replay serve traffic.jsonl.gz --port 1947
+
+Requests are replayed as recorded. Listeners may reject work orders
+submitted again with the same ID, which is reported as a mismatch.
+"""
+
+import argparse
+import collections
+import copy
+import http.server
+import json
+import logging
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from handler.http_jrpc_client import HttpJrpcClient
+from handler.jrpc_recording import read_recording
+from utility.latency_histogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+def load_recording(path):
+    """Return the records of a recording file ordered by time."""
+    return sorted(read_recording(path), key=lambda record: record["time"])
+
+
+def _params_key(method, params):
+    return method, json.dumps(params, sort_keys=True)
+
+
+def _recorded_outcome(record):
+    """Return the outcome of a recorded request, as in _outcome()."""
+    if "error" in record:
+        status = record.get("status")
+        return "HTTP_{}".format(status) if status else "EXCEPTION"
+    return _outcome(record.get("response"))
+
+
+def _outcome(response):
+    """
+    Return SUCCESS, the JSON RPC error code of a response, or
+    NOT_JSON if the response was not JSON.
+    """
+    if response is None:
+        return "NOT_JSON"
+    if isinstance(response, dict) and "error" in response:
+        return str(response["error"].get("code"))
+    return "SUCCESS"
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            request = json.loads(body.decode("utf-8"))
+        except ValueError:
+            request = None
+        status, data = self.server.listener.respond(request)
+        self.send_response(status)
+        if data is None:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Clients of Unix domain sockets have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+
+class _UnixServer(socketserver.ThreadingMixIn,
+                  socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class ReplayListener(object):
+    """
+    JSON RPC listener answering requests with recorded responses.
+    Thread safe; requests are served by a thread each.
+    """
+
+    def __init__(self, records, host="localhost", port=0,
+                 unix_socket=None, latency_scale=1.0):
+        """
+        Parameters:
+        records       Records of a recording, e.g. from load_recording()
+        host          Host name or address to listen on
+        port          Port to listen on, 0 for a free port
+        unix_socket   Optional path of a Unix domain socket to listen on
+                      instead of host and port
+        latency_scale Factor of the recorded latency responses are
+                      delayed by, 0 to respond at once
+        """
+        self.latency_scale = latency_scale
+        # Requests answered per match: exact, method or missing
+        self.match_counts = collections.Counter()
+
+        self.__address = (host, port)
+        self.__unix_socket = unix_socket
+        self.__server = None
+        self.__thread = None
+        self.__lock = threading.Lock()
+        # (method, params) -> records, the last one answering repeats
+        self.__by_params = {}
+        # method -> [records, index of the next one]
+        self.__by_method = {}
+        for record in records:
+            request = record.get("request")
+            if not isinstance(request, dict):
+                continue
+            method = request.get("method")
+            self.__by_params.setdefault(
+                _params_key(method, request.get("params")),
+                collections.deque()).append(record)
+            self.__by_method.setdefault(method, [[], 0])[0].append(record)
+
+    @property
+    def url(self):
+        """URL of the running listener, to be used as json_rpc_uri."""
+        if self.__unix_socket is not None:
+            return "unix://" + urllib.parse.quote(self.__unix_socket)
+        host, port = self.__server.server_address[:2]
+        return "http://{0}:{1}/".format(host, port)
+
+    def start(self):
+        """Start serving on a background thread and return self."""
+        if self.__unix_socket is not None:
+            self.__remove_socket()
+            self.__server = _UnixServer(self.__unix_socket, _RequestHandler)
+        else:
+            self.__server = _Server(self.__address, _RequestHandler)
+        self.__server.listener = self
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="replay-listener",
+            daemon=True)
+        self.__thread.start()
+        logger.info("Replay listener serving on %s", self.url)
+        return self
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__thread.join()
+            self.__server = None
+            if self.__unix_socket is not None:
+                self.__remove_socket()
+
+    def __remove_socket(self):
+        """Remove the Unix domain socket file, if left over."""
+        try:
+            if stat.S_ISSOCK(os.stat(self.__unix_socket).st_mode):
+                os.unlink(self.__unix_socket)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def __match(self, method, params):
+        with self.__lock:
+            records = self.__by_params.get(_params_key(method, params))
+            if records:
+                self.match_counts["exact"] += 1
+                return records.popleft() if len(records) > 1 \
+                    else records[0]
+            entry = self.__by_method.get(method)
+            if entry is None:
+                self.match_counts["missing"] += 1
+                return None
+            self.match_counts["method"] += 1
+            records, index = entry
+            entry[1] = (index + 1) % len(records)
+            return records[index]
+
+    def respond(self, request):
+        """
+        Return the HTTP status and body of the response to a request.
+
+        Parameters:
+        request JSON RPC request as dictionary
+
+        Returns:
+        Tuple of HTTP status and JSON encoded response, or None if the
+        response has no body.
+        """
+        if not isinstance(request, dict):
+            return 200, json.dumps({"jsonrpc": "2.0", "id": None, "error": {
+                "code": -32700, "message": "Parse error"}}).encode("utf-8")
+        id = request.get("id")
+        record = self.__match(request.get("method"), request.get("params"))
+        if record is None:
+            return 200, json.dumps({"jsonrpc": "2.0", "id": id, "error": {
+                "code": -32601, "message": "Method not recorded"}}).encode(
+                "utf-8")
+
+        delay = record.get("duration", 0) * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        if "error" in record:
+            return record.get("status") or 503, None
+        response = record.get("response")
+        if response is None:
+            return 200, None
+        if isinstance(response, dict) and "id" in response:
+            response = copy.copy(response)
+            response["id"] = id
+        return 200, json.dumps(response).encode("utf-8")
+
+
+class _MethodStats(object):
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.recorded_latency = LatencyHistogram()
+        self.outcomes = collections.Counter()
+        self.mismatches = 0
+
+
+class Replayer(object):
+    """
+    Sends recorded requests to a listener at their recorded times,
+    scaled by a speed factor, and compares the outcomes.
+    """
+
+    def __init__(self, records, url, speed=1.0, concurrency=64):
+        """
+        Parameters:
+        records     Records of a recording, e.g. from load_recording(),
+                    ordered by time
+        url         URL of the listener
+        speed       Factor of the recorded request rate, 0 to send the
+                    requests as fast as concurrency allows
+        concurrency Maximum number of requests in flight. Requests due
+                    beyond it wait for a free slot, and the wait counts
+                    towards their latency.
+        """
+        self.records = [record for record in records
+                        if isinstance(record.get("request"), dict)]
+        self.speed = speed
+        self.concurrency = concurrency
+        self.methods = collections.defaultdict(_MethodStats)
+        self.__client = HttpJrpcClient(url)
+        self.__lock = threading.Lock()
+
+    def replay_one(self, record, due=None):
+        """
+        Send a recorded request and count its latency, measured from
+        due if given, and outcome.
+        """
+        if due is None:
+            due = time.perf_counter()
+        request = record["request"]
+        try:
+            response = self.__client._postmsg(json.dumps(request))
+            outcome = _outcome(response)
+        except Exception as err:
+            status = getattr(err.__cause__, "code", None)
+            outcome = "HTTP_{}".format(status) \
+                if isinstance(status, int) else "EXCEPTION"
+        latency = time.perf_counter() - due
+        recorded = _recorded_outcome(record)
+        if outcome != recorded:
+            logger.debug("%s: %s instead of %s", request.get("method"),
+                         outcome, recorded)
+        with self.__lock:
+            stats = self.methods[request.get("method")]
+            stats.latency.record(latency)
+            stats.recorded_latency.record(record.get("duration", 0))
+            stats.outcomes[outcome] += 1
+            if outcome != recorded:
+                stats.mismatches += 1
+
+    def run(self):
+        """
+        Send all requests and wait for their responses.
+
+        Returns:
+        Elapsed time in seconds.
+        """
+        start = time.perf_counter()
+        first = self.records[0]["time"] if self.records else 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for record in self.records:
+                due = start
+                if self.speed > 0:
+                    due += (record["time"] - first) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.replay_one, record, due)
+        return time.perf_counter() - start
+
+    @property
+    def mismatches(self):
+        """Number of requests whose outcome differed from the recording."""
+        with self.__lock:
+            return sum(stats.mismatches for stats in self.methods.values())
+
+    def report(self, elapsed_secs):
+        """Return the replay results as dictionary."""
+        recorded_secs = self.records[-1]["time"] - self.records[0]["time"] \
+            if self.records else 0
+        with self.__lock:
+            requests = sum(stats.latency.count
+                           for stats in self.methods.values())
+            return {
+                "requests": requests,
+                "speed": self.speed,
+                "recorded_secs": round(recorded_secs, 3),
+                "elapsed_secs": round(elapsed_secs, 3),
+                "throughput_per_sec": round(requests / elapsed_secs, 2)
+                if elapsed_secs > 0 else None,
+                "mismatches": sum(stats.mismatches
+                                  for stats in self.methods.values()),
+                "methods": {
+                    method: {
+                        "outcomes": dict(stats.outcomes),
+                        "mismatches": stats.mismatches,
+                        "latency_ms": stats.latency.to_dict(),
+                        "recorded_latency_ms":
+                            stats.recorded_latency.to_dict(),
+                    } for method, stats in sorted(self.methods.items())},
+            }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+    serve = commands.add_parser(
+        "serve", help="Serve a recording as listener")
+    serve.add_argument("recording", help="Recording file")
+    serve.add_argument("--host", default="localhost")
+    serve.add_argument("--port", type=int, default=1947)
+    serve.add_argument("--unix-socket", default=None,
+                       help="Path of a Unix domain socket to listen on "
+                       "instead of --host and --port")
+    serve.add_argument("--latency-scale", type=float, default=1.0,
+                       help="Factor of the recorded latency, 0 to respond "
+                       "at once")
+    drive = commands.add_parser(
+        "drive", help="Send the recorded requests to a listener")
+    drive.add_argument("recording", help="Recording file")
+    drive.add_argument("--url", required=True, help="URL of the listener")
+    drive.add_argument("--speed", type=float, default=1.0,
+                       help="Factor of the recorded request rate, 0 for "
+                       "as fast as possible")
+    drive.add_argument("--concurrency", type=int, default=64,
+                       help="Maximum number of requests in flight")
+    drive.add_argument("--output",
+                       help="File to write the report to, default stdout")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        level=logging.INFO)
+    records = load_recording(options.recording)
+    logger.info("Loaded %d records", len(records))
+
+    if options.command == "serve":
+        listener = ReplayListener(
+            records, options.host, options.port, options.unix_socket,
+            options.latency_scale)
+        listener.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.stop()
+        return 0
+
+    replayer = Replayer(records, options.url, options.speed,
+                        options.concurrency)
+    elapsed = replayer.run()
+    output = json.dumps(replayer.report(elapsed), indent=4)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0 if replayer.mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,19 +12,35 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import logging
 import json
+import threading
 import time
 from enums.error_code import WorkOrderStatus
 from handler.http_jrpc_client import HttpJrpcClient
+import handler.metrics as metrics
+import utility.tracing as tracing
 from interfaces.work_order import WorkOrder
 from exceptions.invalid_parameter import InvalidParamException
 from validation.argument_validator import ArgumentValidator
 from validation.json_validator import JsonValidator
 from handler.error_handler import error_handler
 
-logging.basicConfig(
-    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_PENDING_POLLS = metrics.REGISTRY.histogram(
+    "avalon_work_order_pending_polls",
+    "WorkOrderGetResult responses PENDING per work order, recorded when "
+    "its result or error is received",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)).labels()
+# Work orders whose PENDING polls are counted at a time per client; the
+# counts of the least recently polled ones are dropped beyond it
+_MAX_POLLED_WORK_ORDERS = 10000
+# WorkOrderGetResult error codes that do not end the polling of a
+# work order
+_IN_PROGRESS_CODES = (WorkOrderStatus.SCHEDULED, WorkOrderStatus.PROCESSING,
+                      WorkOrderStatus.BUSY)
 
 
 class JRPCWorkOrderImpl(WorkOrder):
@@ -32,9 +48,20 @@ class JRPCWorkOrderImpl(WorkOrder):
     This class is to manage to the work orders from client side.
     """
 
-    def __init__(self, config):
-        self.__uri_client = HttpJrpcClient(config.get("json_rpc_uri"))
-        self.validation = ArgumentValidator()
+    def __init__(self, config, result_cache=None):
+        """
+        Parameters:
+        config       Dictionary with the "json_rpc_uri" of the listener
+        result_cache Optional WorkOrderResultCache consulted before
+                     querying the listener for work order results
+        """
+        self.__uri_client = HttpJrpcClient(config.get("json_rpc_uri"),
+                                           config.get("flow_control"))
+        self.validation = ArgumentValidator.getInstance()
+        self.__result_cache = result_cache
+        # work order ID -> PENDING responses so far
+        self.__pending_polls = collections.OrderedDict()
+        self.__pending_polls_lock = threading.Lock()
 
 
     @error_handler
@@ -64,7 +91,8 @@ class JRPCWorkOrderImpl(WorkOrder):
         }
         json_rpc_request["params"] = work_order_req_json
 
-        logging.info("Work order request %s", json_rpc_request)
+        logger.debug("Submitting work order %s",
+                     work_order_req_json.get("workOrderId"))
         response = self.__uri_client._postmsg(json.dumps(json_rpc_request))
         return response
 
@@ -83,6 +111,11 @@ class JRPCWorkOrderImpl(WorkOrder):
         # Argument validation
         self.validation.not_null(id, work_order_id)
 
+        if self.__result_cache is not None:
+            response = self.__result_cache.get(work_order_id, id)
+            if response is not None:
+                return response
+
         json_rpc_request = {
             "jsonrpc": "2.0",
             "method": "WorkOrderGetResult",
@@ -92,8 +125,38 @@ class JRPCWorkOrderImpl(WorkOrder):
             }
         }
         response = self.__uri_client._postmsg(json.dumps(json_rpc_request))
+        self.__count_pending_poll(work_order_id, response)
+        if self.__result_cache is not None:
+            self.__result_cache.put(work_order_id, response)
         return response
 
+    def __count_pending_poll(self, work_order_id, response):
+        """
+        Count a PENDING WorkOrderGetResult response, or record the number
+        of PENDING responses of a work order once it returned a result or
+        an error after being polled. Work orders that were not polled,
+        e.g. fetched again after they finished, are not recorded.
+        """
+        if not isinstance(response, dict):
+            return
+        error = response.get("error") or {}
+        code = error.get("code")
+        with self.__pending_polls_lock:
+            if code == WorkOrderStatus.PENDING:
+                self.__pending_polls[work_order_id] = \
+                    self.__pending_polls.pop(work_order_id, 0) + 1
+                if len(self.__pending_polls) > _MAX_POLLED_WORK_ORDERS:
+                    self.__pending_polls.popitem(last=False)
+                return
+            # Still in progress, or no answer from the worker
+            if code in _IN_PROGRESS_CODES or \
+                    isinstance(error.get("data"), Exception):
+                return
+            polls = self.__pending_polls.pop(work_order_id, None)
+        if polls is not None:
+            _PENDING_POLLS.observe(polls)
+
+    @tracing.traced("work_order_get_result")
     @error_handler
     def work_order_get_result(self, work_order_id, id=None):
         """
@@ -109,15 +172,16 @@ class JRPCWorkOrderImpl(WorkOrder):
         """
         self.validation.not_null(id, work_order_id)
 
-        response = self.work_order_get_result_nonblocking(work_order_id, id)
+        polls = 1
+        response = self.__poll(work_order_id, id, polls)
         if "error" in response:
             if response["error"]["code"] != WorkOrderStatus.PENDING:
                 return response
             else:
                 while "error" in response and \
                         response["error"]["code"] == WorkOrderStatus.PENDING:
-                    response = self.work_order_get_result_nonblocking(
-                        work_order_id, id)
+                    polls += 1
+                    response = self.__poll(work_order_id, id, polls)
                     # TODO: currently pooling after every 2 sec interval
                     # forever.
                     # We should implement feature to timeout after
@@ -127,6 +191,13 @@ class JRPCWorkOrderImpl(WorkOrder):
         else:
             return response
 
+    def __poll(self, work_order_id, id, poll):
+        """
+        Get the work order result once, traced as one poll iteration.
+        """
+        with tracing.span("work_order_poll", {"work_order.poll": poll}):
+            return self.work_order_get_result_nonblocking(work_order_id, id)
+
     @error_handler
     def encryption_key_get(self, worker_id, requester_id,
                            last_used_key_nonce=None, tag=None,
@@ -13,7 +13,6 @@
 # limitations under the License.
 
 import json
-import logging
 
 from handler.http_jrpc_client import HttpJrpcClient
 from interfaces.work_order_receipt import WorkOrderReceipt
@@ -22,9 +21,6 @@ from validation.argument_validator import ArgumentValidator
 from validation.json_validator import JsonValidator
 from handler.error_handler import error_handler
 
-logging.basicConfig(
-    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
-
 
 class JRPCWorkOrderReceiptImpl(WorkOrderReceipt):
     """
@@ -32,8 +28,9 @@ class JRPCWorkOrderReceiptImpl(WorkOrderReceipt):
     to manage work order receipts from the client side.
     """
     def __init__(self, config):
-        self.__uri_client = HttpJrpcClient(config.get("json_rpc_uri"))
-        self.validation = ArgumentValidator()
+        self.__uri_client = HttpJrpcClient(config.get("json_rpc_uri"),
+                                           config.get("flow_control"))
+        self.validation = ArgumentValidator.getInstance()
 
     @error_handler
     def work_order_receipt_create(
@@ -29,8 +29,9 @@ class JRPCWorkerRegistryImpl(WorkerRegistry):
     """
 
     def __init__(self, config):
-        self.__uri_client = HttpJrpcClient(config.get("json_rpc_uri"))
-        self.validation = ArgumentValidator()
+        self.__uri_client = HttpJrpcClient(config.get("json_rpc_uri"),
+                                           config.get("flow_control"))
+        self.validation = ArgumentValidator.getInstance()
 
     @error_handler
     def worker_retrieve(self, worker_id, id=None):
@@ -0,0 +1,528 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Load generator for capacity tests of Avalon listeners.
+
+Drives work order submit-and-wait traffic through the SDK: every work
+order is built with WorkOrderParams, its inData encrypted with a fresh
+session key, signed by the requester, submitted, polled for until its
+result is available, and the result signature verified and its outData
+decrypted.
+
+In the open-loop mode work orders are started at a fixed arrival rate,
+at constant intervals or as a Poisson process, regardless of how fast
+the listener answers; their latency is measured from the time they were
+due to start, so time spent queued behind slow work orders is counted.
+In the closed-loop mode a fixed number of requesters each submit their
+next work order once the previous one completed.
+
+The report holds HDR-style latency histograms, the offered and achieved
+throughput and the number of work orders per outcome, named after
+WorkOrderStatus where the listener returned an error status:
+
+    avalon-load-generator --url http://localhost:1947 --rate 50 \\
+        --duration 60 --payload 1024:9,65536x4:1
+"""
+
+import argparse
+import base64
+import collections
+import itertools
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from enums.error_code import SignatureStatus, WorkOrderStatus
+from enums.worker import WorkerType
+import handler.jrpc_recording as jrpc_recording
+from utility.latency_histogram import LatencyHistogram
+from avalon_sdk_direct.jrpc_work_order import JRPCWorkOrderImpl
+from avalon_sdk_direct.jrpc_worker_registry import JRPCWorkerRegistryImpl
+from avalon_sdk_direct.lookup_pages import LookupPages
+
+logger = logging.getLogger(__name__)
+
+# Outcomes that have no WorkOrderStatus
+TIMEOUT = "TIMEOUT"
+CLIENT_ERROR = "CLIENT_ERROR"
+
+
+class _Worker(object):
+    """Details of a worker needed to send work orders to it."""
+
+    def __init__(self, worker_id, encryption_key, verification_key):
+        self.worker_id = worker_id
+        self.encryption_key = encryption_key
+        self.verification_key = verification_key
+
+
+class _Outcome(Exception):
+    """Work order ended with the outcome given as message."""
+    pass
+
+
+class LoadGenerator(object):
+    """
+    Sends work orders to a listener and collects their latencies and
+    outcomes. Thread safe.
+    """
+
+    def __init__(self, url, workers=None, payloads=((1024, 1, 1),),
+                 workload_id="echo", poll_interval_secs=0.01,
+                 timeout_secs=30.0, seed=None):
+        """
+        Parameters:
+        url                JSON RPC URL of the listener
+        workers            Sequence of (worker ID, weight). Work orders
+                           are sent to each worker in proportion to its
+                           weight. By default all TEE-SGX workers found by
+                           WorkerLookUp get the same share.
+        payloads           Sequence of (inData item size in bytes, items
+                           per work order, weight) chosen from in
+                           proportion to their weight
+        workload_id        Workload ID of the work orders
+        poll_interval_secs Delay between WorkOrderGetResult calls
+        timeout_secs       Time after which a work order that is still
+                           PENDING counts as TIMEOUT
+        seed               Optional seed of the worker and payload choice
+        """
+        # Cryptodome and the ECDSA library are only loaded when a
+        # generator is created
+        from avalon_crypto_utils.worker_signing import WorkerSign
+
+        config = {"json_rpc_uri": url}
+        self.__work_order = JRPCWorkOrderImpl(config)
+        self.__registry = JRPCWorkerRegistryImpl(config)
+        self.__ids = itertools.count(1)
+        if workers is None:
+            workers = [(worker_id, 1) for worker_id in self.__lookup()]
+        if not workers:
+            raise ValueError("No workers found at {}".format(url))
+        self.__workers = [self.__retrieve(worker_id)
+                          for worker_id, _ in workers]
+        self.__worker_weights = [weight for _, weight in workers]
+        # Random printable data, so that the payload does not compress
+        self.__payloads = [
+            [base64.b64encode(os.urandom(size)).decode("ascii")[:size]
+             for _ in range(items)]
+            for size, items, _ in payloads]
+        self.__payload_weights = [weight for _, _, weight in payloads]
+        self.__workload_id = workload_id.encode("UTF-8").hex()
+        self.__poll_interval_secs = poll_interval_secs
+        self.__timeout_secs = timeout_secs
+        self.__random = random.Random(seed)
+        self.__signer = WorkerSign()
+        self.__signer.generate_signing_key()
+        self.__requester_id = secrets.token_hex(32)
+
+        self.__lock = threading.Lock()
+        self.__in_flight = 0
+        self.outcomes = collections.Counter()
+        self.latency = LatencyHistogram()
+        self.submit_latency = LatencyHistogram()
+        self.result_latency = LatencyHistogram()
+
+    def __lookup(self):
+        pages = LookupPages(
+            lambda: self.__registry.worker_lookup(
+                WorkerType.TEE_SGX, None, None, next(self.__ids)),
+            lambda lookup_tag: self.__registry.worker_lookup_next(
+                lookup_tag, WorkerType.TEE_SGX, id=next(self.__ids)),
+            "Worker lookup")
+        worker_ids = []
+        for result in pages:
+            worker_ids.extend(result.get("ids", []))
+        return worker_ids
+
+    def __retrieve(self, worker_id):
+        response = self.__registry.worker_retrieve(worker_id, next(self.__ids))
+        if "result" not in response:
+            raise ValueError("Worker {} not found: {}".format(
+                worker_id, response.get("error")))
+        worker_type_data = response["result"]["details"]["workerTypeData"]
+        return _Worker(worker_id, worker_type_data["encryptionKey"],
+                       worker_type_data["verificationKey"])
+
+    @property
+    def in_flight(self):
+        """Number of work orders started and not completed yet."""
+        return self.__in_flight
+
+    def run_one(self, due=None):
+        """
+        Run one work order and record its outcome and latencies.
+
+        Parameters:
+        due   perf_counter() time the work order was due to start, from
+              which its latency is measured. Defaults to now.
+
+        Returns:
+        Outcome, "SUCCESS" if the result was received and verified.
+        """
+        with self.__lock:
+            self.__in_flight += 1
+            worker = self.__random.choices(
+                self.__workers, self.__worker_weights)[0]
+            in_data = self.__random.choices(
+                self.__payloads, self.__payload_weights)[0]
+        start = time.perf_counter()
+        if due is None:
+            due = start
+        timings = {}
+        try:
+            self.__round_trip(worker, in_data, timings)
+            outcome = WorkOrderStatus.SUCCESS.name
+        except _Outcome as e:
+            outcome = str(e)
+        except Exception as e:
+            logger.warning("Work order failed: %s", e)
+            outcome = CLIENT_ERROR
+        end = time.perf_counter()
+
+        with self.__lock:
+            self.__in_flight -= 1
+            self.outcomes[outcome] += 1
+            if "submit" in timings:
+                self.submit_latency.record(timings["submit"])
+            if outcome == WorkOrderStatus.SUCCESS.name:
+                self.result_latency.record(timings["result"])
+                self.latency.record(end - due)
+        return outcome
+
+    def __round_trip(self, worker, in_data, timings):
+        # Imported here, WorkOrderParams loads the crypto libraries
+        from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+        from avalon_crypto_utils.worker_signing import WorkerSign
+        from work_order.work_order_params import WorkOrderParams
+
+        encrypt = WorkerEncrypt()
+        session_key = encrypt.generate_session_key()
+        session_iv = encrypt.generate_iv()
+        encrypted_session_key = encrypt.encrypt_session_key(
+            session_key, worker.encryption_key).hex()
+        work_order_id = secrets.token_hex(32)
+        params = WorkOrderParams()
+        error = params.create_request(
+            work_order_id, worker.worker_id, self.__workload_id,
+            self.__requester_id, session_key, session_iv,
+            secrets.token_hex(16),
+            worker_encryption_key=worker.encryption_key,
+            data_encryption_algorithm="AES-GCM-256",
+            encrypted_session_key=encrypted_session_key)
+        if error:
+            raise ValueError("Invalid request: {}".format(error))
+        for data in in_data:
+            params.add_in_data(data)
+        params.add_encrypted_request_hash()
+        if not params.add_requester_signature(self.__signer):
+            raise ValueError("Signing the request failed")
+
+        start = time.perf_counter()
+        response = self.__work_order.work_order_submit(
+            params.to_string(), next(self.__ids))
+        submitted = time.perf_counter()
+        timings["submit"] = submitted - start
+        self.__check(response, WorkOrderStatus.PENDING)
+
+        deadline = submitted + self.__timeout_secs
+        while True:
+            response = self.__work_order.work_order_get_result_nonblocking(
+                work_order_id, next(self.__ids))
+            if response.get("error", {}).get("code") != \
+                    WorkOrderStatus.PENDING:
+                break
+            if time.perf_counter() >= deadline:
+                raise _Outcome(TIMEOUT)
+            time.sleep(self.__poll_interval_secs)
+        timings["result"] = time.perf_counter() - submitted
+        self.__check(response, WorkOrderStatus.SUCCESS)
+
+        status = WorkerSign().verify_signature(
+            response["result"], worker.verification_key)
+        if status != SignatureStatus.PASSED:
+            raise _Outcome(WorkOrderStatus.INVALID_SIGNATURE.name)
+        out_data = encrypt.decrypt_work_order_data_json(
+            response["result"]["outData"], session_key, session_iv)
+        if len(out_data) != len(in_data):
+            raise ValueError("Unexpected outData")
+
+    @staticmethod
+    def __check(response, expected):
+        """
+        Raise _Outcome with the status of an error response, unless the
+        status is the expected one.
+        """
+        if "error" not in response:
+            if "result" in response or expected != WorkOrderStatus.SUCCESS:
+                return
+            raise ValueError("Invalid response: {}".format(response))
+        error = response["error"]
+        if isinstance(error.get("data"), Exception):
+            # Raised by the SDK, e.g. on HTTP errors, and turned into an
+            # error response by its error_handler
+            raise ValueError("{}: {}".format(
+                error.get("message"), error["data"]))
+        code = error.get("code")
+        if code == expected:
+            return
+        if WorkOrderStatus.has_value(code):
+            raise _Outcome(WorkOrderStatus(code).name)
+        raise _Outcome("JRPC_ERROR_{}".format(code))
+
+    def run_open_loop(self, rate, duration_secs=None, work_orders=None,
+                      concurrency=64, poisson=False, progress=None):
+        """
+        Start work orders at the given rate until duration_secs passed
+        or work_orders were started, then wait for them to complete.
+
+        Parameters:
+        rate          Work orders started per second
+        duration_secs Time to start work orders for
+        work_orders   Number of work orders to start
+        concurrency   Maximum number of work orders in flight. Work
+                      orders due beyond it wait for a free slot, and the
+                      wait counts towards their latency.
+        poisson       If True, start work orders at exponentially
+                      distributed intervals instead of constant ones
+        progress      Optional callable called about once per second
+
+        Returns:
+        Elapsed time in seconds.
+        """
+        arrivals = random.Random(self.__random.random())
+        start = time.perf_counter()
+        due = start
+        started = 0
+        last_progress = start
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while (work_orders is None or started < work_orders) and \
+                    (duration_secs is None or
+                     due - start < duration_secs):
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.run_one, due)
+                started += 1
+                due += arrivals.expovariate(rate) if poisson else 1 / rate
+                if progress is not None and due - last_progress >= 1:
+                    last_progress = due
+                    progress()
+        return time.perf_counter() - start
+
+    def run_closed_loop(self, concurrency, duration_secs=None,
+                        work_orders=None, think_time_secs=0.0,
+                        progress=None):
+        """
+        Run concurrency requesters, each starting its next work order
+        think_time_secs after the previous one completed, until
+        duration_secs passed or work_orders were started.
+
+        Returns:
+        Elapsed time in seconds.
+        """
+        start = time.perf_counter()
+        remaining = itertools.count() if work_orders is None \
+            else iter(range(work_orders))
+        remaining_lock = threading.Lock()
+
+        def requester():
+            while duration_secs is None or \
+                    time.perf_counter() - start < duration_secs:
+                with remaining_lock:
+                    if next(remaining, None) is None:
+                        return
+                self.run_one()
+                if think_time_secs:
+                    time.sleep(think_time_secs)
+
+        threads = [threading.Thread(target=requester, daemon=True)
+                   for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        while True:
+            alive = [thread for thread in threads if thread.is_alive()]
+            if not alive:
+                break
+            alive[0].join(1)
+            if progress is not None:
+                progress()
+        return time.perf_counter() - start
+
+    def report(self, elapsed_secs):
+        """Return the results as a JSON serializable dictionary."""
+        with self.__lock:
+            completed = sum(self.outcomes.values())
+            succeeded = self.outcomes[WorkOrderStatus.SUCCESS.name]
+            return {
+                "elapsed_secs": round(elapsed_secs, 3),
+                "work_orders": completed,
+                "throughput_per_sec": round(completed / elapsed_secs, 2),
+                "success_per_sec": round(succeeded / elapsed_secs, 2),
+                "outcomes": dict(self.outcomes.most_common()),
+                "latency_ms": {
+                    "round_trip": self.latency.to_dict(),
+                    "submit": self.submit_latency.to_dict(),
+                    "result": self.result_latency.to_dict(),
+                },
+            }
+
+
+def _weighted_list(value):
+    """Parse "name[:weight],..." into [(name, weight)]."""
+    result = []
+    for item in value.split(","):
+        name, _, weight = item.partition(":")
+        result.append((name, float(weight) if weight else 1.0))
+    return result
+
+
+def _payload_list(value):
+    """Parse "size[xitems][:weight],..." into [(size, items, weight)]."""
+    result = []
+    for payload, weight in _weighted_list(value):
+        size, _, items = payload.partition("x")
+        result.append((int(size), int(items) if items else 1, weight))
+    return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="JSON RPC URL of the listener")
+    target.add_argument("--mock", action="store_true",
+                        help="Start an in-process mock listener to run "
+                        "against")
+    parser.add_argument("--mode", choices=("open", "closed"),
+                        default="open", help="Open or closed loop")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="Work orders started per second in open loop")
+    parser.add_argument("--arrival", choices=("constant", "poisson"),
+                        default="constant",
+                        help="Distribution of the open loop start intervals")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Requesters in closed loop (default 4), "
+                        "maximum work orders in flight in open loop "
+                        "(default 64)")
+    parser.add_argument("--think-time-ms", type=float, default=0.0,
+                        help="Delay between the work orders of a closed "
+                        "loop requester")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Seconds to start work orders for "
+                        "(default 10 unless --work-orders is given)")
+    parser.add_argument("--work-orders", type=int, default=None,
+                        help="Number of work orders to start")
+    parser.add_argument("--payload", type=_payload_list,
+                        default=[(1024, 1, 1.0)],
+                        help="inData profile: comma separated "
+                        "size[xitems][:weight], e.g. 1024:9,65536x4:1")
+    parser.add_argument("--workers", type=_weighted_list, default=None,
+                        help="Worker mix: comma separated "
+                        "worker_id[:weight], default all TEE-SGX workers "
+                        "in equal shares")
+    parser.add_argument("--workload-id", default="echo")
+    parser.add_argument("--poll-interval-ms", type=float, default=10.0,
+                        help="Delay between WorkOrderGetResult calls")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="Seconds after which a PENDING work order "
+                        "counts as TIMEOUT")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output",
+                        help="File to write the JSON report to, "
+                        "default stdout")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Do not log progress")
+    parser.add_argument("--record",
+                        help="Append the JSON RPC traffic to this "
+                        "recording file, for avalon-jrpc-replay")
+    options = parser.parse_args(args)
+    if options.duration is None and options.work_orders is None:
+        options.duration = 10.0
+    if options.concurrency is None:
+        options.concurrency = 64 if options.mode == "open" else 4
+
+    # The SDK logs every request at INFO level
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        level=logging.WARNING)
+    if not options.quiet:
+        logger.setLevel(logging.INFO)
+
+    listener = None
+    url = options.url
+    if options.mock:
+        from avalon_sdk_direct.mock_listener import MockListener
+        listener = MockListener(seed=options.seed).start()
+        url = listener.url
+    recorder = None
+    if options.record:
+        recorder = jrpc_recording.JrpcRecorder(options.record)
+        jrpc_recording.set_recorder(recorder)
+    try:
+        generator = LoadGenerator(
+            url, options.workers, options.payload, options.workload_id,
+            options.poll_interval_ms / 1000, options.timeout, options.seed)
+
+        def progress():
+            logger.info("%d work orders completed, %d in flight",
+                        sum(generator.outcomes.values()),
+                        generator.in_flight)
+
+        if options.mode == "open":
+            elapsed = generator.run_open_loop(
+                options.rate, options.duration, options.work_orders,
+                options.concurrency,
+                options.arrival == "poisson", progress)
+        else:
+            elapsed = generator.run_closed_loop(
+                options.concurrency, options.duration,
+                options.work_orders, options.think_time_ms / 1000,
+                progress)
+    finally:
+        if recorder is not None:
+            jrpc_recording.set_recorder(None)
+            recorder.close()
+        if listener is not None:
+            listener.stop()
+
+    report = {
+        "url": "mock" if listener is not None else url,
+        "mode": options.mode,
+        "offered_rate_per_sec":
+            options.rate if options.mode == "open" else None,
+        "concurrency": options.concurrency,
+        "payload": [{"bytes": size, "items": items, "weight": weight}
+                    for size, items, weight in options.payload],
+    }
+    report.update(generator.report(elapsed))
+    output = json.dumps(report, indent=4)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    succeeded = generator.outcomes[WorkOrderStatus.SUCCESS.name]
+    return 0 if succeeded == sum(generator.outcomes.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of pages read per lookup, guards against a listener
+# handing out the same lookup tag forever
+MAX_LOOKUP_PAGES = 10000
+
+
+class LookupPages(object):
+    """
+    Iterates over the result pages of a WorkerLookUp or
+    WorkOrderReceiptLookUp and the LookUpNext calls following it:
+
+        pages = LookupPages(
+            lambda: registry.worker_lookup(worker_type),
+            lambda tag: registry.worker_lookup_next(tag, worker_type))
+        for result in pages:
+            worker_ids.extend(result["ids"])
+
+    Paging stops at a page without IDs or lookup tag, once totalCount
+    distinct IDs were returned, or after max_pages pages. An error
+    response ends the iteration and sets failed.
+    """
+
+    def __init__(self, lookup, lookup_next, name="Lookup",
+                 max_pages=MAX_LOOKUP_PAGES):
+        """
+        Parameters:
+        lookup      Function returning the response of the first page
+        lookup_next Function returning the response of the page after
+                    the lookup tag it is called with
+        name        Name of the lookup in log messages
+        max_pages   Maximum number of pages read
+        """
+        self.__lookup = lookup
+        self.__lookup_next = lookup_next
+        self.__name = name
+        self.__max_pages = max_pages
+        self.failed = False
+
+    def __iter__(self):
+        self.failed = False
+        seen = set()
+        response = self.__lookup()
+        for page in range(1, self.__max_pages + 1):
+            if "result" not in response:
+                logger.warning("%s failed: %s", self.__name,
+                               response.get("error"))
+                self.failed = True
+                return
+            result = response["result"]
+            yield result
+            ids = result.get("ids", [])
+            seen.update(ids)
+            lookup_tag = result.get("lookupTag")
+            if not lookup_tag or not ids or \
+                    len(seen) >= result.get("totalCount", float("inf")):
+                return
+            if page == self.__max_pages:
+                logger.warning("%s stopped after %d pages", self.__name,
+                               page)
+                return
+            response = self.__lookup_next(lookup_tag)
@@ -0,0 +1,608 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local stand-in for an Avalon JSON RPC listener, to run the SDK and
+benchmark it without an Avalon deployment.
+
+Implements the work order, worker registry and work order receipt
+methods of the direct model. Work orders are echoed: the result's outData
+is the request's inData, so it decrypts with the requester's session key
+to the submitted data. Results are signed with the listener's worker
+signing key, which is published together with its encryption key in the
+details of the registered workers.
+
+Latency, BUSY responses, JSON RPC errors and HTTP errors can be injected
+at configurable rates, and results can be kept PENDING for a while after
+submission. Run as a script to serve on a port:
+
+    python3 -m avalon_sdk_direct.mock_listener --port 1947 --busy-rate 0.1
+
+or, with --unix-socket, on a Unix domain socket.
+"""
+
+import argparse
+import collections
+import http.server
+import json
+import logging
+import os
+import random
+import socketserver
+import stat
+import threading
+import time
+import urllib.parse
+
+import avalon_crypto_utils.crypto_utility as crypto_utility
+from enums.error_code import WorkOrderStatus, JRPCErrorCodes
+from enums.worker import WorkerType, WorkerStatus
+
+logger = logging.getLogger(__name__)
+
+# updateIndex of WorkOrderReceiptUpdateRetrieve that selects the last
+# update
+_LAST_UPDATE_INDEX = 0xFFFFFFFF
+
+
+class _JrpcError(Exception):
+    """Error returned to the client as JSON RPC error response."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    # Keep connections of HTTP/1.1 clients open
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        listener = self.server.listener
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if listener.inject_http_error():
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            request = json.loads(body.decode("utf-8"))
+        except ValueError:
+            request = None
+        data = json.dumps(listener.handle(request)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Clients of Unix domain sockets have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+
+class _UnixServer(socketserver.ThreadingMixIn,
+                  socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class MockListener(object):
+    """
+    JSON RPC listener serving work orders, workers and receipts from
+    memory. Thread safe; requests are served by a thread each and only
+    hold the lock while they access the shared state, so that signing
+    results runs in parallel.
+
+    The injection settings are attributes that may be changed while the
+    listener is running.
+    """
+
+    def __init__(self, host="localhost", port=0, workers=1,
+                 latency_secs=0.0, latency_jitter_secs=0.0,
+                 busy_rate=0.0, error_rate=0.0, http_error_rate=0.0,
+                 pending_secs=0.0, lookup_page_size=10,
+                 max_work_orders=100000, seed=None, unix_socket=None):
+        """
+        Parameters:
+        host                Host name or address to listen on
+        port                Port to listen on, 0 for a free port
+        workers             Number of TEE-SGX workers to register at start
+        latency_secs        Delay added to every response
+        latency_jitter_secs Random delay of up to this many seconds added
+                            on top of latency_secs
+        busy_rate           Fraction of requests answered with a BUSY
+                            error
+        error_rate          Fraction of requests answered with an
+                            UNKNOWN_ERROR JSON RPC error
+        http_error_rate     Fraction of requests answered with HTTP 503
+        pending_secs        Time after submission during which
+                            WorkOrderGetResult answers PENDING
+        lookup_page_size    Number of IDs per lookup response
+        max_work_orders     Number of work orders kept, the oldest are
+                            dropped beyond it
+        seed                Optional seed of the injection randomness and
+                            of the worker IDs
+        unix_socket         Optional path of a Unix domain socket to
+                            listen on instead of host and port
+        """
+        # Cryptodome and the ECDSA library are only loaded when a
+        # listener is created
+        from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+        from avalon_crypto_utils.worker_hash import WorkerHash
+        from avalon_crypto_utils.worker_signing import WorkerSign
+
+        self.latency_secs = latency_secs
+        self.latency_jitter_secs = latency_jitter_secs
+        self.busy_rate = busy_rate
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.pending_secs = pending_secs
+        self.lookup_page_size = lookup_page_size
+        self.max_work_orders = max_work_orders
+        # Requests handled per method, including injected failures
+        self.request_counts = collections.Counter()
+
+        self.__address = (host, port)
+        self.__unix_socket = unix_socket
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__server = None
+        self.__thread = None
+        self.__hasher = WorkerHash()
+        self.__signer = WorkerSign()
+        self.__signer.generate_signing_key()
+        encrypt = WorkerEncrypt()
+        encrypt.generate_rsa_key()
+        self.encryption_key = encrypt.get_rsa_public_key().decode("UTF-8")
+        self.verification_key = \
+            self.__signer.get_public_sign_key().decode("UTF-8")
+        self.__encryption_key_signature = self.__signer.sign_message(
+            self.__hasher.compute_message_hash(
+                self.encryption_key.encode("UTF-8"))).hex()
+
+        # work order ID -> [submission time, params, result or None]
+        self.__work_orders = collections.OrderedDict()
+        # worker ID -> WorkerRetrieve result
+        self.__workers = collections.OrderedDict()
+        # work order ID -> (WorkOrderReceiptRetrieve result, updates)
+        self.__receipts = collections.OrderedDict()
+        for _ in range(workers):
+            self.__workers["%064x" % self.__random.getrandbits(256)] = {
+                "workerType": WorkerType.TEE_SGX.value,
+                "organizationId": "%064x" % self.__random.getrandbits(256),
+                "applicationTypeId": [],
+                "details": self.__worker_details(),
+                "status": WorkerStatus.ACTIVE.value,
+            }
+
+        self.__methods = {
+            "WorkOrderSubmit": self.__work_order_submit,
+            "WorkOrderGetResult": self.__work_order_get_result,
+            "EncryptionKeyGet": self.__encryption_key_get,
+            "WorkerRegister": self.__worker_register,
+            "WorkerUpdate": self.__worker_update,
+            "WorkerSetStatus": self.__worker_set_status,
+            "WorkerRetrieve": self.__worker_retrieve,
+            "WorkerLookUp": self.__worker_lookup,
+            "WorkerLookUpNext": self.__worker_lookup,
+            "WorkOrderReceiptCreate": self.__receipt_create,
+            "WorkOrderReceiptUpdate": self.__receipt_update,
+            "WorkOrderReceiptRetrieve": self.__receipt_retrieve,
+            "WorkOrderReceiptUpdateRetrieve": self.__receipt_update_retrieve,
+            "WorkOrderReceiptLookUp": self.__receipt_lookup,
+            "WorkOrderReceiptLookUpNext": self.__receipt_lookup,
+        }
+
+    @property
+    def url(self):
+        """URL of the running listener, to be used as json_rpc_uri."""
+        if self.__unix_socket is not None:
+            return "unix://" + urllib.parse.quote(self.__unix_socket)
+        host, port = self.__server.server_address[:2]
+        return "http://{0}:{1}/".format(host, port)
+
+    @property
+    def worker_ids(self):
+        """IDs of the registered workers."""
+        with self.__lock:
+            return list(self.__workers)
+
+    def start(self):
+        """Start serving on a background thread and return self."""
+        if self.__unix_socket is not None:
+            self.__remove_socket()
+            self.__server = _UnixServer(self.__unix_socket, _RequestHandler)
+        else:
+            self.__server = _Server(self.__address, _RequestHandler)
+        self.__server.listener = self
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="mock-listener",
+            daemon=True)
+        self.__thread.start()
+        logger.info("Mock listener serving on %s", self.url)
+        return self
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__thread.join()
+            self.__server = None
+            if self.__unix_socket is not None:
+                self.__remove_socket()
+
+    def __remove_socket(self):
+        """Remove the Unix domain socket file, if left over."""
+        try:
+            if stat.S_ISSOCK(os.stat(self.__unix_socket).st_mode):
+                os.unlink(self.__unix_socket)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def inject_http_error(self):
+        """Return True if the current request is to fail with HTTP 503."""
+        return self.__inject(self.http_error_rate)
+
+    def __inject(self, rate):
+        """Return True with probability rate."""
+        if rate <= 0:
+            return False
+        with self.__lock:
+            return self.__random.random() < rate
+
+    def handle(self, request):
+        """
+        Handle a JSON RPC request.
+
+        Parameters:
+        request JSON RPC request as dictionary
+
+        Returns:
+        JSON RPC response as dictionary.
+        """
+        delay = self.latency_secs
+        if self.latency_jitter_secs > 0:
+            with self.__lock:
+                delay += self.__random.uniform(0, self.latency_jitter_secs)
+        if delay > 0:
+            time.sleep(delay)
+
+        if not isinstance(request, dict):
+            return self.__error(None, -32700, "Parse error")
+        id = request.get("id")
+        method = request.get("method")
+        with self.__lock:
+            self.request_counts[method] += 1
+        if self.__inject(self.busy_rate):
+            return self.__error(id, WorkOrderStatus.BUSY,
+                                "Worker is busy, retry later")
+        if self.__inject(self.error_rate):
+            return self.__error(id, WorkOrderStatus.UNKNOWN_ERROR,
+                                "Injected error")
+        handler = self.__methods.get(method)
+        if handler is None:
+            return self.__error(id, -32601, "Method not found")
+        try:
+            result = handler(request.get("params") or {})
+        except _JrpcError as err:
+            return self.__error(id, err.code, err.message)
+        except Exception as err:
+            logger.exception("%s failed", method)
+            return self.__error(id, WorkOrderStatus.UNKNOWN_ERROR, str(err))
+        return {"jsonrpc": "2.0", "id": id, "result": result}
+
+    @staticmethod
+    def __error(id, code, message, data=None):
+        error = {"code": int(code), "message": message}
+        if data is not None:
+            error["data"] = data
+        return {"jsonrpc": "2.0", "id": id, "error": error}
+
+    @staticmethod
+    def __success(message):
+        """Avalon reports successful updates as error with code 0."""
+        raise _JrpcError(JRPCErrorCodes.SUCCESS, message)
+
+    @staticmethod
+    def __param(params, name):
+        value = params.get(name)
+        if value is None:
+            raise _JrpcError(
+                WorkOrderStatus.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                "Missing parameter " + name)
+        return value
+
+    def __page(self, params, ids, tag_name):
+        """Return the lookup result page starting at the lookup tag."""
+        start = int(params.get(tag_name) or 0)
+        page = ids[start:start + self.lookup_page_size]
+        # The tag of the last page points past it, so that a later
+        # lookup next call returns what was added in between
+        return {"totalCount": len(ids),
+                "lookupTag": str(start + len(page)), "ids": page}
+
+    # Work orders
+    #
+    # The handlers take the lock themselves, only around their access to
+    # the work orders, workers, receipts and the random generator.
+
+    def __work_order_submit(self, params):
+        work_order_id = self.__param(params, "workOrderId")
+        with self.__lock:
+            if work_order_id in self.__work_orders:
+                raise _JrpcError(
+                    WorkOrderStatus.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                    "Work order Id already exists in the database")
+            self.__work_orders[work_order_id] = \
+                [time.monotonic(), params, None]
+            while len(self.__work_orders) > self.max_work_orders:
+                self.__work_orders.popitem(last=False)
+        raise _JrpcError(
+            WorkOrderStatus.PENDING,
+            "Work order is computing. Please query for WorkOrderGetResult"
+            " to view the result")
+
+    def __work_order_get_result(self, params):
+        work_order_id = self.__param(params, "workOrderId")
+        with self.__lock:
+            work_order = self.__work_orders.get(work_order_id)
+            if work_order is None:
+                raise _JrpcError(
+                    WorkOrderStatus.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                    "Work order Id not found in the database. Hence invalid"
+                    " parameter")
+            submitted, request, result = work_order
+            worker_nonce = "%032x" % self.__random.getrandbits(128)
+        if time.monotonic() - submitted < self.pending_secs:
+            raise _JrpcError(WorkOrderStatus.PENDING,
+                             "Work order result is yet to be updated")
+        if result is None:
+            # Signed outside the lock; of concurrent requests for the
+            # same work order, the first result stored is kept
+            result = self.__work_order_result(request, worker_nonce)
+            with self.__lock:
+                if work_order[2] is None:
+                    work_order[2] = result
+                result = work_order[2]
+        return result
+
+    def __work_order_result(self, request, worker_nonce):
+        """Echo the inData of a request as signed result."""
+        result = {
+            "workOrderId": request["workOrderId"],
+            "workloadId": request.get("workloadId", ""),
+            "workerId": request.get("workerId", ""),
+            "requesterId": request.get("requesterId", ""),
+            "workerNonce": worker_nonce,
+            "outData": [
+                {key: item[key] for key in
+                 ("index", "dataHash", "data", "encryptedDataEncryptionKey",
+                  "iv") if key in item}
+                for item in request.get("inData", [])],
+        }
+        response_hash = self.__hasher.calculate_response_hash(result)
+        result["workerSignature"] = crypto_utility.byte_array_to_base64(
+            self.__signer.sign_message(response_hash))
+        return result
+
+    def __encryption_key_get(self, params):
+        return {
+            "workerId": self.__param(params, "workerId"),
+            "encryptionKey": self.encryption_key,
+            "encryptionKeyNonce": "",
+            "tag": params.get("tag") or params.get("requesterId", ""),
+            "signature": self.__encryption_key_signature,
+        }
+
+    # Worker registry
+
+    def __worker_details(self):
+        return {
+            "hashingAlgorithm": "SHA-256",
+            "signingAlgorithm": "SECP256K1",
+            "keyEncryptionAlgorithm": "RSA-OAEP-3072",
+            "dataEncryptionAlgorithm": "AES-GCM-256",
+            "workOrderPayloadFormats": "JSON-RPC",
+            "workerTypeData": {
+                "verificationKey": self.verification_key,
+                "encryptionKey": self.encryption_key,
+                "encryptionKeyNonce": "",
+                "encryptionKeySignature": self.__encryption_key_signature,
+                "proofDataType": "",
+                "proofData": "",
+            },
+        }
+
+    def __worker(self, params):
+        worker = self.__workers.get(self.__param(params, "workerId"))
+        if worker is None:
+            raise _JrpcError(JRPCErrorCodes.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                             "Worker Id not found")
+        return worker
+
+    def __worker_register(self, params):
+        worker_id = self.__param(params, "workerId")
+        with self.__lock:
+            if worker_id in self.__workers:
+                raise _JrpcError(
+                    JRPCErrorCodes.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                    "Worker Id already exists")
+            self.__workers[worker_id] = {
+                "workerType": params.get("workerType",
+                                         WorkerType.TEE_SGX.value),
+                "organizationId": params.get("organizationId"),
+                "applicationTypeId": params.get("applicationTypeId") or [],
+                "details": params.get("details") or {},
+                "status": WorkerStatus.ACTIVE.value,
+            }
+        self.__success("Successfully Registered")
+
+    def __worker_update(self, params):
+        with self.__lock:
+            self.__worker(params)["details"] = params.get("details") or {}
+        self.__success("Successfully Updated")
+
+    def __worker_set_status(self, params):
+        status = self.__param(params, "status")
+        with self.__lock:
+            self.__worker(params)["status"] = status
+        self.__success("Successfully Set Status")
+
+    def __worker_retrieve(self, params):
+        with self.__lock:
+            return dict(self.__worker(params))
+
+    def __worker_lookup(self, params):
+        with self.__lock:
+            ids = [
+                worker_id for worker_id, worker in self.__workers.items()
+                if params.get("workerType") in (None,
+                                                worker["workerType"]) and
+                params.get("organizationId") in (
+                    None, worker["organizationId"]) and
+                (params.get("applicationTypeId") is None or
+                 params["applicationTypeId"] in worker["applicationTypeId"])]
+        return self.__page(params, ids, "lookUpTag")
+
+    # Work order receipts
+
+    def __receipt(self, params):
+        receipt = self.__receipts.get(self.__param(params, "workOrderId"))
+        if receipt is None:
+            raise _JrpcError(JRPCErrorCodes.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                             "Work order receipt not found")
+        return receipt
+
+    def __receipt_create(self, params):
+        work_order_id = self.__param(params, "workOrderId")
+        receipt = dict(params)
+        receipt["receiptCurrentStatus"] = params.get("receiptCreateStatus")
+        with self.__lock:
+            if work_order_id in self.__receipts:
+                raise _JrpcError(
+                    JRPCErrorCodes.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                    "Work order receipt already exists")
+            self.__receipts[work_order_id] = (receipt, [])
+        self.__success("Receipt created successfully")
+
+    def __receipt_update(self, params):
+        update = {key: params.get(key) for key in (
+            "updaterId", "updateType", "updateData", "updateSignature",
+            "signatureRules")}
+        with self.__lock:
+            self.__receipt(params)[1].append(update)
+        self.__success("Receipt updated successfully")
+
+    def __receipt_retrieve(self, params):
+        with self.__lock:
+            return dict(self.__receipt(params)[0])
+
+    def __receipt_update_retrieve(self, params):
+        with self.__lock:
+            updates = list(self.__receipt(params)[1])
+        updater_id = params.get("updaterId")
+        if updater_id is not None:
+            updates = [u for u in updates if u["updaterId"] == updater_id]
+        index = params.get("updateIndex", 0)
+        if index == _LAST_UPDATE_INDEX:
+            index = len(updates) - 1
+        if not 0 <= index < len(updates):
+            raise _JrpcError(JRPCErrorCodes.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                             "Update index out of range")
+        update = dict(updates[index])
+        update["workOrderId"] = params["workOrderId"]
+        update["updateCount"] = len(updates)
+        return update
+
+    def __receipt_lookup(self, params):
+        filters = [(name, params[name]) for name in (
+            "workerServiceId", "workerId", "requesterId")
+            if params.get(name) is not None]
+        status = params.get("receiptStatus")
+        with self.__lock:
+            ids = [
+                work_order_id for work_order_id, (receipt, _) in
+                self.__receipts.items()
+                if all(receipt.get(name) == value
+                       for name, value in filters) and
+                status in (None, receipt["receiptCurrentStatus"])]
+        return self.__page(params, ids, "lastLookUpTag")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Mock Avalon JSON RPC listener")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1947)
+    parser.add_argument("--unix-socket", default=None,
+                        help="Path of a Unix domain socket to listen on "
+                        "instead of --host and --port")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of workers to register")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="Maximum random delay added to --latency-ms")
+    parser.add_argument("--busy-rate", type=float, default=0.0,
+                        help="Fraction of BUSY responses")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of JSON RPC error responses")
+    parser.add_argument("--http-error-rate", type=float, default=0.0,
+                        help="Fraction of HTTP 503 responses")
+    parser.add_argument("--pending-ms", type=float, default=0.0,
+                        help="Time a work order stays PENDING")
+    parser.add_argument("--seed", type=int, default=None)
+    options = parser.parse_args(args)
+
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        level=logging.INFO)
+    listener = MockListener(
+        options.host, options.port, options.workers,
+        options.latency_ms / 1000, options.jitter_ms / 1000,
+        options.busy_rate, options.error_rate, options.http_error_rate,
+        options.pending_ms / 1000, seed=options.seed,
+        unix_socket=options.unix_socket)
+    listener.start()
+    for worker_id in listener.worker_ids:
+        logger.info("Worker %s", worker_id)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
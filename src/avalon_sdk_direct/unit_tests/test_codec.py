@@ -0,0 +1,68 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import binascii
+import logging
+import os
+import unittest
+
+import utility.codec as codec
+import utility.conversion as conversion
+import utility.hex_utils as hex_utils
+import avalon_crypto_utils.crypto_utility as crypto_utility
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestCodec(unittest.TestCase):
+    def test_matches_legacy_conversions(self):
+        for size in (0, 1, 16, 32, 72, 257):
+            data = os.urandom(size)
+            legacy_hex = "".join(format(i, "02x") for i in data)
+            for value in (data, bytearray(data), memoryview(data),
+                          tuple(data)):
+                self.assertEqual(hex_utils.byte_array_to_hex_str(value),
+                                 legacy_hex)
+                self.assertEqual(crypto_utility.byte_array_to_hex(value),
+                                 legacy_hex.upper())
+            for value in (data, bytearray(data), memoryview(data)):
+                b64_str = crypto_utility.byte_array_to_base64(value)
+                self.assertEqual(b64_str, base64.b64encode(data).decode())
+                self.assertEqual(
+                    crypto_utility.base64_to_byte_array(b64_str), data)
+            self.assertEqual(codec.hex_decode(legacy_hex.upper()), data)
+            self.assertEqual(hex_utils.hex_to_byte_array(legacy_hex),
+                             bytearray(data))
+
+    def test_arrays(self):
+        ids = [os.urandom(32) for _ in range(5)]
+        hex_ids = conversion.convert_byte32_arr_to_hex_arr(ids)
+        self.assertEqual(hex_ids, [i.hex() for i in ids])
+        self.assertEqual(codec.hex_decode_array(hex_ids), ids)
+        self.assertEqual(codec.hex_encode_array(ids, upper=True),
+                         [i.hex().upper() for i in ids])
+        self.assertEqual(conversion.convert_byte32_arr_to_hex_arr([]), [])
+
+    def test_invalid_input(self):
+        self.assertRaises(binascii.Error, codec.hex_decode, "abc")
+        self.assertRaises(ValueError, codec.hex_decode, "zz")
+        self.assertRaises(binascii.Error, codec.b64_decode, "abc")
+        self.assertIsNone(hex_utils.hex_to_byte_array("xyz"))
+        self.assertRaises(TypeError, codec.b64_encode, "text")
+
+
+if __name__ == "__main__":
+    unittest.main()
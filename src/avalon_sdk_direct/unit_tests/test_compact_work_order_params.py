@@ -0,0 +1,151 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+import logging
+import secrets
+import unittest
+
+import avalon_crypto_utils.signing_backends as signing_backends
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from avalon_crypto_utils.worker_signing import WorkerSign
+from work_order.compact_work_order_params import CompactWorkOrderParams
+from work_order.work_order_params import WorkOrderParams
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+def _without_signature(params_obj):
+    params_obj = dict(params_obj)
+    params_obj.pop("requesterSignature", None)
+    return params_obj
+
+
+class TestCompactWorkOrderParams(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        worker = WorkerEncrypt()
+        worker.generate_rsa_key()
+        cls.encryption_key = worker.get_rsa_public_key().decode("UTF-8")
+        cls.signer = WorkerSign()
+        cls.signer.generate_signing_key()
+
+    def __pair(self, out_data=False):
+        """
+        Return CompactWorkOrderParams and WorkOrderParams created from
+        the same inputs, with their request hash added.
+        """
+        encrypt = WorkerEncrypt()
+        session_key = encrypt.generate_session_key()
+        session_iv = encrypt.generate_iv()
+        args = (secrets.token_hex(32), secrets.token_hex(32),
+                "echo".encode("UTF-8").hex(), secrets.token_hex(32),
+                session_key, session_iv, secrets.token_hex(16))
+        kwargs = {
+            "worker_encryption_key": self.encryption_key,
+            "data_encryption_algorithm": "AES-GCM-256",
+            "result_uri": "http://localhost:8080/result",
+            "encrypted_session_key": encrypt.encrypt_session_key(
+                session_key, self.encryption_key).hex(),
+        }
+        compact = CompactWorkOrderParams()
+        params = WorkOrderParams()
+        for work_order in (compact, params):
+            self.assertIsNone(work_order.create_request(*args, **kwargs))
+            work_order.add_in_data("first", data_hash="ab" * 32)
+            work_order.add_in_data("second")
+            if out_data:
+                work_order.add_out_data("out")
+            work_order.add_encrypted_request_hash()
+        return compact, params
+
+    def test_matches_work_order_params(self):
+        for out_data in (False, True):
+            compact, params = self.__pair(out_data)
+            self.assertEqual(compact.request_hash, params.request_hash)
+            self.assertEqual(compact.to_params_obj(), params.params_obj)
+            self.assertEqual(json.loads(compact.to_string()),
+                             json.loads(params.to_string()))
+            self.assertEqual(json.loads(compact.to_jrpc_string(3)),
+                             json.loads(params.to_jrpc_string(3)))
+            self.assertEqual(compact.get_in_data(), params.get_in_data())
+
+    def test_signed_request_matches(self):
+        compact, params = self.__pair()
+        self.assertTrue(compact.add_requester_signature(self.signer))
+        self.assertTrue(params.add_requester_signature(self.signer))
+        self.assertEqual(_without_signature(compact.to_params_obj()),
+                         _without_signature(params.params_obj))
+
+    def test_add_requester_signature(self):
+        compact, _ = self.__pair()
+        self.assertTrue(compact.add_requester_signature(self.signer))
+        params_obj = compact.to_params_obj()
+        verifying_key = self.signer.get_public_sign_key()
+        self.assertEqual(params_obj["verifyingKey"],
+                         verifying_key.decode("UTF-8"))
+        self.assertTrue(self.signer.verify_signature_from_pubkey(
+            base64.b64decode(params_obj["requesterSignature"]),
+            compact.request_hash, verifying_key))
+
+    def test_add_requester_signatures(self):
+        batch = [self.__pair()[0] for _ in range(3)]
+        self.assertTrue(CompactWorkOrderParams.add_requester_signatures(
+            batch, self.signer))
+        verifying_key = self.signer.get_public_sign_key()
+        for compact in batch:
+            params_obj = compact.to_params_obj()
+            self.assertTrue(self.signer.verify_signature_from_pubkey(
+                base64.b64decode(params_obj["requesterSignature"]),
+                compact.request_hash, verifying_key))
+
+    def test_signing_failure(self):
+        compact, _ = self.__pair()
+        # No signing key generated
+        self.assertFalse(compact.add_requester_signature(WorkerSign()))
+        self.assertEqual(compact.to_params_obj()["requesterSignature"], "")
+        self.assertNotIn("verifyingKey", compact.to_params_obj())
+        self.assertFalse(CompactWorkOrderParams.add_requester_signatures(
+            [compact], WorkerSign()))
+
+    def test_work_order_params_backend_keys(self):
+        # Keys of every backend are accepted, whichever backend
+        # WorkerSign picks by default
+        for name in signing_backends.available_backends():
+            _, params = self.__pair()
+            private_key = signing_backends.get_backend(name).generate_key()
+            self.assertTrue(params.add_requester_signature(private_key),
+                            name)
+            verifying_key = params.params_obj["verifyingKey"]
+            self.assertTrue(WorkerSign().verify_signature_from_pubkey(
+                base64.b64decode(params.params_obj["requesterSignature"]),
+                params.request_hash, verifying_key.encode("UTF-8")), name)
+
+    def test_work_order_params_invalid_key(self):
+        _, params = self.__pair()
+        self.assertFalse(params.add_requester_signature("not a key"))
+        self.assertNotIn("verifyingKey", params.params_obj)
+
+    def test_invalid_request(self):
+        err = CompactWorkOrderParams().create_request(
+            "not hex", secrets.token_hex(32), "echo".encode("UTF-8").hex(),
+            secrets.token_hex(32), b"k" * 32, b"i" * 12,
+            secrets.token_hex(16), worker_encryption_key=self.encryption_key)
+        self.assertIn("error", err)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+import secrets
+import time
+
+from avalon_sdk_direct.encryption_key_cache import EncryptionKeyCache
+import avalon_crypto_utils.worker_signing as worker_signing
+import avalon_crypto_utils.worker_hash as worker_hash
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class _WorkOrderStub(object):
+    """
+    Stand-in for JRPCWorkOrderImpl which hands out signed keys
+    and records the encryption_key_get calls made.
+    """
+
+    def __init__(self, signer):
+        self.signer = signer
+        self.calls = []
+        self.nonce = 0
+
+    def encryption_key_get(self, worker_id, requester_id,
+                           last_used_key_nonce=None, tag=None,
+                           signature_nonce=None, signature=None, id=None):
+        self.calls.append(last_used_key_nonce)
+        self.nonce += 1
+        encryption_key = secrets.token_hex(32)
+        key_hash = worker_hash.WorkerHash().compute_message_hash(
+            encryption_key.encode("UTF-8"))
+        return {
+            "jsonrpc": "2.0",
+            "id": id,
+            "result": {
+                "workerId": worker_id,
+                "encryptionKey": encryption_key,
+                "encryptionKeyNonce": str(self.nonce),
+                "tag": requester_id,
+                "signature": self.signer.sign_message(key_hash).hex()
+            }
+        }
+
+
+class TestEncryptionKeyCache(unittest.TestCase):
+    def setUp(self):
+        self.__signer = worker_signing.WorkerSign()
+        self.__signer.generate_signing_key()
+        self.__verifying_key = self.__signer.get_public_sign_key()
+        self.__work_order = _WorkOrderStub(self.__signer)
+        self.__worker_id = secrets.token_hex(32)
+        self.__requester_id = secrets.token_hex(32)
+
+    def test_key_served_from_cache(self):
+        cache = EncryptionKeyCache(self.__work_order, background_refresh=False)
+        first = cache.get(self.__worker_id, self.__requester_id,
+                          self.__verifying_key, 41)
+        second = cache.get(self.__worker_id, self.__requester_id, id=42)
+        self.assertIn("result", first)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.__work_order.calls), 1)
+
+    def test_expired_key_refetched_with_nonce(self):
+        cache = EncryptionKeyCache(self.__work_order, key_ttl_secs=0.2,
+                                   refresh_ahead_secs=0,
+                                   background_refresh=False)
+        first = cache.get(self.__worker_id, self.__requester_id, id=43)
+        time.sleep(0.3)
+        second = cache.get(self.__worker_id, self.__requester_id, id=44)
+        self.assertNotEqual(first["result"]["encryptionKey"],
+                            second["result"]["encryptionKey"])
+        self.assertEqual(self.__work_order.calls,
+                         [None, first["result"]["encryptionKeyNonce"]])
+
+    def test_background_refresh(self):
+        cache = EncryptionKeyCache(self.__work_order, key_ttl_secs=1.0,
+                                   refresh_ahead_secs=0.8)
+        cache.get(self.__worker_id, self.__requester_id,
+                  self.__verifying_key, 45)
+        time.sleep(0.3)
+        self.assertEqual(self.__work_order.calls, [None, "1"])
+        cache.clear()
+
+    def test_invalid_signature_not_cached(self):
+        other_signer = worker_signing.WorkerSign()
+        other_signer.generate_signing_key()
+        cache = EncryptionKeyCache(self.__work_order, background_refresh=False)
+        res = cache.get(self.__worker_id, self.__requester_id,
+                        other_signer.get_public_sign_key(), 46)
+        self.assertIn("error", res)
+        cache.get(self.__worker_id, self.__requester_id,
+                  self.__verifying_key, 47)
+        self.assertEqual(len(self.__work_order.calls), 2)
+
+    def test_unverified_entry_verified_before_serving(self):
+        other_signer = worker_signing.WorkerSign()
+        other_signer.generate_signing_key()
+        self.__work_order.signer = other_signer
+        cache = EncryptionKeyCache(self.__work_order, background_refresh=False)
+        # Cached without verification
+        first = cache.get(self.__worker_id, self.__requester_id, id=50)
+        self.assertIn("result", first)
+        # Signed by another signer than the caller expects
+        res = cache.get(self.__worker_id, self.__requester_id,
+                        self.__verifying_key, 51)
+        self.assertIn("error", res)
+        self.assertEqual(len(self.__work_order.calls), 2)
+        # Verified with the matching key, then served from cache
+        other_key = other_signer.get_public_sign_key()
+        second = cache.get(self.__worker_id, self.__requester_id,
+                           other_key, 52)
+        third = cache.get(self.__worker_id, self.__requester_id,
+                          other_key, 53)
+        self.assertIn("result", second)
+        self.assertIs(second, third)
+        self.assertEqual(len(self.__work_order.calls), 3)
+
+    def test_unread_key_not_refreshed(self):
+        cache = EncryptionKeyCache(self.__work_order, key_ttl_secs=0.6,
+                                   refresh_ahead_secs=0.5)
+        cache.get(self.__worker_id, self.__requester_id, id=54)
+        # Refreshed once after 0.1s; the refreshed key is not read, so
+        # it is not refreshed again after 0.2s
+        time.sleep(0.35)
+        self.assertEqual(self.__work_order.calls, [None, "1"])
+        cache.get(self.__worker_id, self.__requester_id, id=55)
+        self.assertEqual(len(self.__work_order.calls), 2)
+        cache.clear()
+
+    def test_invalidate(self):
+        cache = EncryptionKeyCache(self.__work_order, background_refresh=False)
+        cache.get(self.__worker_id, self.__requester_id, id=48)
+        cache.invalidate(self.__worker_id)
+        cache.get(self.__worker_id, self.__requester_id, id=49)
+        self.assertEqual(len(self.__work_order.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+import time
+
+import handler.flow_control as flow_control
+from handler.flow_control import TokenBucket, AdaptiveConcurrencyLimiter, \
+    FlowControl, FlowControlTimeout
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestFlowControl(unittest.TestCase):
+    def test_token_bucket_rate(self):
+        bucket = TokenBucket(rate=50, burst=5)
+        start = time.monotonic()
+        for _ in range(15):
+            self.assertTrue(bucket.acquire())
+        # 5 tokens of burst, the other 10 at 50 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_token_bucket_timeout(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        self.assertTrue(bucket.acquire(0))
+        self.assertFalse(bucket.acquire(0.01))
+
+    def test_limit_increases_on_success(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=5)
+        for _ in range(5):
+            slots = limiter.limit
+            for _ in range(slots):
+                self.assertTrue(limiter.acquire(0))
+            for _ in range(slots):
+                limiter.release(flow_control.SUCCESS)
+        self.assertEqual(limiter.limit, 5)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_limit_unchanged_while_underutilized(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+        for _ in range(100):
+            self.assertTrue(limiter.acquire(0))
+            limiter.release(flow_control.SUCCESS)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_limit_cut_once_per_window(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16, min_limit=1)
+        for _ in range(16):
+            self.assertTrue(limiter.acquire(0))
+        # One overload episode answered BUSY for every request in flight
+        for _ in range(16):
+            limiter.release(flow_control.BUSY)
+        self.assertEqual(limiter.limit, 8)
+        # Requests sent after the cut may cut again
+        limiter.acquire(0)
+        limiter.release(flow_control.TIMEOUT)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_limit_decreases_on_busy_and_timeout(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16, min_limit=2)
+        limiter.acquire(0)
+        limiter.release(flow_control.BUSY)
+        self.assertEqual(limiter.limit, 8)
+        limiter.acquire(0)
+        limiter.release(flow_control.ERROR)
+        self.assertEqual(limiter.limit, 8)
+        for _ in range(5):
+            limiter.acquire(0)
+            limiter.release(flow_control.TIMEOUT)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_concurrency_limit_enforced(self):
+        control = FlowControl(initial_limit=2, max_wait_secs=0.05)
+        control.acquire()
+        control.acquire()
+        self.assertRaises(FlowControlTimeout, control.acquire)
+        control.release(flow_control.SUCCESS)
+        control.acquire()
+
+    def test_shared_per_url(self):
+        url = "http://localhost:1947"
+        self.assertIsNone(flow_control.get_flow_control(url))
+        first = flow_control.get_flow_control(url, {"rate": 10})
+        second = flow_control.get_flow_control(url, {"rate": 20})
+        self.assertIs(first, second)
+        flow_control.remove_flow_control(url)
+        self.assertIsNone(flow_control.get_flow_control(url))
+
+
+if __name__ == "__main__":
+    unittest.main()
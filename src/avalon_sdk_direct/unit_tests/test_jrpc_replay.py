@@ -0,0 +1,169 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from enums.worker import WorkerType
+from avalon_sdk_direct.jrpc_replay import ReplayListener, Replayer, \
+    load_recording
+from avalon_sdk_direct.jrpc_worker_registry import JRPCWorkerRegistryImpl
+from avalon_sdk_direct.mock_listener import MockListener
+from handler.http_jrpc_client import HttpJrpcClient, MessageException
+import handler.jrpc_recording as jrpc_recording
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+_LOOKUP = '{"jsonrpc": "2.0", "method": "WorkerLookUp", "id": 5, ' \
+    '"params": {"workerType": 1}}'
+
+
+class TestJrpcReplay(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.listener = MockListener(workers=2, seed=5).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.listener.stop()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.listener.http_error_rate = 0.0
+        self.listener.error_rate = 0.0
+
+    def tearDown(self):
+        jrpc_recording.set_recorder(None)
+        self.directory.cleanup()
+
+    def __record(self, name):
+        """Record lookups, a retrieve and an HTTP error."""
+        path = os.path.join(self.directory.name, name)
+        registry = JRPCWorkerRegistryImpl({"json_rpc_uri": self.listener.url})
+        with jrpc_recording.JrpcRecorder(path) as recorder:
+            jrpc_recording.set_recorder(recorder)
+            for _ in range(2):
+                registry.worker_lookup(WorkerType.TEE_SGX, None, None, 1)
+            registry.worker_retrieve(self.listener.worker_ids[0], 2)
+            self.listener.http_error_rate = 1.0
+            with self.assertRaises(MessageException):
+                HttpJrpcClient(self.listener.url)._postmsg(_LOOKUP)
+            self.listener.http_error_rate = 0.0
+            jrpc_recording.set_recorder(None)
+            self.assertEqual(recorder.records, 4)
+        return path
+
+    def test_record(self):
+        for name in ("traffic.jsonl", "traffic.jsonl.gz"):
+            records = load_recording(self.__record(name))
+            self.assertEqual([record["method"] for record in records],
+                             ["WorkerLookUp", "WorkerLookUp",
+                              "WorkerRetrieve", "WorkerLookUp"])
+            self.assertEqual(records[0]["url"], self.listener.url)
+            self.assertEqual(records[0]["response"]["result"]["ids"],
+                             self.listener.worker_ids)
+            self.assertEqual(records[2]["request"]["params"]["workerId"],
+                             self.listener.worker_ids[0])
+            self.assertEqual(records[3]["status"], 503)
+            self.assertNotIn("response", records[3])
+            self.assertTrue(all(record["duration"] > 0
+                                for record in records))
+
+    def test_append_and_cut_short(self):
+        path = self.__record("traffic.jsonl")
+        self.__record("traffic.jsonl")
+        with open(path, "a") as f:
+            f.write('{"time": 1')
+        self.assertEqual(len(load_recording(path)), 8)
+
+        path = self.__record("traffic.jsonl.gz")
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data + gzip.compress(b'{"time": 1}\n' * 100)[:20])
+        self.assertEqual(len(load_recording(path)), 4)
+
+    def test_recording_failure(self):
+        class FullDisk(object):
+            def record(self, *args, **kwargs):
+                raise OSError(28, "No space left on device")
+
+        jrpc_recording.set_recorder(FullDisk())
+        client = HttpJrpcClient(self.listener.url)
+        self.assertEqual(client._postmsg(_LOOKUP)["result"]["ids"],
+                         self.listener.worker_ids)
+        # The error of the request is raised, not the recording failure
+        self.listener.http_error_rate = 1.0
+        with self.assertRaises(MessageException):
+            client._postmsg(_LOOKUP)
+
+    def test_replay_listener(self):
+        records = load_recording(self.__record("traffic.jsonl"))
+        with ReplayListener(records, latency_scale=0) as replay:
+            client = HttpJrpcClient(replay.url)
+            response = client._postmsg(_LOOKUP.replace('"id": 5', '"id": 9'))
+            self.assertEqual(response["id"], 9)
+            self.assertEqual(response["result"]["ids"],
+                             self.listener.worker_ids)
+            # Repeated requests get the recorded responses in turn
+            self.assertIn("result", client._postmsg(_LOOKUP))
+            with self.assertRaises(MessageException) as context:
+                client._postmsg(_LOOKUP)
+            self.assertEqual(context.exception.__cause__.code, 503)
+
+            registry = JRPCWorkerRegistryImpl({"json_rpc_uri": replay.url})
+            worker = registry.worker_retrieve("ab" * 32, 3)
+            self.assertEqual(worker["id"], 3)
+            self.assertIn("details", worker["result"])
+            response = client._postmsg(
+                '{"jsonrpc": "2.0", "method": "WorkOrderSubmit", "id": 1}')
+            self.assertEqual(response["error"]["code"], -32601)
+        self.assertEqual(replay.match_counts,
+                         {"exact": 3, "method": 1, "missing": 1})
+
+    def test_replayer(self):
+        records = load_recording(self.__record("traffic.jsonl"))
+        replayer = Replayer(records, self.listener.url, speed=0)
+        report = replayer.report(replayer.run())
+        self.assertEqual(report["requests"], 4)
+        # The recorded HTTP error is not injected on replay
+        self.assertEqual(report["mismatches"], 1)
+        lookup = report["methods"]["WorkerLookUp"]
+        self.assertEqual(lookup["outcomes"], {"SUCCESS": 3})
+        self.assertEqual(lookup["latency_ms"]["count"], 3)
+        self.assertEqual(lookup["recorded_latency_ms"]["count"], 3)
+        json.dumps(report)
+
+        self.listener.error_rate = 1.0
+        replayer = Replayer(records[:3], self.listener.url, speed=0)
+        replayer.run()
+        self.assertEqual(replayer.mismatches, 3)
+
+    def test_replayer_rate(self):
+        records = [{"time": 100.0 + i * 0.05, "duration": 0.001,
+                    "request": json.loads(_LOOKUP),
+                    "response": {"result": {}}} for i in range(5)]
+        replayer = Replayer(records, self.listener.url, speed=2)
+        elapsed = replayer.run()
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertEqual(replayer.mismatches, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from utility.latency_histogram import LatencyHistogram
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 100001):
+            histogram.record(value / 1e6)
+        self.assertEqual(histogram.count, 100000)
+        # Within the 1/128 bucket precision of the exact percentiles
+        for percent in (50, 90, 99, 99.9):
+            exact = percent / 1000
+            self.assertAlmostEqual(histogram.percentile(percent), exact,
+                                   delta=exact / 128)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        summary = histogram.to_dict()
+        self.assertEqual(summary["min"], 0.001)
+        self.assertEqual(summary["max"], 100.0)
+        self.assertEqual(summary["distribution"][-1], [100, 100.0])
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(histogram.to_dict(), {"count": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from enums.error_code import WorkOrderStatus
+from avalon_sdk_direct.load_generator import LoadGenerator, TIMEOUT
+from avalon_sdk_direct.mock_listener import MockListener
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestLoadGenerator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.listener = MockListener(workers=2, seed=3).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.listener.stop()
+
+    def setUp(self):
+        self.listener.busy_rate = 0.0
+        self.listener.pending_secs = 0.0
+
+    def test_open_loop(self):
+        generator = LoadGenerator(
+            self.listener.url, payloads=[(256, 1, 1), (4096, 2, 1)],
+            poll_interval_secs=0.001, seed=1)
+        elapsed = generator.run_open_loop(200, work_orders=10,
+                                          concurrency=4, poisson=True)
+        report = generator.report(elapsed)
+        self.assertEqual(report["work_orders"], 10)
+        self.assertEqual(report["outcomes"],
+                         {WorkOrderStatus.SUCCESS.name: 10})
+        self.assertEqual(report["latency_ms"]["round_trip"]["count"], 10)
+        self.assertEqual(generator.in_flight, 0)
+
+    def test_closed_loop_outcomes(self):
+        generator = LoadGenerator(
+            self.listener.url, workers=[(self.listener.worker_ids[1], 1)],
+            poll_interval_secs=0.001, timeout_secs=0.05, seed=1)
+        self.listener.busy_rate = 1.0
+        generator.run_closed_loop(2, work_orders=4)
+        self.assertEqual(generator.outcomes,
+                         {WorkOrderStatus.BUSY.name: 4})
+
+        self.listener.busy_rate = 0.0
+        self.listener.pending_secs = 10.0
+        generator.run_closed_loop(1, work_orders=1)
+        self.assertEqual(generator.outcomes[TIMEOUT], 1)
+        self.assertEqual(generator.latency.count, 0)
+        self.assertEqual(generator.submit_latency.count, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
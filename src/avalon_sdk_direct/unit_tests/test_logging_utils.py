@@ -0,0 +1,145 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import logging
+import secrets
+import unittest
+
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from avalon_crypto_utils.worker_signing import WorkerSign
+from avalon_sdk_direct.jrpc_work_order import JRPCWorkOrderImpl
+from avalon_sdk_direct.mock_listener import MockListener
+import utility.logging_utils as logging_utils
+from work_order.work_order_params import WorkOrderParams
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class TestLoggingUtils(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        self.root_handlers = list(root.handlers)
+        self.root_level = root.level
+
+    def tearDown(self):
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in self.root_handlers:
+            root.addHandler(handler)
+        root.setLevel(self.root_level)
+
+    def test_capped(self):
+        self.assertEqual(str(logging_utils.capped("abcdef", 4)),
+                         "abcd...(2 more chars)")
+        self.assertEqual(str(logging_utils.capped(b"abc", 4)), "b'abc'")
+        self.assertEqual(str(logging_utils.capped(bytes(100), 8)),
+                         "b'\\x00\\x...(92 more bytes)")
+
+        class Expensive(object):
+            calls = 0
+
+            def __str__(self):
+                Expensive.calls += 1
+                return "x"
+        logging.getLogger(__name__).debug(
+            "%s", logging_utils.capped(Expensive()))
+        self.assertEqual(Expensive.calls, 0)
+
+    def test_sampling_filter(self):
+        sampling = logging_utils.SamplingFilter(2, interval_secs=3600)
+        records = [logging.LogRecord("x", logging.INFO, "f.py", 1, "m", (),
+                                     None) for _ in range(5)]
+        self.assertEqual([sampling.filter(r) for r in records],
+                         [True, True, False, False, False])
+        warning = logging.LogRecord("x", logging.WARNING, "f.py", 1, "m",
+                                    (), None)
+        self.assertTrue(sampling.filter(warning))
+        other = logging.LogRecord("x", logging.INFO, "f.py", 2, "m", (),
+                                  None)
+        self.assertTrue(sampling.filter(other))
+
+    def test_queue_logging_structured(self):
+        stream = io.StringIO()
+        listener = logging_utils.configure_logging(
+            logging.INFO, [logging.StreamHandler(stream)], structured=True,
+            max_chars=16)
+        logger = logging.getLogger("test_queue_logging")
+        logger.info("Submitted %s", "a" * 40,
+                    extra={"work_order_id": "01"})
+        try:
+            raise ValueError("failed")
+        except ValueError:
+            logger.exception("Error")
+        listener.stop()
+        first, second = [json.loads(line)
+                         for line in stream.getvalue().splitlines()]
+        self.assertEqual(first["message"],
+                         "Submitted aaaaaa...(34 more chars)")
+        self.assertEqual(first["work_order_id"], "01")
+        self.assertEqual(first["level"], "INFO")
+        self.assertTrue(second["exception"].startswith("("))
+        self.assertTrue(second["exception"].endswith(
+            "ValueError: failed"))
+
+    def test_no_payload_logging(self):
+        capture = _Capture()
+        root = logging.getLogger()
+        root.addHandler(capture)
+        root.setLevel(logging.DEBUG)
+        secret = "secret-" + secrets.token_hex(8)
+        with MockListener(seed=13) as listener:
+            encrypt = WorkerEncrypt()
+            session_key = encrypt.generate_session_key()
+            session_iv = encrypt.generate_iv()
+            signer = WorkerSign()
+            signer.generate_signing_key()
+            work_order_id = secrets.token_hex(32)
+            params = WorkOrderParams()
+            params.create_request(
+                work_order_id, listener.worker_ids[0],
+                "echo".encode("UTF-8").hex(), secrets.token_hex(32),
+                session_key, session_iv, secrets.token_hex(16),
+                worker_encryption_key=listener.encryption_key,
+                data_encryption_algorithm="AES-GCM-256")
+            params.add_in_data(secret)
+            params.add_encrypted_request_hash()
+            params.add_requester_signature(signer)
+            in_data = params.get_in_data()[0]["data"]
+            work_order = JRPCWorkOrderImpl({"json_rpc_uri": listener.url})
+            work_order.work_order_submit(params.to_string(), 1)
+            response = work_order.work_order_get_result(work_order_id, 2)
+            out_data = encrypt.decrypt_work_order_data_json(
+                response["result"]["outData"], session_key, session_iv)
+        self.assertEqual(out_data[0]["data"], secret.encode("UTF-8"))
+        self.assertTrue(capture.messages)
+        for message in capture.messages:
+            self.assertNotIn(secret, message)
+            self.assertNotIn(in_data, message)
+
+
+if __name__ == "__main__":
+    unittest.main()
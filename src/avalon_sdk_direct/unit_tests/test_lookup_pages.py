@@ -0,0 +1,85 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from avalon_sdk_direct.lookup_pages import LookupPages
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class _Listener(object):
+    """
+    Serves lookup pages of two IDs. The lookup tag is the index of the
+    next page.
+    """
+
+    def __init__(self, ids, total_count=True, repeat_tag=False):
+        self.ids = ids
+        self.total_count = total_count
+        self.repeat_tag = repeat_tag
+        self.calls = []
+
+    def lookup(self):
+        return self.lookup_next("0")
+
+    def lookup_next(self, lookup_tag):
+        self.calls.append(lookup_tag)
+        start = int(lookup_tag)
+        result = {"ids": self.ids[start:start + 2],
+                  "lookupTag": lookup_tag if self.repeat_tag
+                  else str(start + 2)}
+        if self.total_count:
+            result["totalCount"] = len(self.ids)
+        return {"jsonrpc": "2.0", "id": 1, "result": result}
+
+
+class TestLookupPages(unittest.TestCase):
+    def test_stops_at_total_count(self):
+        listener = _Listener(["a", "b", "c", "d"])
+        pages = LookupPages(listener.lookup, listener.lookup_next)
+        self.assertEqual([r["ids"] for r in pages], [["a", "b"], ["c", "d"]])
+        self.assertEqual(listener.calls, ["0", "2"])
+        self.assertFalse(pages.failed)
+
+    def test_stops_at_empty_page(self):
+        listener = _Listener(["a", "b", "c"], total_count=False)
+        pages = LookupPages(listener.lookup, listener.lookup_next)
+        self.assertEqual([r["ids"] for r in pages],
+                         [["a", "b"], ["c"], []])
+
+    def test_max_pages(self):
+        listener = _Listener(["a", "b", "c"], total_count=False,
+                             repeat_tag=True)
+        pages = LookupPages(listener.lookup, listener.lookup_next,
+                            max_pages=5)
+        self.assertEqual(len(list(pages)), 5)
+        self.assertEqual(len(listener.calls), 5)
+
+    def test_error_response(self):
+        listener = _Listener(["a", "b", "c"])
+
+        def lookup_next(lookup_tag):
+            return {"jsonrpc": "2.0", "id": 1,
+                    "error": {"code": 2, "message": "invalid lookup tag"}}
+
+        pages = LookupPages(listener.lookup, lookup_next, "Worker lookup")
+        self.assertEqual([r["ids"] for r in pages], [["a", "b"]])
+        self.assertTrue(pages.failed)
+
+
+if __name__ == "__main__":
+    unittest.main()
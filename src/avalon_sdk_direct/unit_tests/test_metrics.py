@@ -0,0 +1,172 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import secrets
+import unittest
+import urllib.request
+
+from enums.worker import WorkerType
+import handler.flow_control as flow_control
+import handler.metrics as metrics
+from avalon_sdk_direct.jrpc_work_order import JRPCWorkOrderImpl
+from avalon_sdk_direct.jrpc_worker_registry import JRPCWorkerRegistryImpl
+from avalon_sdk_direct.load_generator import LoadGenerator
+from avalon_sdk_direct.mock_listener import MockListener
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry()
+
+    def test_exposition(self):
+        counter = self.registry.counter(
+            "requests_total", "Requests", ("method",))
+        counter.labels("Get").inc()
+        counter.labels("Get").inc(2)
+        counter.labels('Say "hi"\n').inc()
+        gauge = self.registry.gauge("in_flight", "In flight")
+        gauge.labels().inc()
+        gauge.labels().dec(3)
+        histogram = self.registry.histogram(
+            "latency_seconds", "Latency", buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.labels().observe(value)
+        self.assertIs(self.registry.counter(
+            "requests_total", "Requests", ("method",)), counter)
+        self.assertEqual(self.registry.exposition(), "\n".join([
+            "# HELP requests_total Requests",
+            "# TYPE requests_total counter",
+            'requests_total{method="Get"} 3',
+            'requests_total{method="Say \\"hi\\"\\n"} 1',
+            "# HELP in_flight In flight",
+            "# TYPE in_flight gauge",
+            "in_flight -2",
+            "# HELP latency_seconds Latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 2.65",
+            "latency_seconds_count 4",
+            ""]))
+
+    def test_invalid_use(self):
+        counter = self.registry.counter("c_total", "C", ("a", "b"))
+        with self.assertRaises(ValueError):
+            counter.labels("x")
+        with self.assertRaises(ValueError):
+            counter.labels("x", "y").inc(-1)
+        with self.assertRaises(ValueError):
+            self.registry.gauge("c_total", "C")
+
+    def test_gauge_function_and_http_server(self):
+        gauge = self.registry.gauge("slots", "Slots", ("url",))
+        gauge.labels("http://a").set_function(lambda: 7)
+        server = metrics.start_http_server(0, registry=self.registry)
+        try:
+            url = "http://localhost:{}/metrics".format(
+                server.server_address[1])
+            with urllib.request.urlopen(url) as response:
+                self.assertEqual(response.headers["Content-Type"],
+                                 metrics.CONTENT_TYPE)
+                body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('slots{url="http://a"} 7\n', body)
+
+
+class TestSdkMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.listener = MockListener(seed=5).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.listener.stop()
+
+    @staticmethod
+    def value(name, *label_values):
+        return metrics.REGISTRY.get(name).labels(*label_values).value
+
+    def test_request_metrics(self):
+        config = {"json_rpc_uri": self.listener.url}
+        requests = self.value("avalon_jrpc_requests_total",
+                              "WorkerLookUp", "success")
+        errors = self.value("avalon_jrpc_error_responses_total",
+                            "WorkerRetrieve", "2")
+        registry = JRPCWorkerRegistryImpl(config)
+        registry.worker_lookup(WorkerType.TEE_SGX, None, None, 1)
+        registry.worker_retrieve("00" * 32, 2)
+        self.assertEqual(self.value("avalon_jrpc_requests_total",
+                                    "WorkerLookUp", "success"),
+                         requests + 1)
+        self.assertEqual(self.value("avalon_jrpc_error_responses_total",
+                                    "WorkerRetrieve", "2"), errors + 1)
+        latency = metrics.REGISTRY.get(
+            "avalon_jrpc_request_duration_seconds").labels("WorkerLookUp")
+        self.assertGreaterEqual(latency.count, 1)
+        self.assertGreater(metrics.REGISTRY.get(
+            "avalon_jrpc_response_bytes").labels("WorkerLookUp").sum, 0)
+        self.assertEqual(self.value("avalon_jrpc_requests_in_flight"), 0)
+
+    def test_pending_polls(self):
+        pending_polls = metrics.REGISTRY.get(
+            "avalon_work_order_pending_polls").labels()
+        count, total = pending_polls.count, pending_polls.sum
+        generator = LoadGenerator(self.listener.url,
+                                  poll_interval_secs=0.01)
+        self.listener.pending_secs = 0.05
+        try:
+            self.assertEqual(generator.run_one(), "SUCCESS")
+        finally:
+            self.listener.pending_secs = 0.0
+        self.assertEqual(pending_polls.count, count + 1)
+        self.assertGreaterEqual(pending_polls.sum, total + 2)
+
+    def test_pending_polls_only_for_polled_work_orders(self):
+        pending_polls = metrics.REGISTRY.get(
+            "avalon_work_order_pending_polls").labels()
+        work_order_id = secrets.token_hex(32)
+        self.listener.handle({"jsonrpc": "2.0", "id": 1,
+                              "method": "WorkOrderSubmit",
+                              "params": {"workOrderId": work_order_id}})
+        work_order = JRPCWorkOrderImpl({"json_rpc_uri": self.listener.url})
+        count = pending_polls.count
+        # Finished before the first poll, then fetched again
+        get_result = work_order.work_order_get_result_nonblocking
+        for id in (2, 3):
+            self.assertIn("result", get_result(work_order_id, id))
+        self.assertIn("error", get_result(secrets.token_hex(32), 4))
+        self.assertEqual(pending_polls.count, count)
+
+    def test_flow_control_gauges(self):
+        url = self.listener.url + "/flow"
+        flow_control.get_flow_control(url, {"initial_limit": 3})
+        try:
+            exposition = metrics.REGISTRY.exposition()
+            self.assertIn(
+                'avalon_flow_control_limit{{url="{}"}} 3\n'.format(url),
+                exposition)
+        finally:
+            flow_control.remove_flow_control(url)
+        self.assertNotIn(url, metrics.REGISTRY.exposition())
+
+
+if __name__ == "__main__":
+    unittest.main()
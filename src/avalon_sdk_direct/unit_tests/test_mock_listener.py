@@ -0,0 +1,159 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import secrets
+import threading
+import time
+import unittest
+
+from enums.error_code import WorkOrderStatus, ReceiptCreateStatus
+from enums.worker import WorkerType
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from avalon_crypto_utils.worker_signing import WorkerSign
+from avalon_sdk_direct.jrpc_work_order import JRPCWorkOrderImpl
+from avalon_sdk_direct.jrpc_work_order_receipt import \
+    JRPCWorkOrderReceiptImpl
+from avalon_sdk_direct.jrpc_worker_registry import JRPCWorkerRegistryImpl
+from avalon_sdk_direct.mock_listener import MockListener
+from work_order.work_order_params import WorkOrderParams
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestMockListener(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.listener = MockListener(workers=3, lookup_page_size=2,
+                                    seed=7).start()
+        cls.config = {"json_rpc_uri": cls.listener.url}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.listener.stop()
+
+    def setUp(self):
+        self.listener.busy_rate = 0.0
+        self.listener.pending_secs = 0.0
+
+    def test_worker_lookup(self):
+        registry = JRPCWorkerRegistryImpl(self.config)
+        response = registry.worker_lookup(WorkerType.TEE_SGX, None, None, 1)
+        self.assertEqual(response["result"]["totalCount"], 3)
+        ids = response["result"]["ids"]
+        response = registry.worker_lookup_next(
+            response["result"]["lookupTag"], WorkerType.TEE_SGX, None, None,
+            2)
+        ids += response["result"]["ids"]
+        self.assertEqual(ids, self.listener.worker_ids)
+        worker = registry.worker_retrieve(ids[0], 3)["result"]
+        self.assertEqual(
+            worker["details"]["workerTypeData"]["verificationKey"],
+            self.listener.verification_key)
+
+    def test_work_order_round_trip(self):
+        self.listener.pending_secs = 0.2
+        worker_id = self.listener.worker_ids[0]
+        encrypt = WorkerEncrypt()
+        session_key = encrypt.generate_session_key()
+        session_iv = encrypt.generate_iv()
+        signer = WorkerSign()
+        signer.generate_signing_key()
+        work_order_id = secrets.token_hex(32)
+        params = WorkOrderParams()
+        params.create_request(
+            work_order_id, worker_id, "echo".encode("UTF-8").hex(),
+            secrets.token_hex(32), session_key, session_iv,
+            secrets.token_hex(16),
+            worker_encryption_key=self.listener.encryption_key,
+            data_encryption_algorithm="AES-GCM-256")
+        params.add_in_data("Hello mock")
+        params.add_encrypted_request_hash()
+        self.assertTrue(params.add_requester_signature(signer))
+
+        work_order = JRPCWorkOrderImpl(self.config)
+        response = work_order.work_order_submit(params.to_string(), 1)
+        self.assertEqual(response["error"]["code"], WorkOrderStatus.PENDING)
+        response = work_order.work_order_get_result_nonblocking(
+            work_order_id, 2)
+        self.assertEqual(response["error"]["code"], WorkOrderStatus.PENDING)
+        time.sleep(0.2)
+        response = work_order.work_order_get_result_nonblocking(
+            work_order_id, 3)
+        self.assertEqual(
+            WorkerSign().verify_signature(
+                response["result"], self.listener.verification_key),
+            1)
+        out_data = encrypt.decrypt_work_order_data_json(
+            response["result"]["outData"], session_key, session_iv)
+        self.assertEqual(out_data[0]["data"], b"Hello mock")
+
+    def test_receipts(self):
+        receipts = JRPCWorkOrderReceiptImpl(self.config)
+        worker_id = self.listener.worker_ids[1]
+        work_order_ids = [secrets.token_hex(32) for _ in range(3)]
+        for work_order_id in work_order_ids:
+            response = receipts.work_order_receipt_create(
+                work_order_id, worker_id, worker_id, secrets.token_hex(32),
+                ReceiptCreateStatus.PENDING.value, "aGFzaA==", "0a",
+                "c2lnbmF0dXJl", "SHA-256/SECP256K1", "key", 1)
+            self.assertEqual(response["error"]["code"], 0)
+        response = receipts.work_order_receipt_lookup(
+            worker_id, worker_id, None, id=2)
+        self.assertEqual(response["result"]["totalCount"], 3)
+        self.assertEqual(response["result"]["ids"], work_order_ids[:2])
+        response = receipts.work_order_receipt_retrieve(work_order_ids[0], 3)
+        self.assertEqual(response["result"]["workerId"], worker_id)
+
+    def test_busy_injection(self):
+        self.listener.busy_rate = 1.0
+        registry = JRPCWorkerRegistryImpl(self.config)
+        response = registry.worker_retrieve(self.listener.worker_ids[0], 1)
+        self.assertEqual(response["error"]["code"], WorkOrderStatus.BUSY)
+
+
+    def test_concurrent_requests(self):
+        listener = MockListener(seed=3)
+        worker_id = listener.worker_ids[0]
+        work_order_id = secrets.token_hex(32)
+        listener.handle({"jsonrpc": "2.0", "id": 1,
+                         "method": "WorkOrderSubmit",
+                         "params": {"workOrderId": work_order_id,
+                                    "workerId": worker_id}})
+        results = []
+
+        def send():
+            for i in range(50):
+                listener.handle({"jsonrpc": "2.0", "id": i,
+                                 "method": "WorkerRetrieve",
+                                 "params": {"workerId": worker_id}})
+                results.append(listener.handle(
+                    {"jsonrpc": "2.0", "id": i,
+                     "method": "WorkOrderGetResult",
+                     "params": {"workOrderId": work_order_id}})["result"])
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(listener.request_counts["WorkerRetrieve"], 400)
+        self.assertEqual(listener.request_counts["WorkOrderGetResult"], 400)
+        # Every request gets the result stored first
+        self.assertTrue(all(result is results[0] for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
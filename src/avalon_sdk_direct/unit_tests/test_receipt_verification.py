@@ -0,0 +1,101 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+import avalon_crypto_utils.crypto_utility as crypto_utility
+from avalon_crypto_utils.worker_signing import WorkerSign
+from avalon_crypto_utils.worker_hash import WorkerHash
+from avalon_crypto_utils import receipt_verification
+from avalon_crypto_utils.receipt_verification import BulkReceiptVerifier
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+def _sign(signer, message):
+    digest = WorkerHash().compute_message_hash(message.encode("UTF-8"))
+    return crypto_utility.byte_array_to_base64(signer.sign_message(digest))
+
+
+def _create_record(signer, work_order_id):
+    params = {
+        "workOrderId": work_order_id, "workerServiceId": "0b",
+        "workerId": "0c", "requesterId": "0d", "receiptCreateStatus": 0,
+        "workOrderRequestHash": "0e", "requesterGeneratedNonce": "0f",
+        "receiptVerificationKey":
+            signer.get_public_sign_key().decode("ascii")}
+    params["requesterSignature"] = _sign(
+        signer, work_order_id + "0b0c0d00e0f")
+    return {"params": params}
+
+
+def _update_record(signer, work_order_id):
+    return {
+        "workOrderId": work_order_id, "updateType": 1,
+        "updateData": "data",
+        "updateSignature": _sign(signer, work_order_id + "1data"),
+        "receiptVerificationKey":
+            signer.get_public_sign_key().decode("ascii")}
+
+
+class TestBulkReceiptVerifier(unittest.TestCase):
+    def setUp(self):
+        self.__signer = WorkerSign()
+        self.__signer.generate_signing_key()
+        self.__records = []
+        for i in range(20):
+            self.__records.append(
+                _create_record(self.__signer, "%02x" % i))
+            self.__records.append(
+                _update_record(self.__signer, "%02x" % i))
+        # Tampered receipt and a record missing fields
+        self.__records[4]["params"]["requesterId"] = "ff"
+        self.__records.append({"workOrderId": "aa"})
+
+    def test_matches_single_verification(self):
+        self.assertTrue(self.__signer.verify_create_receipt_signature(
+            self.__records[0]))
+        self.assertTrue(self.__signer.verify_update_receipt_signature(
+            self.__records[1]))
+        self.assertFalse(self.__signer.verify_create_receipt_signature(
+            self.__records[4]))
+
+    def __check(self, verifier):
+        results = sorted(verifier.verify(iter(self.__records)))
+        self.assertEqual([r.index for r in results],
+                         list(range(len(self.__records))))
+        failed = [r for r in results if not r.passed]
+        self.assertEqual([r.index for r in failed], [4, 40])
+        self.assertEqual(failed[0].kind, receipt_verification.RECEIPT_CREATE)
+        self.assertEqual(failed[0].error, "Signature mismatch")
+        self.assertTrue(failed[1].error.startswith("Invalid record"))
+        self.assertEqual(results[1].kind, receipt_verification.RECEIPT_UPDATE)
+        self.assertEqual(results[1].work_order_id, "00")
+        self.assertEqual((verifier.verified, verifier.failed), (39, 2))
+
+    def test_in_process(self):
+        progress = []
+        verifier = BulkReceiptVerifier(
+            processes=1, batch_size=8, progress_callback=progress.append)
+        self.__check(verifier)
+        self.assertEqual(progress[-1].verified, 39)
+
+    def test_process_pool(self):
+        self.__check(BulkReceiptVerifier(processes=2, batch_size=8))
+
+
+if __name__ == "__main__":
+    unittest.main()
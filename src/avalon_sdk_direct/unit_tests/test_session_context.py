@@ -0,0 +1,110 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import secrets
+import time
+import unittest
+
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from work_order.session_context import WorkOrderSessionContext
+from work_order.work_order_params import WorkOrderParams
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestWorkOrderSessionContext(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.worker = WorkerEncrypt()
+        cls.worker.generate_rsa_key()
+        cls.encryption_key = cls.worker.get_rsa_public_key().decode("UTF-8")
+        cls.worker_id = secrets.token_hex(32)
+        cls.requester_id = secrets.token_hex(32)
+
+    def __create(self, context, count):
+        params = []
+        for _ in range(count):
+            work_order = context.create_params(
+                secrets.token_hex(32), self.worker_id,
+                "echo".encode("UTF-8").hex(), self.requester_id,
+                secrets.token_hex(16))
+            self.assertIsInstance(work_order, WorkOrderParams)
+            params.append(work_order)
+        return params
+
+    def test_rotation_after_max_uses(self):
+        context = WorkOrderSessionContext(self.encryption_key, max_uses=3)
+        params = self.__create(context, 7)
+        keys = [work_order.session_key for work_order in params]
+        self.assertEqual(len(set(keys[0:3])), 1)
+        self.assertEqual(len(set(keys[3:6])), 1)
+        self.assertEqual(len(set(keys[::3])), 3)
+        encrypted_keys = [work_order.get_params()["encryptedSessionKey"]
+                          for work_order in params]
+        self.assertEqual(len(set(encrypted_keys)), 3)
+
+    def test_rotation_after_max_age(self):
+        context = WorkOrderSessionContext(self.encryption_key,
+                                          max_age_secs=0.2)
+        first, second = self.__create(context, 2)
+        self.assertEqual(first.session_key, second.session_key)
+        time.sleep(0.3)
+        third, = self.__create(context, 1)
+        self.assertNotEqual(first.session_key, third.session_key)
+
+    def test_rotate(self):
+        context = WorkOrderSessionContext(self.encryption_key)
+        first, = self.__create(context, 1)
+        context.rotate()
+        second, = self.__create(context, 1)
+        self.assertNotEqual(first.session_key, second.session_key)
+
+    def test_fresh_iv_per_work_order(self):
+        context = WorkOrderSessionContext(self.encryption_key)
+        params = self.__create(context, 20)
+        ivs = [work_order.get_session_key_iv() for work_order in params]
+        self.assertEqual(len(set(ivs)), 20)
+        for work_order, iv in zip(params, ivs):
+            self.assertEqual(bytes(work_order.session_iv).hex(), iv.lower())
+
+    def test_encrypted_session_key(self):
+        context = WorkOrderSessionContext(self.encryption_key)
+        for work_order in self.__create(context, 2):
+            encrypted_session_key = bytes.fromhex(
+                work_order.get_params()["encryptedSessionKey"])
+            self.assertEqual(
+                self.worker.decrypt_session_key(encrypted_session_key),
+                work_order.session_key)
+
+    def test_invalid_limits(self):
+        self.assertRaises(ValueError, WorkOrderSessionContext,
+                          self.encryption_key, max_uses=0)
+        self.assertRaises(
+            ValueError, WorkOrderSessionContext, self.encryption_key,
+            max_uses=WorkOrderSessionContext.MAX_USES_LIMIT + 1)
+        self.assertRaises(ValueError, WorkOrderSessionContext,
+                          self.encryption_key, max_age_secs=0)
+
+    def test_invalid_params(self):
+        context = WorkOrderSessionContext(self.encryption_key)
+        err = context.create_params(
+            secrets.token_hex(32), "not hex", "echo".encode("UTF-8").hex(),
+            self.requester_id, secrets.token_hex(16))
+        self.assertIn("error", err)
+
+
+if __name__ == "__main__":
+    unittest.main()
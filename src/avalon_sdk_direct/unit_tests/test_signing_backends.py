@@ -0,0 +1,131 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import logging
+import unittest
+
+import avalon_crypto_utils.signing_backends as signing_backends
+from avalon_crypto_utils.worker_signing import WorkerSign
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+_BACKENDS = signing_backends.available_backends()
+
+
+class TestSigningBackends(unittest.TestCase):
+    def test_ecdsa_fallback_available(self):
+        self.assertIn("ecdsa", _BACKENDS)
+        self.assertEqual(signing_backends.get_backend().name, _BACKENDS[0])
+
+    def test_signatures_verify_across_backends(self):
+        digests = [hashlib.sha256(bytes([i])).digest() for i in range(16)]
+        for signer_name in _BACKENDS:
+            signer = WorkerSign(signer_name)
+            signer.generate_signing_key()
+            pem = signer.get_public_sign_key()
+            signatures = [signer.sign_message(d) for d in digests]
+            # DER encoded SEQUENCE of two INTEGERs
+            self.assertTrue(all(s[0] == 0x30 and s[1] == len(s) - 2
+                                for s in signatures))
+            for verifier_name in _BACKENDS:
+                verifier = WorkerSign(verifier_name)
+                for signature, digest in zip(signatures, digests):
+                    self.assertTrue(verifier.verify_signature_from_pubkey(
+                        signature, digest, pem), (signer_name, verifier_name))
+                self.assertFalse(verifier.verify_signature_from_pubkey(
+                    signatures[0], digests[1], pem))
+                # Keys arrive as strings from JSON
+                self.assertTrue(verifier.verify_signature_from_pubkey(
+                    signatures[0], digests[0], pem.decode("ascii")))
+
+    @unittest.skipUnless("coincurve" in _BACKENDS, "coincurve not installed")
+    def test_coincurve_accepts_high_s(self):
+        ecdsa_backend = signing_backends.get_backend("ecdsa")
+        coincurve_backend = signing_backends.get_backend("coincurve")
+        key = ecdsa_backend.generate_key()
+        public_key = coincurve_backend.public_key(
+            ecdsa_backend.public_key_pem(key))
+        high_s = 0
+        for i in range(16):
+            digest = hashlib.sha256(bytes([i])).digest()
+            signature = ecdsa_backend.sign_digest(key, digest)
+            r, s = signing_backends._decode_der_signature(signature)
+            self.assertEqual(
+                signing_backends._encode_der_signature(r, s), signature)
+            high_s += s > signing_backends._CURVE_ORDER // 2
+            self.assertTrue(coincurve_backend.verify_digest(
+                public_key, signature, digest))
+        self.assertGreater(high_s, 0)
+
+    def test_ecdsa_signing_context_identical(self):
+        backend = signing_backends.get_backend("ecdsa")
+        key = backend.generate_key()
+        context = backend.signing_context(key)
+        digests = [hashlib.sha256(bytes([i])).digest() for i in range(32)]
+        digests += [bytes(32), b"\xff" * 32, b"short", bytearray(32)]
+        expected = [backend.sign_digest(key, d) for d in digests]
+        self.assertEqual([context.sign(d) for d in digests], expected)
+        self.assertEqual(context.sign_many(digests), expected)
+        self.assertEqual(context.sign_many([]), [])
+
+    def test_sign_many(self):
+        digests = [hashlib.sha256(bytes([i])).digest() for i in range(8)]
+        for name in _BACKENDS:
+            signer = WorkerSign(name)
+            signer.generate_signing_key()
+            pem = signer.get_public_sign_key()
+            signatures = signer.sign_many(digests)
+            self.assertEqual(len(signatures), len(digests))
+            for signature, digest in zip(signatures, digests):
+                self.assertTrue(signer.verify_signature_from_pubkey(
+                    signature, digest, pem), name)
+            # A new key gets a new signing context
+            context = signer.signing_context
+            self.assertIs(signer.signing_context, context)
+            signer.generate_signing_key()
+            self.assertIsNot(signer.signing_context, context)
+            self.assertTrue(signer.verify_signature_from_pubkey(
+                signer.sign_message(digests[0]), digests[0],
+                signer.get_public_sign_key()), name)
+
+    def test_backend_of_key(self):
+        for name in signing_backends.available_backends():
+            backend = signing_backends.get_backend(name)
+            self.assertIs(signing_backends.backend_of_key(
+                backend.generate_key()), backend)
+        with self.assertRaises(ValueError):
+            signing_backends.backend_of_key(b"not a key")
+
+    def test_public_key_pem_identical(self):
+        ecdsa_backend = signing_backends.get_backend("ecdsa")
+        key = ecdsa_backend.generate_key()
+        secret = key.to_string()
+        pem = ecdsa_backend.public_key_pem(key)
+        if "coincurve" in _BACKENDS:
+            import coincurve
+            self.assertEqual(signing_backends.get_backend(
+                "coincurve").public_key_pem(coincurve.PrivateKey(secret)),
+                pem)
+        if "cryptography" in _BACKENDS:
+            from cryptography.hazmat.primitives.asymmetric import ec
+            private_key = ec.derive_private_key(
+                int.from_bytes(secret, "big"), ec.SECP256K1())
+            self.assertEqual(signing_backends.get_backend(
+                "cryptography").public_key_pem(private_key), pem)
+
+
+if __name__ == "__main__":
+    unittest.main()
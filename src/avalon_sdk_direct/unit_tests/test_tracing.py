@@ -0,0 +1,170 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import http.server
+import importlib.util
+import logging
+import secrets
+import threading
+import unittest
+
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from avalon_crypto_utils.worker_signing import WorkerSign
+from avalon_sdk_direct.jrpc_work_order import JRPCWorkOrderImpl
+from avalon_sdk_direct.mock_listener import MockListener
+from handler.http_jrpc_client import HttpJrpcClient
+import utility.tracing as tracing
+from work_order.work_order_params import WorkOrderParams
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class _HeaderRecorder(http.server.BaseHTTPRequestHandler):
+    """Answers every request with an empty JSON RPC result."""
+
+    traceparents = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        _HeaderRecorder.traceparents.append(self.headers["traceparent"])
+        body = b'{"jsonrpc": "2.0", "id": 1, "result": {}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.tracer = tracing.RecordingTracer()
+        tracing.set_tracer(self.tracer)
+
+    def tearDown(self):
+        tracing.set_tracer(None)
+
+    def test_disabled(self):
+        tracing.set_tracer(None)
+        with tracing.span("noop", {"a": 1}) as span:
+            span.set_attribute("b", 2)
+        headers = {}
+        tracing.inject(headers)
+        self.assertEqual(headers, {})
+        self.assertEqual(len(self.tracer.spans), 0)
+
+    def test_nested_spans(self):
+        @tracing.traced("inner")
+        def inner():
+            raise ValueError("failed")
+
+        with tracing.span("outer", {"a": 1}) as outer:
+            with self.assertRaises(ValueError):
+                inner()
+        first, second = self.tracer.spans
+        self.assertEqual((first.name, second.name), ("inner", "outer"))
+        self.assertIs(second, outer)
+        self.assertEqual(first.trace_id, outer.trace_id)
+        self.assertEqual(first.parent_id, outer.span_id)
+        self.assertIsNone(outer.parent_id)
+        self.assertIn("failed", first.error)
+        self.assertEqual(outer.attributes, {"a": 1})
+        self.assertGreaterEqual(outer.duration, first.duration)
+
+    def test_trace_context_header(self):
+        server = http.server.ThreadingHTTPServer(
+            ("localhost", 0), _HeaderRecorder)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = HttpJrpcClient(
+                "http://localhost:{}".format(server.server_address[1]))
+            client._postmsg('{"jsonrpc": "2.0", "method": "Echo", "id": 1}')
+        finally:
+            server.shutdown()
+            server.server_close()
+        span, = self.tracer.spans
+        self.assertEqual(span.name, "Echo")
+        self.assertEqual(span.attributes["rpc.method"], "Echo")
+        self.assertEqual(_HeaderRecorder.traceparents, [span.traceparent])
+
+    def test_work_order_spans(self):
+        with MockListener(seed=11) as listener:
+            encrypt = WorkerEncrypt()
+            session_key = encrypt.generate_session_key()
+            session_iv = encrypt.generate_iv()
+            signer = WorkerSign()
+            signer.generate_signing_key()
+            work_order_id = secrets.token_hex(32)
+            params = WorkOrderParams()
+            params.create_request(
+                work_order_id, listener.worker_ids[0],
+                "echo".encode("UTF-8").hex(), secrets.token_hex(32),
+                session_key, session_iv, secrets.token_hex(16),
+                worker_encryption_key=listener.encryption_key,
+                data_encryption_algorithm="AES-GCM-256")
+            params.add_in_data("Hello")
+            params.add_encrypted_request_hash()
+            params.add_requester_signature(signer)
+            work_order = JRPCWorkOrderImpl({"json_rpc_uri": listener.url})
+            work_order.work_order_submit(params.to_string(), 1)
+            response = work_order.work_order_get_result(work_order_id, 2)
+            WorkerSign().verify_signature(
+                response["result"], listener.verification_key)
+            encrypt.decrypt_work_order_data_json(
+                response["result"]["outData"], session_key, session_iv)
+
+        names = [span.name for span in self.tracer.spans]
+        self.assertEqual(names, [
+            "WorkOrderParams.create_request",
+            "WorkOrderParams.add_in_data",
+            "WorkOrderParams.add_encrypted_request_hash",
+            "WorkOrderParams.add_requester_signature",
+            "WorkOrderSubmit",
+            "WorkOrderGetResult",
+            "work_order_poll",
+            "work_order_get_result",
+            "WorkerSign.verify_signature",
+            "WorkerEncrypt.decrypt_work_order_data_json",
+        ])
+        request, poll, get_result = list(self.tracer.spans)[5:8]
+        self.assertEqual(request.parent_id, poll.span_id)
+        self.assertEqual(poll.parent_id, get_result.span_id)
+        self.assertEqual(poll.attributes["work_order.poll"], 1)
+
+    @unittest.skipUnless(importlib.util.find_spec("opentelemetry"),
+                         "opentelemetry not installed")
+    def test_opentelemetry(self):
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter \
+            import InMemorySpanExporter
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracing.set_tracer(tracing.OpenTelemetryTracer(provider))
+        headers = {}
+        with tracing.span("outer", {"a": 1}):
+            tracing.inject(headers)
+        span, = exporter.get_finished_spans()
+        self.assertEqual(span.name, "outer")
+        self.assertIn("{:032x}".format(span.context.trace_id),
+                      headers["traceparent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import tempfile
+import unittest
+import urllib.error
+
+from enums.worker import WorkerType
+from avalon_sdk_direct.jrpc_worker_registry import JRPCWorkerRegistryImpl
+from avalon_sdk_direct.mock_listener import MockListener
+from handler.http_jrpc_client import HttpJrpcClient, MessageException
+import handler.unix_http as unix_http
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestUnixHttp(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.directory.name, "listener.sock")
+        cls.listener = MockListener(workers=2, seed=3,
+                                    unix_socket=cls.socket_path).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.listener.stop()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.listener.http_error_rate = 0.0
+
+    def test_socket_path(self):
+        self.assertEqual(unix_http.socket_path("unix:///run/a%20b.sock"),
+                         "/run/a b.sock")
+        self.assertEqual(unix_http.socket_path("unix://relative.sock"),
+                         "relative.sock")
+        self.assertRaises(ValueError, unix_http.socket_path, "unix://")
+        self.assertRaises(ValueError, unix_http.socket_path,
+                          "http://localhost/")
+
+    def test_round_trip(self):
+        self.assertTrue(self.listener.url.startswith("unix:///"))
+        registry = JRPCWorkerRegistryImpl(
+            {"json_rpc_uri": self.listener.url})
+        for _ in range(3):
+            response = registry.worker_lookup(WorkerType.TEE_SGX, None,
+                                              None, 1)
+            self.assertEqual(response["result"]["ids"],
+                             self.listener.worker_ids)
+
+    def test_http_error(self):
+        self.listener.http_error_rate = 1.0
+        client = HttpJrpcClient(self.listener.url)
+        with self.assertRaises(MessageException) as context:
+            client._postmsg('{"jsonrpc": "2.0", "method": "WorkerLookUp", '
+                            '"id": 1, "params": {}}')
+        self.assertIsInstance(context.exception.__cause__,
+                              urllib.error.HTTPError)
+        self.assertEqual(context.exception.__cause__.code, 503)
+
+    def test_no_listener(self):
+        client = HttpJrpcClient(
+            "unix://" + os.path.join(self.directory.name, "missing.sock"))
+        with self.assertRaises(MessageException) as context:
+            client._postmsg('{"jsonrpc": "2.0", "method": "WorkerLookUp", '
+                            '"id": 1, "params": {}}')
+        self.assertIsInstance(context.exception.__cause__,
+                              urllib.error.URLError)
+        self.assertIsInstance(context.exception.__cause__.reason,
+                              FileNotFoundError)
+
+
+if __name__ == "__main__":
+    unittest.main()
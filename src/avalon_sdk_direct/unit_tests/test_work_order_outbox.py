@@ -0,0 +1,208 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import unittest
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+from enums.error_code import WorkOrderStatus
+from avalon_sdk_direct import work_order_outbox
+from avalon_sdk_direct.work_order_outbox import WorkOrderOutbox
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class _WorkOrderStub(object):
+    """
+    Stand-in for JRPCWorkOrderImpl answering submit and get result
+    with configurable error codes.
+    """
+
+    def __init__(self, submit_code=WorkOrderStatus.SCHEDULED,
+                 known_ids=(), result_codes=None, submit_delay_secs=0):
+        self.submit_code = submit_code
+        self.known_ids = set(known_ids)
+        # work order ID -> error code returned by get result
+        self.result_codes = result_codes or {}
+        self.submit_delay_secs = submit_delay_secs
+        self.submitted = []
+        self.queried = []
+        self.lock = threading.Lock()
+
+    def work_order_submit(self, work_order_request, id=None):
+        time.sleep(self.submit_delay_secs)
+        with self.lock:
+            self.submitted.append(work_order_request)
+        return {"jsonrpc": "2.0", "id": id,
+                "error": {"code": self.submit_code, "message": "",
+                          "data": ""}}
+
+    def work_order_get_result_nonblocking(self, work_order_id, id=None):
+        with self.lock:
+            self.queried.append(work_order_id)
+        if work_order_id in self.known_ids:
+            return {"jsonrpc": "2.0", "id": id,
+                    "result": {"workOrderId": work_order_id}}
+        if work_order_id in self.result_codes:
+            return {"jsonrpc": "2.0", "id": id,
+                    "error": {"code": self.result_codes[work_order_id],
+                              "message": "", "data": ""}}
+        return {"jsonrpc": "2.0", "id": id,
+                "error": {
+                    "code": WorkOrderStatus.INVALID_PARAMETER_FORMAT_OR_VALUE,
+                    "message": "Work order Id not found", "data": ""}}
+
+
+class TestWorkOrderOutbox(unittest.TestCase):
+    def setUp(self):
+        self.__tmp_dir = tempfile.TemporaryDirectory()
+        self.__db_path = os.path.join(self.__tmp_dir.name, "outbox.db")
+
+    def tearDown(self):
+        self.__tmp_dir.cleanup()
+
+    def __wait_for(self, outbox, work_order_ids, status, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            states = [outbox.status(wo_id)[0] for wo_id in work_order_ids]
+            if all(state == status for state in states):
+                return True
+            time.sleep(0.02)
+        return False
+
+    def test_submit_and_ack(self):
+        stub = _WorkOrderStub()
+        outbox = WorkOrderOutbox(stub, self.__db_path, max_in_flight=4)
+        outbox.start()
+        wo_ids = [secrets.token_hex(32) for _ in range(20)]
+        for wo_id in wo_ids:
+            self.assertTrue(outbox.enqueue(wo_id, '{"workOrderId": "%s"}'
+                                           % wo_id))
+        self.assertTrue(self.__wait_for(outbox, wo_ids,
+                                        work_order_outbox.ACKED))
+        outbox.stop()
+        self.assertEqual(len(stub.submitted), 20)
+        self.assertEqual(outbox.pending_count(), 0)
+
+    def test_duplicate_enqueue_submitted_once(self):
+        stub = _WorkOrderStub()
+        outbox = WorkOrderOutbox(stub, self.__db_path)
+        outbox.start()
+        wo_id = secrets.token_hex(32)
+        outbox.enqueue(wo_id, "{}")
+        outbox.enqueue(wo_id, "{}")
+        self.assertTrue(self.__wait_for(outbox, [wo_id],
+                                        work_order_outbox.ACKED))
+        outbox.stop()
+        self.assertEqual(len(stub.submitted), 1)
+
+    def test_failed_submission(self):
+        stub = _WorkOrderStub(
+            submit_code=WorkOrderStatus.INVALID_WORKLOAD)
+        outbox = WorkOrderOutbox(stub, self.__db_path)
+        outbox.start()
+        wo_id = secrets.token_hex(32)
+        outbox.enqueue(wo_id, "{}")
+        self.assertTrue(self.__wait_for(outbox, [wo_id],
+                                        work_order_outbox.FAILED))
+        outbox.stop()
+        response = outbox.status(wo_id)[2]
+        self.assertEqual(response["error"]["code"],
+                         WorkOrderStatus.INVALID_WORKLOAD)
+
+    def test_recovery_queries_before_resubmit(self):
+        busy_stub = _WorkOrderStub(submit_code=WorkOrderStatus.BUSY)
+        outbox = WorkOrderOutbox(busy_stub, self.__db_path,
+                                 retry_delay_secs=60)
+        outbox.start()
+        known_id = secrets.token_hex(32)
+        unknown_id = secrets.token_hex(32)
+        outbox.enqueue(known_id, "{}")
+        outbox.enqueue(unknown_id, "{}")
+        self.assertTrue(self.__wait_for(outbox, [known_id, unknown_id],
+                                        work_order_outbox.SENT))
+        # Simulate a crash while the listener was busy
+        outbox.stop()
+
+        stub = _WorkOrderStub(known_ids=[known_id])
+        outbox = WorkOrderOutbox(stub, self.__db_path)
+        outbox.start()
+        self.assertTrue(self.__wait_for(outbox, [known_id, unknown_id],
+                                        work_order_outbox.ACKED))
+        outbox.stop()
+        self.assertEqual(sorted(stub.queried),
+                         sorted([known_id, unknown_id]))
+        self.assertEqual(len(stub.submitted), 1)
+
+    def test_stop_with_submissions_in_flight(self):
+        stub = _WorkOrderStub(submit_delay_secs=0.05)
+        outbox = WorkOrderOutbox(stub, self.__db_path, max_in_flight=4)
+        outbox.start()
+        wo_ids = [secrets.token_hex(32) for _ in range(12)]
+        for wo_id in wo_ids:
+            self.assertTrue(outbox.enqueue(
+                wo_id, json.dumps({"workOrderId": wo_id}), wait=False))
+        time.sleep(0.08)
+        outbox.stop()
+        self.assertFalse(outbox.enqueue(secrets.token_hex(32), "{}"))
+        submitted = [json.loads(request)["workOrderId"]
+                     for request in stub.submitted]
+        self.assertTrue(submitted)
+        self.assertLess(len(submitted), len(wo_ids))
+        for wo_id in submitted:
+            self.assertEqual(outbox.status(wo_id)[0],
+                             work_order_outbox.ACKED)
+        self.assertEqual(outbox.pending_count(),
+                         len(wo_ids) - len(submitted))
+
+        # Restarting the same instance submits the rest once each
+        stub.submit_delay_secs = 0
+        outbox.start()
+        self.assertTrue(self.__wait_for(outbox, wo_ids,
+                                        work_order_outbox.ACKED))
+        outbox.stop()
+        submitted = [json.loads(request)["workOrderId"]
+                     for request in stub.submitted]
+        self.assertEqual(sorted(submitted), sorted(wo_ids))
+
+    def test_recovery_of_failed_work_order(self):
+        busy_stub = _WorkOrderStub(submit_code=WorkOrderStatus.BUSY)
+        outbox = WorkOrderOutbox(busy_stub, self.__db_path,
+                                 retry_delay_secs=60)
+        outbox.start()
+        wo_id = secrets.token_hex(32)
+        outbox.enqueue(wo_id, "{}")
+        self.assertTrue(self.__wait_for(outbox, [wo_id],
+                                        work_order_outbox.SENT))
+        outbox.stop()
+
+        stub = _WorkOrderStub(result_codes={wo_id: WorkOrderStatus.FAILED})
+        outbox = WorkOrderOutbox(stub, self.__db_path)
+        outbox.start()
+        self.assertTrue(self.__wait_for(outbox, [wo_id],
+                                        work_order_outbox.ACKED))
+        outbox.stop()
+        self.assertEqual(stub.submitted, [])
+        self.assertEqual(outbox.status(wo_id)[2]["error"]["code"],
+                         WorkOrderStatus.FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
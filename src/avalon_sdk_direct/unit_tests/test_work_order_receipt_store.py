@@ -0,0 +1,137 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from enums.error_code import ReceiptCreateStatus
+from avalon_sdk_direct.work_order_receipt_store import WorkOrderReceiptStore
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+_WORKER_ID = "0a01"
+_NOT_FOUND = {"code": 2, "message": "not found", "data": ""}
+
+
+class _ReceiptStub(object):
+    """
+    Stand-in for JRPCWorkOrderReceiptImpl serving two receipts per
+    lookup page. The lookup tag is the last work order ID of a page.
+    """
+
+    def __init__(self):
+        self.receipts = {}
+        self.updates = {}
+        self.retrieved = []
+        self.lookups = []
+
+    def add(self, work_order_id, requester_id, status):
+        self.receipts[work_order_id] = {
+            "workOrderId": work_order_id, "workerId": _WORKER_ID,
+            "workerServiceId": "0b", "requesterId": requester_id,
+            "receiptCurrentStatus": status}
+
+    def __page(self, after, id):
+        ids = sorted(w for w in self.receipts if after is None or w > after)
+        result = {"totalCount": len(self.receipts), "ids": ids[:2]}
+        if ids:
+            result["lookupTag"] = ids[:2][-1]
+        return {"jsonrpc": "2.0", "id": id, "result": result}
+
+    def work_order_receipt_lookup(self, worker_service_id=None,
+                                  worker_id=None, requester_id=None,
+                                  receipt_status=None, id=None):
+        self.lookups.append(None)
+        return self.__page(None, id)
+
+    def work_order_receipt_lookup_next(self, last_lookup_tag,
+                                       worker_service_id=None,
+                                       worker_id=None, requester_id=None,
+                                       receipt_status=None, id=None):
+        self.lookups.append(last_lookup_tag)
+        return self.__page(last_lookup_tag, id)
+
+    def work_order_receipt_retrieve(self, work_order_id, id=None):
+        self.retrieved.append(work_order_id)
+        return {"jsonrpc": "2.0", "id": id,
+                "result": dict(self.receipts[work_order_id])}
+
+    def work_order_receipt_update_retrieve(self, work_order_id, updater_id,
+                                           update_index, id=None):
+        updates = self.updates.get((work_order_id, updater_id), [])
+        if update_index >= len(updates):
+            return {"jsonrpc": "2.0", "id": id, "error": _NOT_FOUND}
+        return {"jsonrpc": "2.0", "id": id, "result": updates[update_index]}
+
+
+class TestWorkOrderReceiptStore(unittest.TestCase):
+    def setUp(self):
+        self.__stub = _ReceiptStub()
+        self.__stub.add("01", "aa", ReceiptCreateStatus.COMPLETED)
+        self.__stub.add("02", "bb", ReceiptCreateStatus.PENDING)
+        self.__stub.add("03", "aa", ReceiptCreateStatus.COMPLETED)
+        self.__store = WorkOrderReceiptStore(self.__stub)
+
+    def tearDown(self):
+        self.__store.close()
+
+    def test_sync_and_query(self):
+        self.assertEqual(self.__store.sync(_WORKER_ID), 3)
+        self.assertEqual(sorted(self.__stub.retrieved),
+                         ["01", "02", "03"])
+        aa = self.__store.query(requester_id="aa",
+                                status=ReceiptCreateStatus.COMPLETED)
+        self.assertEqual([r["workOrderId"] for r in aa], ["01", "03"])
+        self.assertEqual(len(self.__store.query(worker_id=_WORKER_ID)), 3)
+        self.assertEqual(self.__store.query(worker_service_id="0c"), [])
+        self.assertEqual(self.__store.get("02")["requesterId"], "bb")
+
+    def test_incremental_sync(self):
+        self.__store.sync(_WORKER_ID)
+        self.__stub.retrieved = []
+        self.__stub.lookups = []
+        self.__stub.add("04", "bb", ReceiptCreateStatus.PENDING)
+
+        self.__store.sync(_WORKER_ID)
+        # Continues after the saved lookup tag; only the new receipt
+        # and the pending one are retrieved
+        self.assertEqual(self.__stub.lookups[0], "03")
+        self.assertEqual(sorted(self.__stub.retrieved), ["02", "04"])
+
+    def test_update_chain(self):
+        self.__store.sync(_WORKER_ID)
+        self.__stub.updates[("02", _WORKER_ID)] = [
+            {"updateType": 1, "updateData": "first"},
+            {"updateType": 1, "updateData": "second"}]
+        self.__stub.updates[("02", "0c")] = [
+            {"updateType": 2, "updateData": "other"}]
+        self.__store.sync(_WORKER_ID, updater_ids=("0c",))
+        chain = self.__store.updates("02", _WORKER_ID)
+        self.assertEqual([u["updateData"] for u in chain],
+                         ["first", "second"])
+        self.assertEqual(len(self.__store.updates("02")), 3)
+
+        self.__stub.updates[("02", _WORKER_ID)].append(
+            {"updateType": 0, "updateData": "done"})
+        self.__stub.receipts["02"]["receiptCurrentStatus"] = \
+            ReceiptCreateStatus.COMPLETED
+        self.__store.sync(_WORKER_ID)
+        self.assertEqual(len(self.__store.updates("02", _WORKER_ID)), 3)
+        self.assertEqual(self.__store.query(
+            status=ReceiptCreateStatus.PENDING), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
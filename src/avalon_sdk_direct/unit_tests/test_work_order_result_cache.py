@@ -0,0 +1,151 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from avalon_sdk_direct.work_order_result_cache import WorkOrderResultCache
+from enums.error_code import WorkOrderStatus
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+def _result(work_order_id, data="secret"):
+    return {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {
+            "workOrderId": work_order_id,
+            "outData": [{"index": 0, "data": data}]
+        }
+    }
+
+
+def _error(code, data=None):
+    error = {"code": code, "message": "work order error"}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "id": 1, "error": error}
+
+
+class TestWorkOrderResultCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, "results.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_terminal_responses_cached(self):
+        cache = WorkOrderResultCache()
+        self.assertTrue(cache.put("wo1", _result("wo1")))
+        self.assertTrue(cache.put(
+            "wo2", _error(WorkOrderStatus.FAILED)))
+        self.assertTrue(cache.put(
+            "wo3", _error(WorkOrderStatus.INVALID_WORKLOAD)))
+        response = cache.get("wo1", id=7)
+        self.assertEqual(response["id"], 7)
+        self.assertEqual(response["result"], _result("wo1")["result"])
+        self.assertEqual(cache.get("wo2")["error"]["code"],
+                         WorkOrderStatus.FAILED)
+        self.assertIsNotNone(cache.get("wo3"))
+
+    def test_non_terminal_responses_not_cached(self):
+        cache = WorkOrderResultCache()
+        for code in (WorkOrderStatus.PENDING, WorkOrderStatus.SCHEDULED,
+                     WorkOrderStatus.PROCESSING, WorkOrderStatus.BUSY):
+            self.assertFalse(cache.put("wo1", _error(code)))
+        # Transport failures reported by error_handler
+        self.assertFalse(cache.put(
+            "wo1", _error(WorkOrderStatus.FAILED, Exception("timeout"))))
+        self.assertFalse(cache.put("wo1", None))
+        self.assertIsNone(cache.get("wo1"))
+        self.assertEqual(cache.stats()["rejected"], 6)
+
+    def test_cached_response_not_shared(self):
+        cache = WorkOrderResultCache()
+        response = _result("wo1")
+        cache.put("wo1", response)
+        # Callers decrypt the out data in place
+        response["result"]["outData"][0]["data"] = "changed by caller"
+        first = cache.get("wo1")
+        self.assertEqual(first["result"]["outData"][0]["data"], "secret")
+        first["result"]["outData"][0]["data"] = "decrypted"
+        second = cache.get("wo1")
+        self.assertEqual(second["result"]["outData"][0]["data"], "secret")
+
+    def test_disk_tier(self):
+        cache = WorkOrderResultCache(db_path=self.db_path)
+        cache.put("wo1", _result("wo1"))
+        cache.close()
+
+        cache = WorkOrderResultCache(db_path=self.db_path)
+        self.assertEqual(cache.get("wo1", id=3)["result"],
+                         _result("wo1")["result"])
+        self.assertEqual(cache.get("wo1")["result"],
+                         _result("wo1")["result"])
+        stats = cache.stats()
+        self.assertEqual(stats["disk_hits"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+        cache.invalidate("wo1")
+        cache.close()
+        cache = WorkOrderResultCache(db_path=self.db_path)
+        self.assertIsNone(cache.get("wo1"))
+        cache.close()
+
+    def test_lru_eviction(self):
+        cache = WorkOrderResultCache(max_entries=2)
+        cache.put("wo1", _result("wo1"))
+        cache.put("wo2", _result("wo2"))
+        # Reading wo1 makes wo2 the least recently used entry
+        cache.get("wo1")
+        cache.put("wo3", _result("wo3"))
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertIsNone(cache.get("wo2"))
+        self.assertIsNotNone(cache.get("wo1"))
+        self.assertIsNotNone(cache.get("wo3"))
+
+    def test_eviction_falls_back_to_disk(self):
+        cache = WorkOrderResultCache(max_entries=1, db_path=self.db_path)
+        cache.put("wo1", _result("wo1"))
+        cache.put("wo2", _result("wo2"))
+        self.assertIsNotNone(cache.get("wo1"))
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+        cache.close()
+
+    def test_stats(self):
+        cache = WorkOrderResultCache()
+        self.assertEqual(cache.stats()["hit_rate"], 0.0)
+        cache.put("wo1", _result("wo1"))
+        cache.get("wo1")
+        cache.get("wo1")
+        cache.get("wo2")
+        cache.put("wo2", _error(WorkOrderStatus.PENDING))
+        self.assertEqual(cache.stats(), {
+            "hits": 2,
+            "disk_hits": 0,
+            "misses": 1,
+            "rejected": 1,
+            "entries": 1,
+            "hit_rate": 2 / 3
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
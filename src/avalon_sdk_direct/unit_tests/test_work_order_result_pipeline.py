@@ -0,0 +1,104 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+import avalon_crypto_utils.crypto_utility as crypto_utility
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from avalon_crypto_utils.worker_hash import WorkerHash
+from avalon_crypto_utils.worker_signing import WorkerSign
+from avalon_sdk_direct.work_order_result_pipeline import \
+    WorkOrderResultPipeline
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestWorkOrderResultPipeline(unittest.TestCase):
+    def setUp(self):
+        self.__worker = WorkerSign()
+        self.__worker.generate_signing_key()
+        self.__encrypt = WorkerEncrypt()
+        self.__results = []
+        for i in range(6):
+            session_key = self.__encrypt.generate_session_key()
+            session_iv = self.__encrypt.generate_iv()
+            self.__results.append(
+                (self.__response(i, session_key, session_iv),
+                 session_key, session_iv))
+
+    def __response(self, i, session_key, session_iv):
+        out_data = [{"index": 0, "data": ("result %d" % i).encode()}]
+        self.__encrypt.encrypt_work_order_data_json(
+            out_data, session_key, session_iv)
+        result = {"workOrderId": "%02x" % i, "workerId": "0a",
+                  "workloadId": "0b", "requesterId": "0c",
+                  "workerNonce": "0d", "outData": out_data}
+        response_hash = WorkerHash().calculate_response_hash(result)
+        result["workerSignature"] = crypto_utility.byte_array_to_base64(
+            self.__worker.sign_message(response_hash))
+        return {"jsonrpc": "2.0", "id": i, "result": result}
+
+    def __check(self, pipeline):
+        # Tampered response, and an error response
+        self.__results[2][0]["result"]["workerId"] = "ff"
+        self.__results.append(({"jsonrpc": "2.0", "id": 6,
+                                "error": {"code": 5}}, None, None))
+        results = sorted(pipeline.process(self.__results))
+        self.assertEqual([r.index for r in results], list(range(7)))
+        self.assertEqual([r.verified for r in results],
+                         [True, True, False, True, True, True, False])
+        self.assertEqual(results[1].out_data[0]["data"], b"result 1")
+        self.assertIsNone(results[2].out_data)
+        self.assertEqual(results[6].error, {"code": 5})
+        # The responses themselves are left encrypted
+        self.assertIsInstance(
+            results[1].response["result"]["outData"][0]["data"], str)
+
+    def test_in_process(self):
+        self.__check(WorkOrderResultPipeline(
+            self.__worker.get_public_sign_key(), processes=1,
+            max_in_flight=2))
+
+    def test_process_pool(self):
+        self.__check(WorkOrderResultPipeline(
+            self.__worker.get_public_sign_key(), processes=2))
+
+    def test_two_step_verification(self):
+        ext = WorkerSign()
+        ext.generate_signing_key()
+        response, session_key, session_iv = self.__results[0]
+        result = response["result"]
+        ext_key = ext.get_public_sign_key().decode("ascii")
+        key_hash = WorkerHash().compute_message_hash(
+            (ext_key + "0e").encode("UTF-8"))
+        result["extVerificationKey"] = ext_key
+        result["extVerificationKeySignature"] = \
+            crypto_utility.byte_array_to_base64(
+                self.__worker.sign_message(key_hash))
+        response_hash = WorkerHash().calculate_response_hash(result)
+        result["workerSignature"] = crypto_utility.byte_array_to_base64(
+            ext.sign_message(response_hash))
+        pipeline = WorkOrderResultPipeline(
+            self.__worker.get_public_sign_key(), processes=1)
+        verified = list(pipeline.process(
+            [(response, session_key, session_iv, "0e"),
+             (response, session_key, session_iv, "ff")]))
+        self.assertEqual(sorted(r.verified for r in verified),
+                         [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
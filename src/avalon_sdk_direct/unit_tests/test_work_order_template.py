@@ -0,0 +1,122 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import secrets
+import unittest
+
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from exceptions.invalid_parameter import InvalidParamException
+from work_order.work_order_params import WorkOrderParams
+from work_order.work_order_template import WorkOrderTemplate
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestWorkOrderTemplate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        worker = WorkerEncrypt()
+        worker.generate_rsa_key()
+        cls.encryption_key = worker.get_rsa_public_key().decode("UTF-8")
+
+    def setUp(self):
+        self.worker_id = secrets.token_hex(32)
+        self.workload_id = "echo".encode("UTF-8").hex()
+        self.requester_id = secrets.token_hex(32)
+        self.template = WorkOrderTemplate(
+            self.worker_id, self.workload_id, self.requester_id,
+            self.encryption_key, data_encryption_algorithm="AES-GCM-256")
+        encrypt = WorkerEncrypt()
+        self.session_key = encrypt.generate_session_key()
+        self.session_iv = encrypt.generate_iv()
+        self.encrypted_session_key = encrypt.encrypt_session_key(
+            self.session_key, self.encryption_key).hex()
+
+    def __pair(self):
+        """
+        Return work order params created from the template and with
+        WorkOrderParams.create_request from the same inputs.
+        """
+        work_order_id = secrets.token_hex(32)
+        requester_nonce = secrets.token_hex(16)
+        from_template = self.template.create_params(
+            work_order_id, requester_nonce, self.session_key,
+            self.session_iv, self.encrypted_session_key)
+        self.assertIsInstance(from_template, WorkOrderParams)
+        direct = WorkOrderParams()
+        self.assertIsNone(direct.create_request(
+            work_order_id, self.worker_id, self.workload_id,
+            self.requester_id, self.session_key, self.session_iv,
+            requester_nonce, worker_encryption_key=self.encryption_key,
+            data_encryption_algorithm="AES-GCM-256",
+            encrypted_session_key=self.encrypted_session_key))
+        for params in (from_template, direct):
+            params.add_in_data("in data")
+            params.add_encrypted_request_hash()
+        return from_template, direct
+
+    def test_matches_work_order_params(self):
+        from_template, direct = self.__pair()
+        self.assertEqual(from_template.request_hash, direct.request_hash)
+        self.assertEqual(json.loads(self.template.to_string(from_template)),
+                         json.loads(direct.to_string()))
+        self.assertEqual(
+            json.loads(self.template.to_jrpc_string(from_template, 7)),
+            json.loads(direct.to_jrpc_string(7)))
+
+    def test_invalid_fixed_params(self):
+        self.assertRaises(
+            InvalidParamException, WorkOrderTemplate, "not hex",
+            self.workload_id, self.requester_id, self.encryption_key)
+        self.assertRaises(
+            InvalidParamException, WorkOrderTemplate, self.worker_id,
+            self.workload_id, None, self.encryption_key)
+
+    def test_invalid_work_order_id(self):
+        err = self.template.create_params(
+            "not hex", secrets.token_hex(16), self.session_key,
+            self.session_iv, self.encrypted_session_key)
+        self.assertIn("error", err)
+        self.assertNotEqual(err["error"]["code"], 0)
+
+    def test_session_key_encrypted_if_not_given(self):
+        params = self.template.create_params(
+            secrets.token_hex(32), secrets.token_hex(16), self.session_key,
+            self.session_iv)
+        self.assertIsInstance(params, WorkOrderParams)
+        self.assertTrue(params.get_params()["encryptedSessionKey"])
+
+    def test_overridden_fixed_param(self):
+        from_template, _ = self.__pair()
+        other_worker_id = secrets.token_hex(32)
+        from_template.set_worker_id(other_worker_id)
+        request = json.loads(self.template.to_string(from_template))
+        self.assertEqual(request["workerId"], other_worker_id)
+        self.assertEqual(request, from_template.params_obj)
+        request = json.loads(
+            self.template.to_jrpc_string(from_template, 8))
+        self.assertEqual(request["params"]["workerId"], other_worker_id)
+
+    def test_params_not_shared(self):
+        first, _ = self.__pair()
+        second, _ = self.__pair()
+        self.assertEqual(len(second.get_in_data()), 1)
+        self.assertIsNot(first.params_obj, second.params_obj)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from enums.worker import WorkerType, WorkerStatus
+from avalon_sdk_direct.worker_catalog import WorkerCatalog
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+def _worker(worker_type, status, org_id, app_type_ids, encryption):
+    return {"workerType": worker_type, "status": status,
+            "organizationId": org_id, "applicationTypeId": app_type_ids,
+            "details": {"dataEncryptionAlgorithm": encryption,
+                        "workerTypeData": {"verificationKey": "key"}}}
+
+
+class _WorkerRegistryStub(object):
+    """
+    Stand-in for JRPCWorkerRegistryImpl serving workers from a dictionary.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.retrieved = []
+
+    def worker_lookup(self, worker_type=None, organization_id=None,
+                      application_type_id=None, id=None):
+        ids = [worker_id for worker_id, worker in self.workers.items()
+               if worker["workerType"] == worker_type]
+        return {"jsonrpc": "2.0", "id": id,
+                "result": {"totalCount": len(ids), "ids": ids}}
+
+    def worker_retrieve(self, worker_id, id=None):
+        self.retrieved.append(worker_id)
+        return {"jsonrpc": "2.0", "id": id,
+                "result": dict(self.workers[worker_id])}
+
+
+class TestWorkerCatalog(unittest.TestCase):
+    def setUp(self):
+        self.__registry = _WorkerRegistryStub({
+            "w1": _worker(WorkerType.TEE_SGX, WorkerStatus.ACTIVE, "org-a",
+                          ["app-1", "app-2"], "AES-GCM-256"),
+            "w2": _worker(WorkerType.TEE_SGX, WorkerStatus.OFF_LINE,
+                          "org-a", ["app-1"], "AES-GCM-256"),
+            "w3": _worker(WorkerType.MPC, WorkerStatus.ACTIVE, "org-b",
+                          ["app-2"], "AES-GCM-128")})
+        self.__catalog = WorkerCatalog(self.__registry)
+        self.assertEqual(self.__catalog.sync(), 3)
+
+    def test_compound_queries(self):
+        catalog = self.__catalog
+        self.assertEqual(catalog.query(), ["w1", "w2", "w3"])
+        self.assertEqual(catalog.query(status=WorkerStatus.ACTIVE,
+                                       application_type_id="app-2"),
+                         ["w1", "w3"])
+        self.assertEqual(catalog.query(worker_type=1, organization_id="org-a",
+                                       application_type_id="app-1"),
+                         ["w1", "w2"])
+        self.assertEqual(catalog.query(
+            dataEncryptionAlgorithm="AES-GCM-128"), ["w3"])
+        self.assertEqual(catalog.query(organization_id="org-c"), [])
+        self.assertRaises(ValueError, catalog.query, workOrderSyncUri="x")
+        self.assertEqual(catalog.get("w3")["organizationId"], "org-b")
+
+    def test_refresh_retrieves_only_changed_workers(self):
+        registry = self.__registry
+        registry.retrieved = []
+        registry.workers["w4"] = _worker(
+            WorkerType.ZK, WorkerStatus.ACTIVE, "org-a", ["app-1"],
+            "AES-GCM-256")
+        del registry.workers["w3"]
+        registry.workers["w2"]["status"] = WorkerStatus.ACTIVE
+        self.__catalog.invalidate("w2")
+
+        self.assertEqual(self.__catalog.refresh(), 2)
+        self.assertEqual(sorted(registry.retrieved), ["w2", "w4"])
+        self.assertEqual(self.__catalog.query(status=WorkerStatus.ACTIVE),
+                         ["w1", "w2", "w4"])
+        self.assertEqual(self.__catalog.query(organization_id="org-b"), [])
+        self.assertIsNone(self.__catalog.get("w3"))
+
+        registry.retrieved = []
+        self.assertEqual(self.__catalog.refresh(), 0)
+        self.assertEqual(registry.retrieved, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
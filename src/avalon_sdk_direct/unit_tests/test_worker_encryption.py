@@ -0,0 +1,86 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import unittest
+
+from Cryptodome.Cipher import AES
+
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class TestWorkerEncryption(unittest.TestCase):
+    def setUp(self):
+        self.__encrypt = WorkerEncrypt()
+        self.__key = self.__encrypt.generate_session_key()
+        self.__iv = self.__encrypt.generate_iv()
+
+    def test_encrypt_format(self):
+        for size in (0, 1, 1000):
+            data = os.urandom(size)
+            ciphertext, tag = AES.new(
+                self.__key, AES.MODE_GCM, self.__iv).encrypt_and_digest(data)
+            for value in (data, bytearray(data), memoryview(data)):
+                self.assertEqual(self.__encrypt.encrypt_data(
+                    value, self.__key, self.__iv), ciphertext + tag)
+                encrypted = self.__encrypt.encrypt_data(value, self.__key)
+                self.assertEqual(len(encrypted), 12 + size + 16)
+                self.assertEqual(self.__encrypt.decrypt_data(
+                    encrypted, self.__key), data)
+                self.assertEqual(self.__encrypt.decrypt_data(
+                    memoryview(ciphertext + tag), self.__key, self.__iv),
+                    data)
+
+    def test_results_are_bytes(self):
+        encrypted = self.__encrypt.encrypt_data(b"secret", self.__key)
+        self.assertIs(type(encrypted), bytes)
+        plain = self.__encrypt.decrypt_data(bytearray(encrypted), self.__key)
+        self.assertIs(type(plain), bytes)
+        self.assertEqual({plain: 1}[b"secret"], 1)
+
+    def test_output_buffers(self):
+        data = os.urandom(100)
+        buffer = bytearray(200)
+        encrypted = self.__encrypt.encrypt_data(
+            data, self.__key, output=buffer)
+        self.assertIsInstance(encrypted, memoryview)
+        self.assertEqual(len(encrypted), 128)
+        self.assertEqual(bytes(buffer[:128]), bytes(encrypted))
+        plain = bytearray(100)
+        self.assertEqual(self.__encrypt.decrypt_data(
+            encrypted, self.__key, output=memoryview(plain)), data)
+        self.assertEqual(plain, data)
+        self.assertRaises(ValueError, self.__encrypt.encrypt_data,
+                          data, self.__key, None, bytearray(127))
+        self.assertRaises(ValueError, self.__encrypt.decrypt_data,
+                          encrypted, self.__key, None, bytearray(99))
+
+    def test_tampered_data_not_returned(self):
+        encrypted = bytearray(
+            self.__encrypt.encrypt_data(b"secret", self.__key))
+        encrypted[-1] ^= 1
+        plain = bytearray(6)
+        self.assertRaises(ValueError, self.__encrypt.decrypt_data,
+                          encrypted, self.__key, None, plain)
+        self.assertEqual(plain, bytes(6))
+        self.assertRaises(ValueError, self.__encrypt.decrypt_data,
+                          b"short", self.__key)
+
+
+if __name__ == "__main__":
+    unittest.main()
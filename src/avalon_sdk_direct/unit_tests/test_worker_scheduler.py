@@ -0,0 +1,136 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+from collections import Counter
+
+from enums.worker import WorkerStatus
+from avalon_sdk_direct import worker_scheduler
+from avalon_sdk_direct.worker_scheduler import WorkerScheduler
+
+logging.basicConfig(
+    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+class _WorkerRegistryStub(object):
+    """
+    Stand-in for JRPCWorkerRegistryImpl serving lookups two worker IDs
+    per page.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.lookups = 0
+        # Error returned instead of the lookup result, if set
+        self.lookup_error = None
+        # worker ID -> error returned by WorkerRetrieve
+        self.retrieve_errors = {}
+
+    def __page(self, start, id):
+        worker_ids = list(self.statuses)
+        result = {"totalCount": len(worker_ids),
+                  "ids": worker_ids[start:start + 2]}
+        if start + 2 < len(worker_ids):
+            result["lookupTag"] = str(start + 2)
+        return {"jsonrpc": "2.0", "id": id, "result": result}
+
+    def worker_lookup(self, worker_type=None, organization_id=None,
+                      application_type_id=None, id=None):
+        self.lookups += 1
+        if self.lookup_error is not None:
+            return {"jsonrpc": "2.0", "id": id, "error": self.lookup_error}
+        return self.__page(0, id)
+
+    def worker_lookup_next(self, lookup_tag, worker_type=None,
+                           organization_id=None, application_type_id=None,
+                           id=None):
+        return self.__page(int(lookup_tag), id)
+
+    def worker_retrieve(self, worker_id, id=None):
+        if worker_id in self.retrieve_errors:
+            return {"jsonrpc": "2.0", "id": id,
+                    "error": self.retrieve_errors[worker_id]}
+        return {"jsonrpc": "2.0", "id": id,
+                "result": {"status": self.statuses[worker_id]}}
+
+
+class TestWorkerScheduler(unittest.TestCase):
+    def setUp(self):
+        self.__registry = _WorkerRegistryStub({
+            "worker-1": WorkerStatus.ACTIVE,
+            "worker-2": WorkerStatus.OFF_LINE,
+            "worker-3": WorkerStatus.ACTIVE,
+            "worker-4": WorkerStatus.DECOMMISSIONED,
+            "worker-5": WorkerStatus.ACTIVE})
+
+    def test_refresh_skips_inactive_workers(self):
+        scheduler = WorkerScheduler(self.__registry)
+        self.assertEqual(scheduler.refresh(),
+                         ["worker-1", "worker-3", "worker-5"])
+
+    def test_least_outstanding_spreads_load(self):
+        scheduler = WorkerScheduler(
+            self.__registry, worker_scheduler.LEAST_OUTSTANDING, seed=1)
+        selected = Counter(scheduler.select() for _ in range(30))
+        self.assertEqual(selected, Counter(
+            {"worker-1": 10, "worker-3": 10, "worker-5": 10}))
+        self.assertEqual(self.__registry.lookups, 1)
+
+    def test_power_of_two_avoids_slow_worker(self):
+        scheduler = WorkerScheduler(self.__registry, seed=1)
+        scheduler.refresh()
+        scheduler.observe_latency("worker-1", 10.0)
+        scheduler.observe_latency("worker-3", 0.1)
+        scheduler.observe_latency("worker-5", 0.1)
+        selected = Counter()
+        for _ in range(300):
+            worker_id = scheduler.select()
+            selected[worker_id] += 1
+            scheduler.complete(worker_id)
+        self.assertLess(selected["worker-1"], 10)
+        self.assertEqual(scheduler.load("worker-3")[0], 0)
+
+    def test_complete_and_remove_worker(self):
+        scheduler = WorkerScheduler(
+            self.__registry, worker_scheduler.LEAST_OUTSTANDING)
+        worker_id = scheduler.select(exclude=("worker-1", "worker-3"))
+        self.assertEqual(worker_id, "worker-5")
+        scheduler.complete(worker_id, latency_secs=2.0)
+        self.assertEqual(scheduler.load(worker_id), (0, 2.0))
+        for removed in ("worker-1", "worker-3", "worker-5"):
+            scheduler.remove_worker(removed)
+        self.assertIsNone(scheduler.select())
+
+    def test_failed_lookup_keeps_candidates(self):
+        scheduler = WorkerScheduler(self.__registry)
+        active = scheduler.refresh()
+        self.__registry.lookup_error = {
+            "code": 1, "message": "Unknown Error",
+            "data": ConnectionResetError()}
+        self.assertEqual(scheduler.refresh(), active)
+        self.assertIn(scheduler.select(), active)
+
+    def test_transient_retrieve_failure_keeps_worker(self):
+        scheduler = WorkerScheduler(self.__registry)
+        scheduler.refresh()
+        self.__registry.retrieve_errors = {
+            "worker-1": {"code": 1, "message": "Unknown Error",
+                         "data": ConnectionResetError()},
+            "worker-3": {"code": 2, "message": "Worker Id not found"}}
+        self.assertEqual(scheduler.refresh(), ["worker-1", "worker-5"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,396 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from enums.error_code import WorkOrderStatus, JRPCErrorCodes
+
+logger = logging.getLogger(__name__)
+
+# Work order states in the outbox
+QUEUED = "queued"
+SENT = "sent"
+ACKED = "acked"
+FAILED = "failed"
+
+# Error codes meaning the listener has accepted the work order
+_ACCEPTED_CODES = (WorkOrderStatus.PENDING, WorkOrderStatus.SCHEDULED,
+                   WorkOrderStatus.PROCESSING)
+
+# Sentinel stopping the drainer and writer threads
+_STOP = object()
+
+
+class _Record(object):
+    """
+    Work order waiting in the outbox to be submitted.
+    """
+
+    def __init__(self, work_order_id, request, attempts=0, recovered=False):
+        self.work_order_id = work_order_id
+        self.request = request
+        self.attempts = attempts
+        # Set for records loaded after a restart. These may have been
+        # sent before the crash, so the listener is queried first.
+        self.recovered = recovered
+
+
+class WorkOrderOutbox(object):
+    """
+    Durable local outbox for work order submission.
+
+    Work order requests are written to an SQLite database before they are
+    sent. A background drainer submits them with bounded concurrency and
+    records the listener's acknowledgement. On start, records that were
+    not acknowledged before a crash are loaded again. For each of them
+    WorkOrderGetResult is queried first, so a work order the listener
+    already knows is not submitted a second time.
+
+    All database writes go through a single writer thread which commits
+    them in batches, so enqueue() costs one shared commit per batch rather
+    than one commit per work order.
+    """
+
+    def __init__(self, work_order, db_path, max_in_flight=8,
+                 batch_size=256, flush_interval_secs=0.01, max_attempts=5,
+                 retry_delay_secs=1.0):
+        """
+        Parameters:
+        work_order          Work order implementation used to submit,
+                            e.g. JRPCWorkOrderImpl
+        db_path             Path of the SQLite database file
+        max_in_flight       Maximum number of concurrent submissions
+        batch_size          Maximum number of writes per transaction
+        flush_interval_secs Longest time a write waits for its batch
+                            to fill up
+        max_attempts        Number of submission attempts before a work
+                            order is marked as failed
+        retry_delay_secs    Initial delay before retrying a submission
+                            rejected as BUSY or failed in transport.
+                            The delay doubles on every attempt.
+        """
+        self.__work_order = work_order
+        self.__db_path = db_path
+        self.__max_in_flight = max_in_flight
+        self.__batch_size = batch_size
+        self.__flush_interval_secs = flush_interval_secs
+        self.__max_attempts = max_attempts
+        self.__retry_delay_secs = retry_delay_secs
+
+        self.__writes = []
+        self.__writes_cv = threading.Condition()
+        self.__dispatch = None
+        self.__slots = threading.BoundedSemaphore(max_in_flight)
+        self.__stopped = threading.Event()
+        self.__writer = None
+        self.__drainer = None
+        self.__executor = None
+        self.__request_id = 0
+        self.__request_id_lock = threading.Lock()
+
+        conn = self.__connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "work_order_id TEXT PRIMARY KEY, "
+            "request TEXT NOT NULL, "
+            "status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "response TEXT, "
+            "updated REAL NOT NULL)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_status ON outbox(status)")
+        conn.commit()
+        conn.close()
+
+    def start(self):
+        """
+        Start the writer and drainer threads and queue the work orders
+        left unacknowledged by a previous run.
+        """
+        # Records still queued from before a stop() are loaded again
+        # from the database
+        self.__dispatch = queue.Queue()
+        conn = self.__connect()
+        rows = conn.execute(
+            "SELECT work_order_id, request, attempts FROM outbox "
+            "WHERE status IN (?, ?) ORDER BY updated",
+            (QUEUED, SENT)).fetchall()
+        conn.close()
+        for work_order_id, request, attempts in rows:
+            self.__dispatch.put(
+                _Record(work_order_id, request, attempts, recovered=True))
+        if rows:
+            logger.info("Recovered %d work orders from outbox", len(rows))
+
+        self.__stopped.clear()
+        self.__executor = ThreadPoolExecutor(
+            max_workers=self.__max_in_flight)
+        self.__writer = threading.Thread(target=self.__write_loop,
+                                         daemon=True)
+        self.__drainer = threading.Thread(target=self.__drain_loop,
+                                          args=(self.__dispatch,),
+                                          daemon=True)
+        self.__writer.start()
+        self.__drainer.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the drainer, wait for the submissions in flight to complete
+        and commit all pending writes, including their outcome. Work
+        orders still queued stay in the database and are picked up by
+        the next start().
+        """
+        with self.__writes_cv:
+            # enqueue() checks the flag under the same lock
+            self.__stopped.set()
+        if self.__drainer is not None:
+            self.__dispatch.put(_STOP)
+            self.__drainer.join(timeout)
+            self.__drainer = None
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+        if self.__writer is not None:
+            with self.__writes_cv:
+                self.__writes.append(_STOP)
+                self.__writes_cv.notify()
+            self.__writer.join(timeout)
+            self.__writer = None
+
+    def enqueue(self, work_order_id, work_order_request, wait=True):
+        """
+        Record a work order request in the outbox and queue it for
+        submission.
+
+        Parameters:
+        work_order_id      Work order ID
+        work_order_request Work order request params as JSON string,
+                           as accepted by work_order_submit
+        wait               If True, return only after the request has been
+                           committed to the database
+
+        Returns:
+        True if the request was recorded, False if the wait timed out
+        or the outbox is stopped.
+        """
+        committed = threading.Event()
+        record = _Record(work_order_id, work_order_request)
+        with self.__writes_cv:
+            if self.__stopped.is_set():
+                return False
+            self.__write(
+                "INSERT OR IGNORE INTO outbox (work_order_id, request, "
+                "status, attempts, updated) VALUES (?, ?, ?, 0, ?)",
+                (work_order_id, work_order_request, QUEUED, time.time()),
+                committed, record)
+        if wait:
+            return committed.wait(self.__flush_interval_secs + 30)
+        return True
+
+    def status(self, work_order_id):
+        """
+        Return the outbox state of a work order.
+
+        Returns:
+        Tuple of (status, attempts, response) where response is the
+        listener's response as a dictionary, or None if the work order
+        is not in the outbox.
+        """
+        conn = self.__connect()
+        row = conn.execute(
+            "SELECT status, attempts, response FROM outbox "
+            "WHERE work_order_id = ?", (work_order_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        status, attempts, response = row
+        return status, attempts, json.loads(response) if response else None
+
+    def pending_count(self):
+        """Return the number of work orders not yet acknowledged."""
+        conn = self.__connect()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM outbox WHERE status IN (?, ?)",
+            (QUEUED, SENT)).fetchone()[0]
+        conn.close()
+        return count
+
+    def __connect(self):
+        conn = sqlite3.connect(self.__db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def __write(self, sql, args, committed=None, record=None):
+        with self.__writes_cv:
+            self.__writes.append((sql, args, committed, record))
+            if len(self.__writes) >= self.__batch_size:
+                self.__writes_cv.notify()
+
+    def __set_status(self, record, status, response=None):
+        self.__write(
+            "UPDATE outbox SET status = ?, attempts = ?, response = ?, "
+            "updated = ? WHERE work_order_id = ?",
+            (status, record.attempts,
+             json.dumps(response, default=str) if response else None,
+             time.time(), record.work_order_id))
+
+    def __write_loop(self):
+        """
+        Commit queued writes in batches until the stop sentinel queued by
+        stop() and all writes before it are committed.
+        """
+        conn = self.__connect()
+        stopping = False
+        try:
+            while True:
+                with self.__writes_cv:
+                    if not self.__writes:
+                        if stopping:
+                            break
+                        self.__writes_cv.wait(self.__flush_interval_secs)
+                    batch = self.__writes[:self.__batch_size]
+                    del self.__writes[:self.__batch_size]
+                if _STOP in batch:
+                    stopping = True
+                    batch = [write for write in batch if write is not _STOP]
+                if not batch:
+                    continue
+                with conn:
+                    row_counts = [conn.execute(sql, args).rowcount
+                                  for sql, args, _, _ in batch]
+                for (_, _, committed, record), row_count in \
+                        zip(batch, row_counts):
+                    # Nothing is inserted for a duplicate work order ID
+                    if record is not None and row_count > 0:
+                        self.__dispatch.put(record)
+                    if committed is not None:
+                        committed.set()
+        except Exception:
+            logger.exception("Outbox writer failed")
+        finally:
+            conn.close()
+
+    def __drain_loop(self, dispatch):
+        """
+        Hand queued records to the executor, max_in_flight at a time,
+        until the stop sentinel queued by stop(). Once stopping, records
+        are left queued in the database for the next start().
+        """
+        executor = self.__executor
+        while True:
+            record = dispatch.get()
+            if record is _STOP:
+                break
+            if self.__stopped.is_set():
+                continue
+            self.__slots.acquire()
+            if self.__stopped.is_set():
+                self.__slots.release()
+                continue
+            try:
+                executor.submit(self.__process, record)
+            except RuntimeError:
+                # Executor shut down by a stop() whose wait timed out
+                self.__slots.release()
+
+    def __next_request_id(self):
+        with self.__request_id_lock:
+            self.__request_id += 1
+            return self.__request_id
+
+    def __process(self, record):
+        try:
+            if record.recovered:
+                record.recovered = False
+                response = self.__work_order.work_order_get_result_nonblocking(
+                    record.work_order_id, self.__next_request_id())
+                if self.__is_known(response):
+                    self.__set_status(record, ACKED, response)
+                    return
+            self.__submit(record)
+        except Exception:
+            logger.exception("Processing work order %s failed",
+                             record.work_order_id)
+        finally:
+            self.__slots.release()
+
+    def __submit(self, record):
+        delay = self.__retry_delay_secs
+        while not self.__stopped.is_set():
+            record.attempts += 1
+            self.__set_status(record, SENT)
+            response = self.__work_order.work_order_submit(
+                record.request, self.__next_request_id())
+            if self.__is_accepted(response):
+                self.__set_status(record, ACKED, response)
+                return
+            if not self.__is_transient(response):
+                self.__set_status(record, FAILED, response)
+                return
+            if record.attempts >= self.__max_attempts:
+                logger.warning("Giving up on work order %s after %d attempts",
+                               record.work_order_id, record.attempts)
+                self.__set_status(record, FAILED, response)
+                return
+            self.__stopped.wait(delay)
+            delay *= 2
+        # Left as sent, the next start() queries the listener first
+        record.recovered = True
+
+    @staticmethod
+    def __is_accepted(response):
+        """Return True if the listener knows the work order."""
+        if response is None:
+            return False
+        if "result" in response:
+            return True
+        return response.get("error", {}).get("code") in _ACCEPTED_CODES
+
+    @classmethod
+    def __is_known(cls, response):
+        """
+        Return True if a WorkOrderGetResult response shows that the
+        listener knows the work order: a result, or any error but the
+        invalid parameter error of unknown work order IDs and transient
+        errors. This includes work orders that failed in the worker.
+        """
+        if response is None or cls.__is_transient(response):
+            return False
+        if "result" in response:
+            return True
+        code = response.get("error", {}).get("code")
+        return code is not None and \
+            code != WorkOrderStatus.INVALID_PARAMETER_FORMAT_OR_VALUE
+
+    @staticmethod
+    def __is_transient(response):
+        """
+        Return True for responses worth retrying: BUSY, and transport
+        errors which error_handler reports as UNKNOWN_ERROR carrying
+        the exception as data.
+        """
+        if response is None:
+            return True
+        error = response.get("error", {})
+        if error.get("code") == WorkOrderStatus.BUSY:
+            return True
+        return error.get("code") == JRPCErrorCodes.UNKNOWN_ERROR and \
+            isinstance(error.get("data"), Exception)
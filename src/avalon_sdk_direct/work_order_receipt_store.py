@@ -0,0 +1,287 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from enums.error_code import ReceiptCreateStatus
+from avalon_sdk_direct.lookup_pages import LookupPages
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of updates read per receipt in one sync, guards against a
+# listener that never reports the end of an update chain
+_MAX_UPDATES = 10000
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS receipts ("
+    "work_order_id TEXT PRIMARY KEY, "
+    "worker_service_id TEXT, "
+    "worker_id TEXT, "
+    "requester_id TEXT, "
+    "status INTEGER, "
+    "receipt TEXT NOT NULL, "
+    "synced REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS receipts_worker_service "
+    "ON receipts(worker_service_id)",
+    "CREATE INDEX IF NOT EXISTS receipts_worker ON receipts(worker_id)",
+    "CREATE INDEX IF NOT EXISTS receipts_requester "
+    "ON receipts(requester_id)",
+    "CREATE INDEX IF NOT EXISTS receipts_status ON receipts(status)",
+    "CREATE TABLE IF NOT EXISTS receipt_updates ("
+    "work_order_id TEXT NOT NULL, "
+    "updater_id TEXT NOT NULL, "
+    "update_index INTEGER NOT NULL, "
+    "update_type INTEGER, "
+    "receipt_update TEXT NOT NULL, "
+    "PRIMARY KEY (work_order_id, updater_id, update_index))",
+    "CREATE TABLE IF NOT EXISTS sync_state ("
+    "scope TEXT PRIMARY KEY, "
+    "lookup_tag TEXT NOT NULL)",
+)
+
+
+class WorkOrderReceiptStore(object):
+    """
+    Local SQLite copy of work order receipts and their update chains.
+
+    sync() crawls the receipts of a worker once. The last lookup tag of
+    every lookup scope is saved, so the next sync() continues with
+    WorkOrderReceiptLookUpNext from there and only retrieves receipts
+    created since. Receipts still pending are retrieved again, and their
+    updates are read with WorkOrderReceiptUpdateRetrieve starting after
+    the last stored update index.
+
+    Queries by worker service, worker, requester and status then run
+    against indexed local tables instead of the listener.
+    """
+
+    def __init__(self, work_order_receipt, db_path=":memory:"):
+        """
+        Parameters:
+        work_order_receipt Receipt implementation used to read the
+                           listener, e.g. JRPCWorkOrderReceiptImpl
+        db_path            Path of the SQLite database file
+        """
+        self.__receipt_impl = work_order_receipt
+        self.__lock = threading.RLock()
+        self.__conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.__conn:
+            for statement in _SCHEMA:
+                self.__conn.execute(statement)
+        self.__request_id = 0
+
+    def sync(self, worker_id, worker_service_id=None, requester_id=None,
+             updater_ids=()):
+        """
+        Fetch the receipts of a worker created since the last sync,
+        refresh pending receipts and read new receipt updates.
+
+        Parameters:
+        worker_id         Worker ID whose receipts are synced
+        worker_service_id Optional worker service ID to restrict to
+        requester_id      Optional requester ID to restrict to
+        updater_ids       IDs of the updaters whose updates are read in
+                          addition to the worker's own updates
+
+        Returns:
+        Number of receipts retrieved from the listener.
+        """
+        scope = json.dumps([worker_service_id, worker_id, requester_id])
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT lookup_tag FROM sync_state WHERE scope = ?",
+                (scope,)).fetchone()
+        lookup_tag = row[0] if row else None
+
+        def lookup():
+            # Continue after the last page read by the previous sync
+            if lookup_tag is not None:
+                return lookup_next(lookup_tag)
+            return self.__receipt_impl.work_order_receipt_lookup(
+                worker_service_id, worker_id, requester_id,
+                id=self.__next_request_id())
+
+        def lookup_next(last_lookup_tag):
+            return self.__receipt_impl.work_order_receipt_lookup_next(
+                last_lookup_tag, worker_service_id, worker_id, requester_id,
+                id=self.__next_request_id())
+
+        retrieved = []
+        for result in LookupPages(lookup, lookup_next, "Receipt lookup"):
+            ids = result.get("ids", [])
+            retrieved.extend(
+                work_order_id for work_order_id in self.__unknown(ids)
+                if self.__retrieve(work_order_id))
+            if not ids or not result.get("lookupTag"):
+                break
+            with self.__lock, self.__conn:
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (scope, lookup_tag) "
+                    "VALUES (?, ?)", (scope, result["lookupTag"]))
+
+        with self.__lock:
+            pending = [row[0] for row in self.__conn.execute(
+                "SELECT work_order_id FROM receipts WHERE worker_id = ? "
+                "AND status = ?",
+                (worker_id, int(ReceiptCreateStatus.PENDING)))]
+        for work_order_id in pending:
+            if work_order_id not in retrieved and \
+                    self.__retrieve(work_order_id):
+                retrieved.append(work_order_id)
+        for work_order_id in retrieved:
+            for updater_id in (worker_id,) + tuple(updater_ids):
+                self.__sync_updates(work_order_id, updater_id)
+        return len(retrieved)
+
+    def get(self, work_order_id):
+        """
+        Return the stored receipt of a work order or None.
+        """
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT receipt FROM receipts WHERE work_order_id = ?",
+                (work_order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, worker_service_id=None, worker_id=None,
+              requester_id=None, status=None):
+        """
+        Find stored receipts matching all of the given criteria.
+
+        Parameters:
+        worker_service_id Optional worker service ID
+        worker_id         Optional worker ID
+        requester_id      Optional requester ID
+        status            Optional ReceiptCreateStatus of the receipt's
+                          current status
+
+        Returns:
+        List of receipts ordered by work order ID.
+        """
+        criteria = [("worker_service_id", worker_service_id),
+                    ("worker_id", worker_id),
+                    ("requester_id", requester_id),
+                    ("status", None if status is None else int(status))]
+        conditions = [column + " = ?" for column, value in criteria
+                      if value is not None]
+        args = [value for _, value in criteria if value is not None]
+        sql = "SELECT receipt FROM receipts"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY work_order_id"
+        with self.__lock:
+            rows = self.__conn.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def updates(self, work_order_id, updater_id=None):
+        """
+        Return the update chain of a receipt.
+
+        Parameters:
+        work_order_id Work order ID
+        updater_id    Optional updater ID to restrict the chain to
+
+        Returns:
+        List of updates ordered by updater and update index.
+        """
+        sql = "SELECT receipt_update FROM receipt_updates " \
+            "WHERE work_order_id = ?"
+        args = [work_order_id]
+        if updater_id is not None:
+            sql += " AND updater_id = ?"
+            args.append(updater_id)
+        sql += " ORDER BY updater_id, update_index"
+        with self.__lock:
+            rows = self.__conn.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self):
+        """Close the database."""
+        with self.__lock:
+            self.__conn.close()
+
+    def __next_request_id(self):
+        with self.__lock:
+            self.__request_id += 1
+            return self.__request_id
+
+    def __unknown(self, work_order_ids):
+        """Return the work order IDs without stored receipt."""
+        with self.__lock:
+            known = set()
+            for work_order_id in work_order_ids:
+                if self.__conn.execute(
+                        "SELECT 1 FROM receipts WHERE work_order_id = ?",
+                        (work_order_id,)).fetchone():
+                    known.add(work_order_id)
+        return [w for w in work_order_ids if w not in known]
+
+    def __retrieve(self, work_order_id):
+        """
+        Retrieve a receipt and store it.
+
+        Returns:
+        True if the receipt was stored.
+        """
+        response = self.__receipt_impl.work_order_receipt_retrieve(
+            work_order_id, self.__next_request_id())
+        if "result" not in response:
+            logger.warning("Could not retrieve receipt of %s: %s",
+                           work_order_id, response.get("error"))
+            return False
+        receipt = response["result"]
+        status = receipt.get("receiptCurrentStatus",
+                             receipt.get("receiptCreateStatus"))
+        with self.__lock, self.__conn:
+            self.__conn.execute(
+                "INSERT OR REPLACE INTO receipts (work_order_id, "
+                "worker_service_id, worker_id, requester_id, status, "
+                "receipt, synced) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (work_order_id, receipt.get("workerServiceId"),
+                 receipt.get("workerId"), receipt.get("requesterId"),
+                 None if status is None else int(status),
+                 json.dumps(receipt), time.time()))
+        return True
+
+    def __sync_updates(self, work_order_id, updater_id):
+        """Read the updates of one updater after the last stored one."""
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT MAX(update_index) FROM receipt_updates "
+                "WHERE work_order_id = ? AND updater_id = ?",
+                (work_order_id, updater_id)).fetchone()
+        update_index = 0 if row[0] is None else row[0] + 1
+        for _ in range(_MAX_UPDATES):
+            response = self.__receipt_impl.work_order_receipt_update_retrieve(
+                work_order_id, updater_id, update_index,
+                id=self.__next_request_id())
+            # The listener answers with an error past the last update
+            if "result" not in response:
+                break
+            update = response["result"]
+            with self.__lock, self.__conn:
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO receipt_updates (work_order_id, "
+                    "updater_id, update_index, update_type, receipt_update) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (work_order_id, updater_id, update_index,
+                     update.get("updateType"), json.dumps(update)))
+            update_index += 1
+            if "updateCount" in update and \
+                    update_index >= update["updateCount"]:
+                break
@@ -0,0 +1,182 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from enums.error_code import WorkOrderStatus
+
+logger = logging.getLogger(__name__)
+
+# Error codes of WorkOrderGetResult responses that are final
+# for the work order
+_TERMINAL_ERROR_CODES = (WorkOrderStatus.FAILED,
+                         WorkOrderStatus.INVALID_WORKLOAD)
+
+
+class WorkOrderResultCache(object):
+    """
+    Cache of WorkOrderGetResult responses of work orders that reached a
+    terminal state, keyed by work order ID.
+
+    Responses are kept as JSON in a bounded in-memory LRU and, if
+    db_path is given, also in an SQLite database so that they survive
+    restarts. get() returns a new copy of the response each time, so
+    callers may modify it, e.g. decrypt its data in place.
+    Responses of pending, scheduled, processing or busy work orders and
+    transport errors are never cached.
+    """
+
+    def __init__(self, max_entries=1024, db_path=None):
+        """
+        Parameters:
+        max_entries Maximum number of responses held in memory
+        db_path     Optional path of an SQLite database used as
+                    second level cache
+        """
+        self.__max_entries = max_entries
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__conn = None
+        if db_path is not None:
+            self.__conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.__conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "work_order_id TEXT PRIMARY KEY, response TEXT NOT NULL)")
+            self.__conn.commit()
+        self.__hits = 0
+        self.__disk_hits = 0
+        self.__misses = 0
+        self.__rejected = 0
+
+    @staticmethod
+    def is_terminal(response):
+        """
+        Return True if a WorkOrderGetResult response is final, i.e.
+        the work order completed or failed.
+        """
+        if response is None:
+            return False
+        if "result" in response:
+            return True
+        error = response.get("error")
+        if not error or error.get("code") not in _TERMINAL_ERROR_CODES:
+            return False
+        # error_handler reports exceptions, e.g. transport failures,
+        # with the exception as data
+        return not isinstance(error.get("data"), Exception)
+
+    def get(self, work_order_id, id=None):
+        """
+        Return the cached response of a work order or None.
+
+        Parameters:
+        work_order_id Work order ID
+        id            JSON RPC request ID to set in the returned response
+        """
+        with self.__lock:
+            encoded = self.__entries.get(work_order_id)
+            if encoded is not None:
+                self.__entries.move_to_end(work_order_id)
+                self.__hits += 1
+            elif self.__conn is not None:
+                row = self.__conn.execute(
+                    "SELECT response FROM results WHERE work_order_id = ?",
+                    (work_order_id,)).fetchone()
+                if row is not None:
+                    encoded = row[0]
+                    self.__remember(work_order_id, encoded)
+                    self.__disk_hits += 1
+            if encoded is None:
+                self.__misses += 1
+                return None
+        response = json.loads(encoded)
+        response["id"] = id
+        return response
+
+    def put(self, work_order_id, response):
+        """
+        Cache the response of a work order if it is terminal.
+
+        Returns:
+        True if the response was cached.
+        """
+        encoded = None
+        if self.is_terminal(response):
+            try:
+                encoded = json.dumps(response)
+            except (TypeError, ValueError) as err:
+                logger.warning("Could not cache result of work order " +
+                               "%s: %s", work_order_id, err)
+        if encoded is None:
+            with self.__lock:
+                self.__rejected += 1
+            return False
+        with self.__lock:
+            self.__remember(work_order_id, encoded)
+            if self.__conn is not None:
+                try:
+                    with self.__conn:
+                        self.__conn.execute(
+                            "INSERT OR REPLACE INTO results "
+                            "(work_order_id, response) VALUES (?, ?)",
+                            (work_order_id, encoded))
+                except sqlite3.Error as err:
+                    logger.warning("Could not persist result of work " +
+                                   "order %s: %s", work_order_id, err)
+        return True
+
+    def invalidate(self, work_order_id):
+        """Drop the cached response of a work order."""
+        with self.__lock:
+            self.__entries.pop(work_order_id, None)
+            if self.__conn is not None:
+                with self.__conn:
+                    self.__conn.execute(
+                        "DELETE FROM results WHERE work_order_id = ?",
+                        (work_order_id,))
+
+    def stats(self):
+        """
+        Return cache metrics as a dictionary with the number of memory
+        hits, disk hits, misses, rejected non-terminal responses, the
+        number of entries in memory and the overall hit rate.
+        """
+        with self.__lock:
+            lookups = self.__hits + self.__disk_hits + self.__misses
+            return {
+                "hits": self.__hits,
+                "disk_hits": self.__disk_hits,
+                "misses": self.__misses,
+                "rejected": self.__rejected,
+                "entries": len(self.__entries),
+                "hit_rate": (self.__hits + self.__disk_hits) / lookups
+                if lookups else 0.0
+            }
+
+    def close(self):
+        """Close the on-disk cache."""
+        with self.__lock:
+            if self.__conn is not None:
+                self.__conn.close()
+                self.__conn = None
+
+    def __remember(self, work_order_id, encoded):
+        self.__entries[work_order_id] = encoded
+        self.__entries.move_to_end(work_order_id)
+        while len(self.__entries) > self.__max_entries:
+            self.__entries.popitem(last=False)
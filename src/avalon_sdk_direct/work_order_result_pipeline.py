@@ -0,0 +1,200 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import copy
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+    FIRST_COMPLETED, wait
+
+from enums.error_code import SignatureStatus
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from avalon_crypto_utils.worker_signing import WorkerSign
+
+logger = logging.getLogger(__name__)
+
+VerifiedResult = collections.namedtuple(
+    "VerifiedResult", ["index", "work_order_id", "verified", "out_data",
+                       "response", "error"])
+VerifiedResult.__doc__ = """
+Outcome of one WorkOrderGetResult response. index is the position of the
+response in the input. out_data is the outData list with each item's data
+decrypted to bytes; it is only set if the signature was verified.
+"""
+
+
+def _verify(result, verification_key, requester_nonce):
+    """
+    Verify the worker signature of a work order result.
+    Runs in a worker process.
+
+    Returns:
+        Tuple of (verified, error).
+    """
+    try:
+        status = WorkerSign().verify_signature(
+            result, verification_key, requester_nonce)
+    except Exception as e:
+        return False, "Signature verification failed: " + repr(e)
+    if status == SignatureStatus.PASSED:
+        return True, None
+    return False, "Signature verification failed"
+
+
+def _decrypt(out_data, session_key, session_iv):
+    """Decrypt the outData items of a work order result."""
+    return WorkerEncrypt().decrypt_work_order_data_json(
+        out_data, session_key, session_iv)
+
+
+class WorkOrderResultPipeline(object):
+    """
+    Verifies and decrypts batches of WorkOrderGetResult responses.
+
+    The signature of each response, including the two-step
+    extVerificationKey check, is verified on a process pool since ECDSA
+    verification is CPU bound Python code. At the same time its outData
+    is decrypted on a thread pool; AES-GCM runs in native code without
+    holding the GIL. A result is handed back once both have finished,
+    and its plaintext only if the signature is valid.
+    """
+
+    def __init__(self, verification_key, processes=None, threads=None,
+                 max_in_flight=None):
+        """
+        Parameters:
+        verification_key Worker's ECDSA verification key as PEM used
+                         to verify result signatures
+        processes        Number of verification processes, defaults to
+                         the number of CPUs. With 1 verification runs on
+                         a thread of the calling process.
+        threads          Number of decryption threads, defaults to
+                         processes
+        max_in_flight    Maximum number of responses being processed,
+                         defaults to four per process
+        """
+        self.__verification_key = verification_key
+        self.__processes = processes or os.cpu_count() or 1
+        self.__threads = threads or self.__processes
+        self.__max_in_flight = max_in_flight or 4 * self.__processes
+
+    def process(self, results):
+        """
+        Verify and decrypt work order results.
+
+        Parameters:
+        results Iterable of (response, session_key, session_iv,
+                requester_nonce) tuples. response is a WorkOrderGetResult
+                JSON RPC response dictionary, session_key and session_iv
+                are the ones used for the work order request and
+                requester_nonce is only needed for the two-step
+                verification.
+
+        Returns:
+        Generator of VerifiedResult in completion order. Responses are
+        read from the iterable as earlier ones complete.
+        """
+        if self.__processes == 1:
+            verify_executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            verify_executor = ProcessPoolExecutor(
+                max_workers=self.__processes)
+        decrypt_executor = ThreadPoolExecutor(max_workers=self.__threads)
+        try:
+            yield from self.__run(iter(results), verify_executor,
+                                  decrypt_executor)
+        finally:
+            decrypt_executor.shutdown(wait=True)
+            verify_executor.shutdown(wait=True)
+
+    def __run(self, results, verify_executor, decrypt_executor):
+        # future -> (index, "verify" or "decrypt")
+        futures = {}
+        # index -> dictionary with the response and the outcomes so far
+        pending = {}
+        index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.__max_in_flight:
+                try:
+                    item = next(results)
+                except StopIteration:
+                    exhausted = True
+                    break
+                early = self.__submit(index, item, verify_executor,
+                                      decrypt_executor, futures, pending)
+                if early is not None:
+                    yield early
+                index += 1
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, stage = futures.pop(future)
+                state = pending[i]
+                try:
+                    state[stage] = future.result()
+                except Exception as e:
+                    state[stage] = e
+                if "verify" in state and "decrypt" in state:
+                    del pending[i]
+                    yield self.__finish(i, state)
+
+    def __submit(self, index, item, verify_executor, decrypt_executor,
+                 futures, pending):
+        """
+        Start verification and decryption of a response.
+
+        Returns:
+        VerifiedResult if the response can be rejected right away,
+        otherwise None.
+        """
+        response, session_key, session_iv = item[:3]
+        requester_nonce = item[3] if len(item) > 3 else None
+        if response is None or "result" not in response:
+            error = response.get("error") if response else "No response"
+            return VerifiedResult(index, None, False, None, response, error)
+        result = response["result"]
+        pending[index] = {"response": response}
+        futures[verify_executor.submit(
+            _verify, copy.deepcopy(result), self.__verification_key,
+            requester_nonce)] = (index, "verify")
+        # Decrypt a copy, the encrypted data is part of the signed hash
+        futures[decrypt_executor.submit(
+            _decrypt, copy.deepcopy(result.get("outData", [])),
+            session_key, session_iv)] = (index, "decrypt")
+        return None
+
+    @staticmethod
+    def __finish(index, state):
+        response = state["response"]
+        work_order_id = response["result"].get("workOrderId")
+        verify = state["verify"]
+        if isinstance(verify, Exception):
+            verify = (False, "Signature verification failed: " +
+                      repr(verify))
+        verified, error = verify
+        if not verified:
+            logger.warning("Result of work order %s failed verification",
+                           work_order_id)
+            return VerifiedResult(index, work_order_id, False, None,
+                                  response, error)
+        out_data = state["decrypt"]
+        if isinstance(out_data, Exception):
+            return VerifiedResult(index, work_order_id, True, None,
+                                  response, "Decryption failed: " +
+                                  repr(out_data))
+        return VerifiedResult(index, work_order_id, True, out_data,
+                              response, None)
@@ -0,0 +1,269 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import logging
+import threading
+import time
+
+from enums.worker import WorkerType
+from avalon_sdk_direct.lookup_pages import LookupPages
+
+logger = logging.getLogger(__name__)
+
+# Worker details fields indexed by default
+DEFAULT_DETAIL_FIELDS = ("hashingAlgorithm", "signingAlgorithm",
+                         "keyEncryptionAlgorithm", "dataEncryptionAlgorithm",
+                         "workOrderPayloadFormats")
+
+# Index names of the WorkerRetrieve result fields
+_WORKER_TYPE = "workerType"
+_STATUS = "status"
+_ORGANIZATION_ID = "organizationId"
+_APPLICATION_TYPE_ID = "applicationTypeId"
+
+
+class WorkerCatalog(object):
+    """
+    In-memory copy of the worker registry with secondary indexes.
+
+    sync() reads the registry with WorkerLookUp/WorkerLookUpNext for
+    every worker type and WorkerRetrieve for each worker. Workers are
+    indexed on type, status, organization, application type IDs and
+    the configured details fields, so query() answers compound queries
+    by intersecting index sets without calling the listener.
+
+    The registry has no change feed, so refresh() approximates an
+    incremental sync: the cheap lookups are repeated to find added and
+    removed workers, but WorkerRetrieve is only called for new workers,
+    workers marked stale with invalidate() and workers not retrieved for
+    max_age_secs.
+    """
+
+    def __init__(self, worker_registry, detail_fields=DEFAULT_DETAIL_FIELDS,
+                 worker_types=tuple(WorkerType), organization_id=None,
+                 max_age_secs=300):
+        """
+        Parameters:
+        worker_registry Worker registry implementation, e.g.
+                        JRPCWorkerRegistryImpl
+        detail_fields   Names of worker details fields to index
+        worker_types    Worker types to look up
+        organization_id Optional organization to restrict the catalog to
+        max_age_secs    Age after which refresh() retrieves a worker
+                        again even if it is not marked stale
+        """
+        self.__registry = worker_registry
+        self.__detail_fields = tuple(detail_fields)
+        self.__worker_types = tuple(worker_types)
+        self.__organization_id = organization_id
+        self.__max_age_secs = max_age_secs
+        self.__lock = threading.RLock()
+        # worker ID -> WorkerRetrieve result with workerId added
+        self.__workers = {}
+        # worker ID -> time of the last WorkerRetrieve
+        self.__retrieved = {}
+        self.__stale = set()
+        # index name -> value -> set of worker IDs
+        self.__indexes = {name: {} for name in
+                          (_WORKER_TYPE, _STATUS, _ORGANIZATION_ID,
+                           _APPLICATION_TYPE_ID) + self.__detail_fields}
+        self.__request_id = 0
+
+    def sync(self):
+        """
+        Read the complete registry, retrieving every worker.
+
+        Returns:
+        Number of workers in the catalog.
+        """
+        worker_ids = self.__lookup_all()
+        if worker_ids is None:
+            return len(self)
+        self.__retrieve(worker_ids)
+        self.__remove_missing(worker_ids)
+        return len(self)
+
+    def refresh(self):
+        """
+        Bring the catalog up to date, retrieving only new, stale and
+        expired workers.
+
+        Returns:
+        Number of workers retrieved.
+        """
+        worker_ids = self.__lookup_all()
+        if worker_ids is None:
+            return 0
+        now = time.monotonic()
+        with self.__lock:
+            changed = [worker_id for worker_id in worker_ids
+                       if worker_id not in self.__workers or
+                       worker_id in self.__stale or
+                       now - self.__retrieved[worker_id] >
+                       self.__max_age_secs]
+        self.__retrieve(changed)
+        self.__remove_missing(worker_ids)
+        return len(changed)
+
+    def invalidate(self, worker_id):
+        """
+        Mark a worker to be retrieved again on the next refresh(), e.g.
+        after its status or details were updated.
+        """
+        with self.__lock:
+            if worker_id in self.__workers:
+                self.__stale.add(worker_id)
+
+    def get(self, worker_id):
+        """
+        Return the WorkerRetrieve result of a worker with its workerId,
+        or None if the worker is not in the catalog.
+        """
+        with self.__lock:
+            worker = self.__workers.get(worker_id)
+            return copy.deepcopy(worker) if worker is not None else None
+
+    def query(self, worker_type=None, status=None, organization_id=None,
+              application_type_id=None, **details):
+        """
+        Find workers matching all of the given criteria.
+
+        Parameters:
+        worker_type         Optional WorkerType
+        status              Optional WorkerStatus
+        organization_id     Optional organization ID
+        application_type_id Optional application type ID the worker
+                            must support
+        details             Values of indexed details fields, e.g.
+                            dataEncryptionAlgorithm="AES-GCM-256"
+
+        Returns:
+        Sorted list of matching worker IDs. All workers are returned if
+        no criteria are given.
+        """
+        criteria = {_WORKER_TYPE: worker_type, _STATUS: status,
+                    _ORGANIZATION_ID: organization_id,
+                    _APPLICATION_TYPE_ID: application_type_id}
+        for name, value in details.items():
+            if name not in self.__detail_fields:
+                raise ValueError("Details field {} is not indexed"
+                                 .format(name))
+            criteria[name] = value
+
+        with self.__lock:
+            matches = []
+            for name, value in criteria.items():
+                if value is None:
+                    continue
+                matches.append(self.__indexes[name].get(
+                    self.__index_value(value), set()))
+            if not matches:
+                return sorted(self.__workers)
+            matches.sort(key=len)
+            return sorted(matches[0].intersection(*matches[1:]))
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__workers)
+
+    def __next_request_id(self):
+        with self.__lock:
+            self.__request_id += 1
+            return self.__request_id
+
+    def __lookup_all(self):
+        """
+        Return the IDs of all workers in the registry, or None if a
+        lookup failed.
+        """
+        worker_ids = {}
+        for worker_type in self.__worker_types:
+            pages = LookupPages(
+                lambda: self.__registry.worker_lookup(
+                    worker_type, self.__organization_id, None,
+                    self.__next_request_id()),
+                lambda lookup_tag: self.__registry.worker_lookup_next(
+                    lookup_tag, worker_type, self.__organization_id, None,
+                    self.__next_request_id()),
+                "Worker lookup")
+            for result in pages:
+                worker_ids.update(dict.fromkeys(result.get("ids", [])))
+            if pages.failed:
+                return None
+        return list(worker_ids)
+
+    def __retrieve(self, worker_ids):
+        for worker_id in worker_ids:
+            response = self.__registry.worker_retrieve(
+                worker_id, self.__next_request_id())
+            if "result" not in response:
+                logger.warning("Could not retrieve worker %s: %s",
+                               worker_id, response.get("error"))
+                continue
+            worker = dict(response["result"])
+            worker["workerId"] = worker_id
+            with self.__lock:
+                self.__retrieved[worker_id] = time.monotonic()
+                self.__stale.discard(worker_id)
+                if self.__workers.get(worker_id) == worker:
+                    continue
+                self.__unindex(worker_id)
+                self.__workers[worker_id] = worker
+                self.__index(worker_id, worker)
+
+    def __remove_missing(self, worker_ids):
+        present = set(worker_ids)
+        with self.__lock:
+            for worker_id in [w for w in self.__workers if w not in present]:
+                self.__unindex(worker_id)
+                del self.__workers[worker_id]
+                self.__retrieved.pop(worker_id, None)
+                self.__stale.discard(worker_id)
+
+    def __index_entries(self, worker):
+        """Yield (index name, value) pairs of a worker."""
+        details = worker.get("details") or {}
+        for name in self.__indexes:
+            if name in self.__detail_fields:
+                value = details.get(name)
+            else:
+                value = worker.get(name)
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for value in values:
+                if value is None or isinstance(value, dict):
+                    continue
+                yield name, self.__index_value(value)
+
+    @staticmethod
+    def __index_value(value):
+        # Enums and their plain integer values hit the same entries
+        if isinstance(value, int) and not isinstance(value, bool):
+            return int(value)
+        return value
+
+    def __index(self, worker_id, worker):
+        for name, value in self.__index_entries(worker):
+            self.__indexes[name].setdefault(value, set()).add(worker_id)
+
+    def __unindex(self, worker_id):
+        worker = self.__workers.get(worker_id)
+        if worker is None:
+            return
+        for name, value in self.__index_entries(worker):
+            worker_ids = self.__indexes[name].get(value)
+            if worker_ids is not None:
+                worker_ids.discard(worker_id)
+                if not worker_ids:
+                    del self.__indexes[name][value]
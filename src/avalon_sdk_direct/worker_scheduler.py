@@ -0,0 +1,293 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import random
+import threading
+import time
+
+from enums.error_code import WorkOrderStatus
+from enums.worker import WorkerType, WorkerStatus
+from avalon_sdk_direct.lookup_pages import LookupPages
+
+logger = logging.getLogger(__name__)
+
+# Worker selection strategies
+LEAST_OUTSTANDING = "least-outstanding"
+POWER_OF_TWO = "power-of-two"
+
+
+def _is_transient(response):
+    """
+    Return True for error responses worth retrying: BUSY, and transport
+    errors which error_handler reports carrying the exception as data.
+    """
+    error = response.get("error") or {}
+    return error.get("code") == WorkOrderStatus.BUSY or \
+        isinstance(error.get("data"), Exception)
+
+
+class _WorkerLoad(object):
+    """
+    Load observed for one worker: work orders outstanding and
+    exponentially weighted moving average of their latency.
+    """
+
+    def __init__(self):
+        self.outstanding = 0
+        self.latency = None
+
+
+class WorkerScheduler(object):
+    """
+    Selects the worker a work order is submitted to among the active
+    workers that support an application type.
+
+    Candidates are found with WorkerLookUp/WorkerLookUpNext and their
+    status is read with WorkerRetrieve; workers that are not ACTIVE are
+    skipped. The candidate list of an application type is refreshed
+    after refresh_interval_secs.
+
+    The caller reports each work order with select() and complete(),
+    passing the time from submission to result to complete() so that
+    slow workers get fewer work orders. Two strategies are available:
+
+    * LEAST_OUTSTANDING picks the worker with the fewest work orders in
+      flight, ties are broken by latency.
+    * POWER_OF_TWO compares two random candidates by outstanding work
+      orders weighted with their latency. This avoids every client
+      piling onto the same least loaded worker.
+    """
+
+    def __init__(self, worker_registry, strategy=POWER_OF_TWO,
+                 worker_type=WorkerType.TEE_SGX, organization_id=None,
+                 refresh_interval_secs=60, latency_weight=0.2, seed=None):
+        """
+        Parameters:
+        worker_registry       Worker registry implementation used for
+                              lookups, e.g. JRPCWorkerRegistryImpl
+        strategy              LEAST_OUTSTANDING or POWER_OF_TWO
+        worker_type           Type of the workers to look up
+        organization_id       Optional organization hosting the workers
+        refresh_interval_secs Age after which the candidate list of an
+                              application type is looked up again
+        latency_weight        Weight of a new latency observation in the
+                              moving average, between 0 and 1
+        seed                  Optional seed of the random generator
+        """
+        if strategy not in (LEAST_OUTSTANDING, POWER_OF_TWO):
+            raise ValueError("Unknown strategy " + str(strategy))
+        if not 0 < latency_weight <= 1:
+            raise ValueError("latency_weight must be between 0 and 1")
+        self.__registry = worker_registry
+        self.__strategy = strategy
+        self.__worker_type = worker_type
+        self.__organization_id = organization_id
+        self.__refresh_interval_secs = refresh_interval_secs
+        self.__latency_weight = latency_weight
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        # application type ID -> (refresh time, list of worker IDs)
+        self.__candidates = {}
+        # worker ID -> _WorkerLoad
+        self.__loads = {}
+        self.__request_id = 0
+
+    def refresh(self, application_type_id=None):
+        """
+        Look up the active workers supporting an application type.
+
+        Parameters:
+        application_type_id Optional application type ID. All workers of
+                            the configured type are candidates if None.
+
+        Returns:
+        List of active worker IDs. If the lookup fails, the candidates
+        found before are kept and returned.
+        """
+        with self.__lock:
+            entry = self.__candidates.get(application_type_id)
+        previous = entry[1] if entry is not None else []
+        worker_ids = self.__lookup(application_type_id)
+        if worker_ids is None:
+            logger.warning("Keeping %d candidate workers after failed "
+                           "lookup", len(previous))
+            worker_ids = []
+            active = list(previous)
+        else:
+            active = []
+        previous = set(previous)
+        for worker_id in worker_ids:
+            response = self.__registry.worker_retrieve(
+                worker_id, self.__next_request_id())
+            if "result" not in response:
+                logger.warning("Could not retrieve worker %s: %s",
+                               worker_id, response.get("error"))
+                # A worker that was active stays a candidate until the
+                # listener can tell otherwise
+                if worker_id in previous and _is_transient(response):
+                    active.append(worker_id)
+                continue
+            status = response["result"].get("status")
+            if status == WorkerStatus.ACTIVE:
+                active.append(worker_id)
+            else:
+                logger.debug("Skipping worker %s with status %s",
+                             worker_id, status)
+        with self.__lock:
+            self.__candidates[application_type_id] = \
+                (time.monotonic(), active)
+            for worker_id in active:
+                self.__loads.setdefault(worker_id, _WorkerLoad())
+        return list(active)
+
+    def select(self, application_type_id=None, exclude=()):
+        """
+        Pick a worker for a work order and count the work order as
+        outstanding on it until complete() is called.
+
+        Parameters:
+        application_type_id Optional application type ID of the work order
+        exclude             Worker IDs not to pick, e.g. workers that
+                            just rejected the work order
+
+        Returns:
+        Worker ID or None if no active worker is available.
+        """
+        with self.__lock:
+            entry = self.__candidates.get(application_type_id)
+        if entry is None or \
+                time.monotonic() - entry[0] > self.__refresh_interval_secs:
+            self.refresh(application_type_id)
+
+        with self.__lock:
+            candidates = [worker_id for worker_id in
+                          self.__candidates[application_type_id][1]
+                          if worker_id not in exclude]
+            if not candidates:
+                return None
+            if self.__strategy == LEAST_OUTSTANDING:
+                self.__random.shuffle(candidates)
+                worker_id = min(candidates, key=self.__least_outstanding_key)
+            elif len(candidates) == 1:
+                worker_id = candidates[0]
+            else:
+                first, second = self.__random.sample(candidates, 2)
+                worker_id = first if self.__cost(first) <= \
+                    self.__cost(second) else second
+            self.__loads[worker_id].outstanding += 1
+            return worker_id
+
+    def complete(self, worker_id, latency_secs=None):
+        """
+        Report that a work order sent to a worker has finished.
+
+        Parameters:
+        worker_id    Worker ID returned by select()
+        latency_secs Optional time from submission until the result was
+                     received
+        """
+        with self.__lock:
+            load = self.__loads.get(worker_id)
+            if load is None:
+                return
+            load.outstanding = max(0, load.outstanding - 1)
+            if latency_secs is not None:
+                self.__observe(load, latency_secs)
+
+    def observe_latency(self, worker_id, latency_secs):
+        """
+        Record a latency observation for a worker without changing its
+        outstanding work orders, e.g. from a result poller.
+        """
+        with self.__lock:
+            load = self.__loads.get(worker_id)
+            if load is not None:
+                self.__observe(load, latency_secs)
+
+    def remove_worker(self, worker_id):
+        """
+        Stop selecting a worker until the next refresh lists it again,
+        e.g. after it reported that it is not active anymore.
+        """
+        with self.__lock:
+            for application_type_id, (refreshed, worker_ids) in \
+                    list(self.__candidates.items()):
+                if worker_id in worker_ids:
+                    self.__candidates[application_type_id] = (
+                        refreshed, [w for w in worker_ids if w != worker_id])
+
+    def load(self, worker_id):
+        """
+        Return the load of a worker as a tuple of (outstanding work
+        orders, average latency in seconds or None).
+        """
+        with self.__lock:
+            load = self.__loads.get(worker_id)
+            if load is None:
+                return 0, None
+            return load.outstanding, load.latency
+
+    def __lookup(self, application_type_id):
+        """
+        Return the IDs of all workers matching the lookup criteria, or
+        None if the lookup failed.
+        """
+        pages = LookupPages(
+            lambda: self.__registry.worker_lookup(
+                self.__worker_type, self.__organization_id,
+                application_type_id, self.__next_request_id()),
+            lambda lookup_tag: self.__registry.worker_lookup_next(
+                lookup_tag, self.__worker_type, self.__organization_id,
+                application_type_id, self.__next_request_id()),
+            "Worker lookup")
+        worker_ids = {}
+        for result in pages:
+            worker_ids.update(dict.fromkeys(result.get("ids", [])))
+        if pages.failed:
+            return None
+        return list(worker_ids)
+
+    def __observe(self, load, latency_secs):
+        if load.latency is None:
+            load.latency = latency_secs
+        else:
+            load.latency += self.__latency_weight * \
+                (latency_secs - load.latency)
+
+    def __average_latency(self):
+        latencies = [load.latency for load in self.__loads.values()
+                     if load.latency is not None]
+        return sum(latencies) / len(latencies) if latencies else 1.0
+
+    def __least_outstanding_key(self, worker_id):
+        load = self.__loads[worker_id]
+        latency = load.latency if load.latency is not None \
+            else self.__average_latency()
+        return load.outstanding, latency
+
+    def __cost(self, worker_id):
+        """
+        Expected wait for a new work order on a worker. Workers without
+        latency observations are assumed to be average.
+        """
+        load = self.__loads[worker_id]
+        latency = load.latency if load.latency is not None \
+            else self.__average_latency()
+        return (load.outstanding + 1) * latency
+
+    def __next_request_id(self):
+        with self.__lock:
+            self.__request_id += 1
+            return self.__request_id
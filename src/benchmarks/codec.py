@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the hex and base64 conversions of the SDK.
+
+Each case times the utility.codec function against the conversion the
+SDK used before it, on inputs of the sizes found in work orders:
+16 byte IVs, 32 byte hashes and IDs, 72 byte signatures and 256 byte
+encrypted session keys. The best time per call out of a number of
+repeats is reported in nanoseconds, with the speedup.
+"""
+
+import argparse
+import base64
+import json
+import os
+import timeit
+
+import utility.codec as codec
+
+SIZES = (16, 32, 72, 256)
+
+
+def _legacy_hex_upper(data):
+    # crypto_utility.byte_array_to_hex and hex_utils.byte_array_to_hex_str
+    return "".join(format(i, "02x") for i in data).upper()
+
+
+def _legacy_b64_encode(data):
+    return base64.b64encode(data).decode("UTF-8")
+
+
+def _legacy_b64_decode(b64_str):
+    return base64.b64decode(b64_str.encode("UTF-8"))
+
+
+def _legacy_hex_array(byte32_arr):
+    # conversion.convert_byte32_arr_to_hex_arr
+    hex_ids = []
+    for byte32_str in byte32_arr:
+        hex_ids = hex_ids + [byte32_str.hex()]
+    return hex_ids
+
+
+def _cases(size):
+    data = os.urandom(size)
+    b64_str = codec.b64_encode(data)
+    return {
+        "hex_encode_upper": (lambda: _legacy_hex_upper(data),
+                             lambda: codec.hex_encode(data, upper=True)),
+        "b64_encode": (lambda: _legacy_b64_encode(data),
+                       lambda: codec.b64_encode(data)),
+        "b64_decode": (lambda: _legacy_b64_decode(b64_str),
+                       lambda: codec.b64_decode(b64_str)),
+    }
+
+
+def _best_ns(function, number, repeat):
+    return min(timeit.repeat(function, number=number, repeat=repeat)) \
+        / number * 1e9
+
+
+def _compare(legacy, new, number, repeat):
+    legacy_ns = _best_ns(legacy, number, repeat)
+    new_ns = _best_ns(new, number, repeat)
+    return {
+        "legacy_ns": round(legacy_ns),
+        "codec_ns": round(new_ns),
+        "speedup": round(legacy_ns / new_ns, 1),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--number", type=int, default=2000,
+                        help="Calls per timing")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Timings per case, the best is reported")
+    parser.add_argument("--ids", type=int, default=1000,
+                        help="Length of the ID list of the array case")
+    options = parser.parse_args(args)
+
+    results = {}
+    for size in SIZES:
+        for name, (legacy, new) in _cases(size).items():
+            results["%s_%d" % (name, size)] = _compare(
+                legacy, new, options.number, options.repeat)
+    ids = [os.urandom(32) for _ in range(options.ids)]
+    # The legacy list conversion is quadratic, time fewer calls
+    results["hex_encode_array_%d" % options.ids] = _compare(
+        lambda: _legacy_hex_array(ids), lambda: codec.hex_encode_array(ids),
+        max(1, options.number // options.ids), options.repeat)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
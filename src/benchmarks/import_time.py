@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cold-start import time benchmark for the SDK modules.
+
+Each module is imported in a fresh interpreter with -X importtime and
+the cumulative import time of the module is recorded. The median over
+a number of runs is reported in microseconds. If a baseline file from an
+earlier run is given, the benchmark fails when a module got slower by
+more than the allowed regression.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "avalon_sdk_direct.jrpc_work_order",
+    "avalon_sdk_direct.jrpc_worker_registry",
+    "avalon_sdk_direct.jrpc_work_order_receipt",
+    "work_order.work_order_params",
+]
+
+
+def _import_times(module):
+    """
+    Import module in a fresh interpreter and return the
+    -X importtime records as a list of
+    (self time us, cumulative time us, module name) tuples.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    records = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        records.append((int(self_us), int(cumulative_us), name.strip()))
+    return records
+
+
+def _measure(module, runs):
+    samples = []
+    records = []
+    for _ in range(runs):
+        records = _import_times(module)
+        samples.append(next(cumulative for _, cumulative, name in records
+                            if name == module))
+    return statistics.median(samples), records
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES,
+                        help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Number of fresh interpreters per module")
+    parser.add_argument("--baseline",
+                        help="JSON output of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Allowed slowdown against the baseline in %%")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="Also report the N slowest imports by self time")
+    options = parser.parse_args(args)
+
+    results = {}
+    for module in options.modules:
+        median_us, records = _measure(module, options.runs)
+        results[module] = {"import_time_us": median_us}
+        if options.profile:
+            slowest = sorted(records, reverse=True)[:options.profile]
+            results[module]["slowest_imports"] = [
+                {"module": name, "self_us": self_us}
+                for self_us, _, name in slowest]
+    print(json.dumps(results, indent=4))
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        regressed = False
+        for module, result in results.items():
+            if module not in baseline:
+                continue
+            before = baseline[module]["import_time_us"]
+            after = result["import_time_us"]
+            if after > before * (1 + options.max_regression / 100):
+                print("{}: import time regressed from {} us to {} us".format(
+                    module, before, after), file=sys.stderr)
+                regressed = True
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
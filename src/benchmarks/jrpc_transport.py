@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+
+"""
+Benchmark of the HttpJrpcClient transports: loopback TCP against a Unix
+domain socket.
+
+The mock listener is started in-process twice, once on a TCP port and
+once on a Unix domain socket, and the same JSON RPC request is sent to
+each of them from one or more threads. For each transport and
+concurrency the throughput and the latency percentiles of the calls are
+written as JSON.
+
+Both listeners run in the benchmark process, so the numbers include the
+server side of the calls; they compare the transports rather than
+predict the latency of a real listener.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from avalon_sdk_direct.mock_listener import MockListener
+from handler.http_jrpc_client import HttpJrpcClient
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def _percentiles(samples_secs):
+    """Return latency statistics in milliseconds."""
+    samples = sorted(samples_secs)
+    if not samples:
+        return {}
+
+    def at(fraction):
+        return round(samples[min(len(samples) - 1,
+                                 int(fraction * len(samples)))] * 1000, 3)
+    return {
+        "mean": round(sum(samples) / len(samples) * 1000, 3),
+        "p50": at(0.50),
+        "p90": at(0.90),
+        "p99": at(0.99),
+        "max": round(samples[-1] * 1000, 3),
+    }
+
+
+def _run_case(transport, url, request, concurrency, requests):
+    client = HttpJrpcClient(url)
+    # Warm up
+    client._postmsg(request)
+
+    def timed_call(_):
+        start = time.perf_counter()
+        try:
+            response = client._postmsg(request)
+        except Exception as e:
+            logging.warning("Request failed: %s", e)
+            return None
+        if not isinstance(response, dict) or "result" not in response:
+            logging.warning("Unexpected response: %s", response)
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_call, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    completed = [r for r in results if r is not None]
+    return {
+        "transport": transport,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": requests - len(completed),
+        "throughput_per_sec": round(len(completed) / elapsed, 2),
+        "latency_ms": _percentiles(completed),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8],
+                        help="Comma separated numbers of concurrent "
+                        "requests")
+    parser.add_argument("--requests", type=int, default=2000,
+                        help="Requests per case")
+    parser.add_argument("--method", default="WorkerRetrieve",
+                        choices=["WorkerLookUp", "WorkerRetrieve"],
+                        help="JSON RPC method called")
+    parser.add_argument("--label", default="",
+                        help="Label of the run, e.g. the SDK version")
+    parser.add_argument("--output",
+                        help="File to write the results to, "
+                        "default stdout")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        level=logging.WARNING)
+
+    directory = tempfile.TemporaryDirectory()
+    tcp_listener = MockListener(seed=1).start()
+    unix_listener = MockListener(
+        seed=1, unix_socket=os.path.join(directory.name, "listener.sock"))
+    unix_listener.start()
+    if options.method == "WorkerRetrieve":
+        params = {"workerId": tcp_listener.worker_ids[0]}
+    else:
+        params = {"workerType": 1}
+    request = json.dumps({"jsonrpc": "2.0", "method": options.method,
+                          "id": 1, "params": params})
+    try:
+        cases = [
+            _run_case(transport, listener.url, request, concurrency,
+                      options.requests)
+            for concurrency in options.concurrency
+            for transport, listener in (("tcp", tcp_listener),
+                                        ("unix", unix_listener))]
+    finally:
+        tcp_listener.stop()
+        unix_listener.stop()
+        directory.cleanup()
+
+    results = {
+        "label": options.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "method": options.method,
+        "cases": cases,
+    }
+    output = json.dumps(results, indent=4)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0 if all(case["errors"] == 0 for case in cases) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
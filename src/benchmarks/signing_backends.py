@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Throughput of the ECDSA backends of WorkerSign.
+
+For every installed backend, signs and verifies per second are measured
+on SHA-256 digests through the WorkerSign API, with the verifying key
+given as PEM like in work order results and receipts. Signing is measured
+without the signing context, as in earlier releases, with it through
+sign_message and in batches of all digests through sign_many.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+
+import avalon_crypto_utils.signing_backends as signing_backends
+from avalon_crypto_utils.worker_signing import WorkerSign
+
+
+def _rate(function, args, min_secs):
+    """Call function on args until min_secs elapsed, return calls/s."""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for arg in args:
+            function(*arg)
+        count += len(args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_secs:
+            return count / elapsed
+
+
+def _measure(backend, digests, min_secs):
+    signer = WorkerSign(backend)
+    signer.generate_signing_key()
+    pem = signer.get_public_sign_key()
+    signatures = [signer.sign_message(d) for d in digests]
+    # Warm up, e.g. the verifying key cache
+    signer.verify_signature_from_pubkey(signatures[0], digests[0], pem)
+    backend = signer.backend
+    return {
+        "uncached_signs_per_sec": round(_rate(
+            backend.sign_digest,
+            [(signer.sign_private_key, d) for d in digests], min_secs)),
+        "signs_per_sec": round(_rate(
+            signer.sign_message, [(d,) for d in digests], min_secs)),
+        "sign_many_per_sec": round(len(digests) * _rate(
+            signer.sign_many, [(digests,)], min_secs)),
+        "verifies_per_sec": round(_rate(
+            signer.verify_signature_from_pubkey,
+            [(s, d, pem) for s, d in zip(signatures, digests)], min_secs)),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("backends", nargs="*",
+                        help="Backends to measure, all installed by default")
+    parser.add_argument("--seconds", type=float, default=2.0,
+                        help="Minimum duration of each measurement")
+    options = parser.parse_args(args)
+
+    digests = [hashlib.sha256(str(i).encode()).digest() for i in range(64)]
+    results = {}
+    for backend in options.backends or signing_backends.available_backends():
+        results[backend] = _measure(backend, digests, options.seconds)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Memory benchmark comparing WorkOrderParams and CompactWorkOrderParams.
+
+Builds a number of work order params of each kind, with one inData item
+each, and reports the memory retained per instance as measured by
+tracemalloc.
+"""
+
+import argparse
+import gc
+import json
+import secrets
+import tracemalloc
+
+import avalon_crypto_utils.crypto_utility as crypto_utility
+import avalon_crypto_utils.worker_encryption as worker_encryption
+from work_order.work_order_params import WorkOrderParams
+from work_order.compact_work_order_params import CompactWorkOrderParams
+
+
+def _build(params_class, count, common):
+    params_list = []
+    for _ in range(count):
+        params = params_class()
+        params.create_request(
+            secrets.token_hex(32), common["worker_id"],
+            common["workload_id"], common["requester_id"],
+            common["session_key"], common["session_iv"],
+            secrets.token_hex(16),
+            worker_encryption_key=common["worker_encryption_key"],
+            encrypted_session_key=common["encrypted_session_key"])
+        params.add_in_data(common["in_data"])
+        params_list.append(params)
+    return params_list
+
+
+def _measure(params_class, count, common):
+    # Warm up so that one-time allocations such as the schema
+    # caches are not attributed to the instances
+    _build(params_class, 1, common)
+    gc.collect()
+    tracemalloc.start()
+    params_list = _build(params_class, count, common)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del params_list
+    return current / count
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--count", type=int, default=5000,
+                        help="Number of instances to build of each kind")
+    parser.add_argument("--payload-size", type=int, default=64,
+                        help="Size of the inData item in bytes")
+    options = parser.parse_args(args)
+
+    encrypt = worker_encryption.WorkerEncrypt()
+    encrypt.generate_rsa_key()
+    session_key = encrypt.generate_session_key()
+    worker_encryption_key = encrypt.get_rsa_public_key().decode("UTF-8")
+    common = {
+        "worker_id": secrets.token_hex(32),
+        "workload_id": "echo-result".encode("UTF-8").hex(),
+        "requester_id": secrets.token_hex(32),
+        "session_key": session_key,
+        "session_iv": encrypt.generate_iv(),
+        "worker_encryption_key": worker_encryption_key,
+        "encrypted_session_key": crypto_utility.byte_array_to_hex(
+            encrypt.encrypt_session_key(session_key, worker_encryption_key)),
+        "in_data": "x" * options.payload_size
+    }
+
+    results = {}
+    for params_class in (WorkOrderParams, CompactWorkOrderParams):
+        results[params_class.__name__] = round(
+            _measure(params_class, options.count, common))
+    results["count"] = options.count
+    results["payload_size"] = options.payload_size
+    print(json.dumps({"bytes_per_instance": results}, indent=4))
+
+
+if __name__ == "__main__":
+    main()
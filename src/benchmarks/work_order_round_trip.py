@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+End-to-end benchmark of direct model work order round trips.
+
+Work orders are built, submitted, polled for and their results verified
+and decrypted against the mock listener, started in-process unless the
+URL of a running listener is given. Every round trip is timed per stage:
+
+    session_key  session key and IV generation, RSA encryption
+    params       WorkOrderParams.create_request
+    in_data      inData encryption
+    hash_sign    request hash and requester signature
+    serialize    request serialization to JSON
+    submit       WorkOrderSubmit call
+    poll         WorkOrderGetResult calls until the result is available
+    verify       result signature verification
+    decrypt      outData decryption
+
+Each combination of payload size, inData item count and concurrency is
+a case. Its throughput and the latency percentiles of every stage and
+of the whole round trip are written as JSON, with the Python version,
+platform and ECDSA backend, to compare runs across SDK versions.
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import logging
+import os
+import platform
+import secrets
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from enums.error_code import SignatureStatus, WorkOrderStatus
+from enums.worker import WorkerType
+from avalon_crypto_utils.worker_encryption import WorkerEncrypt
+from avalon_crypto_utils.worker_signing import WorkerSign
+from avalon_sdk_direct.jrpc_work_order import JRPCWorkOrderImpl
+from avalon_sdk_direct.jrpc_worker_registry import JRPCWorkerRegistryImpl
+from avalon_sdk_direct.mock_listener import MockListener
+from work_order.work_order_params import WorkOrderParams
+
+STAGES = ("session_key", "params", "in_data", "hash_sign", "serialize",
+          "submit", "poll", "verify", "decrypt")
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def _percentiles(samples_secs):
+    """Return latency statistics in milliseconds."""
+    samples = sorted(samples_secs)
+    if not samples:
+        return {}
+
+    def at(fraction):
+        return round(samples[min(len(samples) - 1,
+                                 int(fraction * len(samples)))] * 1000, 3)
+    return {
+        "mean": round(sum(samples) / len(samples) * 1000, 3),
+        "p50": at(0.50),
+        "p90": at(0.90),
+        "p99": at(0.99),
+        "max": round(samples[-1] * 1000, 3),
+    }
+
+
+class _Client(object):
+    """Worker details and SDK objects shared by the round trips."""
+
+    def __init__(self, url, poll_interval_secs):
+        config = {"json_rpc_uri": url}
+        registry = JRPCWorkerRegistryImpl(config)
+        lookup = registry.worker_lookup(WorkerType.TEE_SGX, None, None, 1)
+        self.worker_id = lookup["result"]["ids"][0]
+        worker = registry.worker_retrieve(self.worker_id, 2)["result"]
+        worker_type_data = worker["details"]["workerTypeData"]
+        self.encryption_key = worker_type_data["encryptionKey"]
+        self.verification_key = worker_type_data["verificationKey"]
+        self.work_order = JRPCWorkOrderImpl(config)
+        self.signer = WorkerSign()
+        self.signer.generate_signing_key()
+        self.requester_id = secrets.token_hex(32)
+        self.poll_interval_secs = poll_interval_secs
+        self.ids = itertools.count(3)
+
+    def round_trip(self, in_data):
+        """
+        Run one work order and return the duration of each stage in
+        seconds.
+        """
+        timings = {}
+        clock = time.perf_counter
+        encrypt = WorkerEncrypt()
+
+        start = clock()
+        session_key = encrypt.generate_session_key()
+        session_iv = encrypt.generate_iv()
+        encrypted_session_key = encrypt.encrypt_session_key(
+            session_key, self.encryption_key).hex()
+        timings["session_key"] = clock() - start
+
+        start = clock()
+        work_order_id = secrets.token_hex(32)
+        params = WorkOrderParams()
+        params.create_request(
+            work_order_id, self.worker_id, "echo".encode("UTF-8").hex(),
+            self.requester_id, session_key, session_iv,
+            secrets.token_hex(16),
+            worker_encryption_key=self.encryption_key,
+            data_encryption_algorithm="AES-GCM-256",
+            encrypted_session_key=encrypted_session_key)
+        timings["params"] = clock() - start
+
+        start = clock()
+        for data in in_data:
+            params.add_in_data(data)
+        timings["in_data"] = clock() - start
+
+        start = clock()
+        params.add_encrypted_request_hash()
+        if not params.add_requester_signature(self.signer):
+            raise RuntimeError("Signing the request failed")
+        timings["hash_sign"] = clock() - start
+
+        start = clock()
+        request = params.to_string()
+        timings["serialize"] = clock() - start
+
+        start = clock()
+        response = self.work_order.work_order_submit(
+            request, next(self.ids))
+        timings["submit"] = clock() - start
+        if response.get("error", {}).get("code") != WorkOrderStatus.PENDING:
+            raise RuntimeError("Submit failed: {}".format(response))
+
+        start = clock()
+        while True:
+            response = self.work_order.work_order_get_result_nonblocking(
+                work_order_id, next(self.ids))
+            if response.get("error", {}).get("code") != \
+                    WorkOrderStatus.PENDING:
+                break
+            time.sleep(self.poll_interval_secs)
+        timings["poll"] = clock() - start
+        if "result" not in response:
+            raise RuntimeError("Get result failed: {}".format(response))
+
+        start = clock()
+        status = WorkerSign().verify_signature(
+            response["result"], self.verification_key)
+        timings["verify"] = clock() - start
+        if status != SignatureStatus.PASSED:
+            raise RuntimeError("Result signature verification failed")
+
+        start = clock()
+        out_data = encrypt.decrypt_work_order_data_json(
+            response["result"]["outData"], session_key, session_iv)
+        timings["decrypt"] = clock() - start
+        if len(out_data) != len(in_data):
+            raise RuntimeError("Unexpected outData")
+        return timings
+
+
+def _run_case(client, payload_bytes, items, concurrency, work_orders):
+    # Random printable data, so that the payload does not compress
+    in_data = [base64.b64encode(os.urandom(payload_bytes))
+               .decode("ascii")[:payload_bytes] for _ in range(items)]
+    # Warm up caches and connections
+    client.round_trip(in_data)
+
+    def timed_round_trip(_):
+        start = time.perf_counter()
+        try:
+            timings = client.round_trip(in_data)
+        except Exception as e:
+            logging.warning("Round trip failed: %s", e)
+            return None
+        timings["total"] = time.perf_counter() - start
+        return timings
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_round_trip, range(work_orders)))
+    elapsed = time.perf_counter() - start
+
+    completed = [r for r in results if r is not None]
+    return {
+        "payload_bytes": payload_bytes,
+        "items": items,
+        "concurrency": concurrency,
+        "work_orders": work_orders,
+        "errors": work_orders - len(completed),
+        "throughput_per_sec": round(len(completed) / elapsed, 2),
+        "latency_ms": {
+            stage: _percentiles([r[stage] for r in completed])
+            for stage in STAGES + ("total",)},
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url",
+                        help="URL of a running listener instead of the "
+                        "in-process mock listener")
+    parser.add_argument("--payload-sizes", type=_int_list,
+                        default=[1024, 65536],
+                        help="Comma separated inData item sizes in bytes")
+    parser.add_argument("--items", type=_int_list, default=[1, 4],
+                        help="Comma separated inData item counts")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4],
+                        help="Comma separated numbers of concurrent work "
+                        "orders")
+    parser.add_argument("--work-orders", type=int, default=20,
+                        help="Work orders per case")
+    parser.add_argument("--poll-interval-ms", type=float, default=1.0,
+                        help="Delay between WorkOrderGetResult calls")
+    parser.add_argument("--pending-ms", type=float, default=0.0,
+                        help="PENDING time of the mock listener")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Response latency of the mock listener")
+    parser.add_argument("--label", default="",
+                        help="Label of the run, e.g. the SDK version")
+    parser.add_argument("--output",
+                        help="File to write the results to, "
+                        "default stdout")
+    options = parser.parse_args(args)
+
+    # The SDK logs every request at INFO level
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        level=logging.WARNING)
+
+    listener = None
+    url = options.url
+    if url is None:
+        listener = MockListener(
+            latency_secs=options.latency_ms / 1000,
+            pending_secs=options.pending_ms / 1000).start()
+        url = listener.url
+    try:
+        client = _Client(url, options.poll_interval_ms / 1000)
+        cases = [
+            _run_case(client, payload_bytes, items, concurrency,
+                      options.work_orders)
+            for payload_bytes, items, concurrency in itertools.product(
+                options.payload_sizes, options.items, options.concurrency)]
+    finally:
+        if listener is not None:
+            listener.stop()
+
+    results = {
+        "label": options.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "ecdsa_backend": client.signer.backend.name,
+        "listener": "mock" if listener is not None else url,
+        "cases": cases,
+    }
+    output = json.dumps(results, indent=4)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0 if all(case["errors"] == 0 for case in cases) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
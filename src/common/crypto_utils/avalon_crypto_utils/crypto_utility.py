@@ -12,8 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import base64
-import utility.hex_utils as hex_utils
+import utility.codec as codec
 import secrets
 import string
 
@@ -33,8 +32,7 @@ def strip_begin_end_public_key(key):
 
 # -----------------------------------------------------------------------------
 def byte_array_to_hex(byte_array):
-    hex_value = hex_utils.byte_array_to_hex_str(byte_array)
-    return hex_value.upper()
+    return codec.hex_encode(byte_array, upper=True)
 
 
 # -----------------------------------------------------------------------------
@@ -59,9 +57,7 @@ def base64_to_byte_array(b64_str):
         base64 decoded data in bytes.
     """
     try:
-        b64_bytes = b64_str.encode('UTF-8')
-        b64_dec_bytes = base64.b64decode(b64_bytes)
-        return b64_dec_bytes
+        return codec.b64_decode(b64_str)
     except Exception as e:
         err_msg = "base64 string decode to byte array failed: " + str(e)
         logger.error(err_msg)
@@ -79,9 +75,7 @@ def byte_array_to_base64(data_bytes):
         Base64 encoded string.
     """
     try:
-        b64 = base64.b64encode(data_bytes)
-        b64_str = b64.decode('UTF-8')
-        return b64_str
+        return codec.b64_encode(data_bytes)
     except Exception as e:
         err_msg = "byte array to base64 encode string failed: " + str(e)
         logger.error(err_msg)
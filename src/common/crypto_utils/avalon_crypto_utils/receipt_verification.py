@@ -0,0 +1,231 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bulk verification of work order receipt signatures.
+
+Record preparation (hashing and decoding) is done in the calling process;
+the ECDSA verifications are spread across a process pool. Each worker
+process uses the default signing backend, which keeps parsed verifying
+keys, so a key shared by many receipts is parsed once per process.
+"""
+
+import collections
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import avalon_crypto_utils.signing_backends as signing_backends
+from avalon_crypto_utils.worker_signing import WorkerSign
+
+logger = logging.getLogger(__name__)
+
+# Record kinds
+RECEIPT_CREATE = "create"
+RECEIPT_UPDATE = "update"
+
+VerificationResult = collections.namedtuple(
+    "VerificationResult", ["index", "work_order_id", "kind", "passed",
+                           "error"])
+VerificationResult.__doc__ = """
+Outcome of verifying one record. index is the position of the record in
+the input, passed is True if the signature is valid and error describes
+why a record could not be verified.
+"""
+
+VerificationProgress = collections.namedtuple(
+    "VerificationProgress", ["verified", "failed", "elapsed_secs",
+                             "records_per_sec"])
+
+
+def _verify_batch(batch):
+    """
+    Verify a batch of prepared records.
+
+    Parameters:
+        batch: List of (index, signature bytes, hash bytes, PEM key bytes)
+    Returns:
+        List of (index, passed, error) tuples.
+    """
+    backend = signing_backends.get_backend()
+    results = []
+    for index, signature, digest, pem_bytes in batch:
+        try:
+            passed = backend.verify_digest(
+                backend.public_key(pem_bytes), signature, digest)
+            results.append((index, passed, None))
+        except Exception as e:
+            results.append((index, False, "Verify signature failed: " +
+                            str(e)))
+    return results
+
+
+def record_kind(record):
+    """
+    Return RECEIPT_UPDATE for WorkOrderReceiptUpdateRetrieve payloads and
+    RECEIPT_CREATE for receipt create params, with or without the
+    JSON RPC "params" wrapper.
+    """
+    if "updateSignature" in record:
+        return RECEIPT_UPDATE
+    return RECEIPT_CREATE
+
+
+def _prepare(record):
+    """
+    Return (work order ID, kind, (signature, hash, key)) of a record.
+    """
+    kind = record_kind(record)
+    if kind == RECEIPT_UPDATE:
+        return record.get("workOrderId"), kind, \
+            WorkerSign.update_receipt_signed_data(record)
+    params = record.get("params", record)
+    return params.get("workOrderId"), kind, \
+        WorkerSign.create_receipt_signed_data(params)
+
+
+class BulkReceiptVerifier(object):
+    """
+    Verifies the signatures of many work order receipts and receipt
+    updates in parallel and streams the results back.
+    """
+
+    def __init__(self, processes=None, batch_size=256,
+                 progress_callback=None, progress_interval_secs=5.0):
+        """
+        Parameters:
+            processes: Number of worker processes, defaults to the
+                number of CPUs. With 1 the records are verified in the
+                calling process.
+            batch_size: Number of records sent to a process at a time
+            progress_callback: Optional function called with a
+                VerificationProgress every progress_interval_secs and
+                once at the end
+            progress_interval_secs: Interval of progress reports
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.progress_callback = progress_callback
+        self.progress_interval_secs = progress_interval_secs
+        self.verified = 0
+        self.failed = 0
+        self.elapsed_secs = 0.0
+
+    def verify(self, records):
+        """
+        Verify receipt and receipt update records.
+
+        Parameters:
+            records: Iterable of dictionaries, each either a receipt as
+                verified by WorkerSign.verify_create_receipt_signature or a
+                receipt update as verified by
+                WorkerSign.verify_update_receipt_signature
+        Returns:
+            Generator of VerificationResult in completion order. Records
+            are read from the iterable as verification progresses, so
+            arbitrarily long streams can be verified.
+        """
+        self.verified = 0
+        self.failed = 0
+        self.elapsed_secs = 0.0
+        start = time.monotonic()
+        self.__start = start
+        self.__last_report = start
+
+        batches = self.__batches(records)
+        if self.processes == 1:
+            for batch, meta in batches:
+                yield from self.__results(_verify_batch(batch), meta)
+        else:
+            yield from self.__verify_parallel(batches)
+        self.__report(force=True)
+
+    def __verify_parallel(self, batches):
+        # Keep a bounded number of batches in flight so that records
+        # are pulled from the input only as fast as they are verified
+        max_pending = self.processes * 2
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            pending = {}
+            for batch, meta in itertools.islice(batches, max_pending):
+                pending[executor.submit(_verify_batch, batch)] = meta
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    meta = pending.pop(future)
+                    yield from self.__results(future.result(), meta)
+                    for batch, next_meta in itertools.islice(batches, 1):
+                        pending[executor.submit(_verify_batch, batch)] = \
+                            next_meta
+
+    def __batches(self, records):
+        """
+        Generate (batch, meta) pairs. batch holds the prepared records
+        for _verify_batch, meta maps an index to (work order ID, kind)
+        and also carries the records that failed preparation.
+        """
+        batch = []
+        meta = {}
+        for index, record in enumerate(records):
+            try:
+                work_order_id, kind, signed_data = _prepare(record)
+            except Exception as e:
+                meta[index] = (record.get("workOrderId") if
+                               isinstance(record, dict) else None,
+                               None, "Invalid record: " + repr(e))
+                continue
+            batch.append((index,) + tuple(signed_data))
+            meta[index] = (work_order_id, kind, None)
+            if len(batch) >= self.batch_size:
+                yield batch, meta
+                batch = []
+                meta = {}
+        if batch or meta:
+            yield batch, meta
+
+    def __results(self, verified, meta):
+        for index, passed, error in verified:
+            work_order_id, kind, _ = meta.pop(index)
+            yield self.__result(index, work_order_id, kind, passed, error)
+        # Records rejected before verification
+        for index, (work_order_id, kind, error) in sorted(meta.items()):
+            yield self.__result(index, work_order_id, kind, False, error)
+        self.__report()
+
+    def __result(self, index, work_order_id, kind, passed, error):
+        if passed:
+            self.verified += 1
+        else:
+            self.failed += 1
+            if error is None:
+                error = "Signature mismatch"
+        return VerificationResult(index, work_order_id, kind, passed, error)
+
+    def __report(self, force=False):
+        now = time.monotonic()
+        self.elapsed_secs = now - self.__start
+        if not force and \
+                now - self.__last_report < self.progress_interval_secs:
+            return
+        self.__last_report = now
+        total = self.verified + self.failed
+        progress = VerificationProgress(
+            self.verified, self.failed, self.elapsed_secs,
+            total / self.elapsed_secs if self.elapsed_secs else 0.0)
+        logger.info("Verified %d receipts, %d failed, %.1f per second",
+                    progress.verified, progress.failed,
+                    progress.records_per_sec)
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
@@ -0,0 +1,340 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+ECDSA (SECP256k1) backends used by WorkerSign.
+
+Every backend signs SHA-256 digests into DER encoded signatures and
+exchanges public keys as PEM encoded SubjectPublicKeyInfo in the format
+of the ecdsa package, so keys and signatures are interchangeable between
+backends. Nonce derivation
+differs between libraries, so the signature bytes for the same digest
+do.
+
+Available backends, in order of preference:
+    coincurve:    libsecp256k1 bindings
+    cryptography: OpenSSL bindings
+    ecdsa:        pure Python, always available as fallback
+
+The AVALON_ECDSA_BACKEND environment variable selects a backend by name
+instead of auto-detection.
+
+signing_context() binds a private key for repeated signing. All
+signing, batches included, is done by the backend's library.
+"""
+
+import base64
+import functools
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Order of the SECP256k1 group
+_CURVE_ORDER = \
+    0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+# DER prefix of an uncompressed SECP256k1 SubjectPublicKeyInfo:
+# id-ecPublicKey with the secp256k1 named curve, followed by a 65 byte
+# bit string holding 0x04 || X || Y
+_SPKI_PREFIX = bytes.fromhex(
+    "3056301006072a8648ce3d020106052b8104000a034200")
+
+
+def _der_to_pem(der_bytes):
+    # 76 characters per line like the ecdsa package, so that the PEM
+    # strings in requests do not depend on the backend
+    b64 = base64.b64encode(der_bytes).decode("ascii")
+    lines = [b64[i:i + 76] for i in range(0, len(b64), 76)]
+    return ("-----BEGIN PUBLIC KEY-----\n" + "\n".join(lines) +
+            "\n-----END PUBLIC KEY-----\n").encode("ascii")
+
+
+def _pem_to_der(pem_bytes):
+    if isinstance(pem_bytes, str):
+        pem_bytes = pem_bytes.encode("ascii")
+    lines = [line for line in pem_bytes.strip().splitlines()
+             if not line.startswith(b"-----")]
+    return base64.b64decode(b"".join(lines))
+
+
+def _decode_der_signature(signature):
+    """Return (r, s) of a DER encoded ECDSA signature."""
+    if len(signature) < 8 or signature[0] != 0x30 or \
+            signature[1] != len(signature) - 2:
+        raise ValueError("Invalid DER signature")
+    values = []
+    pos = 2
+    for _ in range(2):
+        if signature[pos] != 0x02:
+            raise ValueError("Invalid DER signature")
+        length = signature[pos + 1]
+        values.append(int.from_bytes(
+            signature[pos + 2:pos + 2 + length], "big"))
+        pos += 2 + length
+    if pos != len(signature):
+        raise ValueError("Invalid DER signature")
+    return tuple(values)
+
+
+def _encode_der_signature(r, s):
+    """DER encode an ECDSA signature, as ecdsa's sigencode_der does."""
+    def encode_int(value):
+        data = value.to_bytes((value.bit_length() + 8) // 8, "big")
+        return b"\x02" + bytes([len(data)]) + data
+    body = encode_int(r) + encode_int(s)
+    return b"\x30" + bytes([len(body)]) + body
+
+
+class _SigningContext(object):
+    """
+    Private key bound for repeated signing, see
+    _Backend.signing_context().
+    """
+
+    def __init__(self, backend, private_key):
+        self.private_key = private_key
+        self._sign = functools.partial(backend.sign_digest, private_key)
+
+    def sign(self, digest):
+        """Sign a digest and return the DER encoded signature."""
+        return self._sign(digest)
+
+    def sign_many(self, digests):
+        """Sign digests and return the list of DER encoded signatures."""
+        sign = self._sign
+        return [sign(digest) for digest in digests]
+
+
+class _Backend(object):
+    """
+    Base class of the backends. Parsed public keys are cached since
+    the same few keys verify most signatures.
+    """
+    name = None
+
+    def __init__(self):
+        self.public_key = functools.lru_cache(maxsize=1024)(
+            self.load_public_key)
+
+    def generate_key(self):
+        """Generate a private key."""
+        raise NotImplementedError
+
+    def public_key_pem(self, private_key):
+        """Return the PEM encoded public key of a private key."""
+        raise NotImplementedError
+
+    def sign_digest(self, private_key, digest):
+        """Sign a digest and return the DER encoded signature."""
+        raise NotImplementedError
+
+    def signing_context(self, private_key):
+        """
+        Return a context with sign(digest) and sign_many(digests) methods
+        for repeated signing with a private key.
+        """
+        return _SigningContext(self, private_key)
+
+    def load_public_key(self, pem_bytes):
+        """Parse a PEM encoded public key; use public_key() instead."""
+        raise NotImplementedError
+
+    def verify_digest(self, public_key, signature, digest):
+        """
+        Verify a DER encoded signature of a digest with a public key
+        returned by public_key().
+
+        Returns:
+            True if the signature is valid, otherwise False.
+        """
+        raise NotImplementedError
+
+
+class EcdsaBackend(_Backend):
+    """Pure Python ecdsa package."""
+    name = "ecdsa"
+
+    def __init__(self):
+        import ecdsa
+        self.__ecdsa = ecdsa
+        super().__init__()
+
+    def generate_key(self):
+        return self.__ecdsa.SigningKey.generate(curve=self.__ecdsa.SECP256k1)
+
+    def public_key_pem(self, private_key):
+        return private_key.get_verifying_key().to_pem()
+
+    def sign_digest(self, private_key, digest):
+        return private_key.sign_digest_deterministic(
+            digest, sigencode=self.__ecdsa.util.sigencode_der)
+
+    def load_public_key(self, pem_bytes):
+        return self.__ecdsa.VerifyingKey.from_pem(pem_bytes)
+
+    def verify_digest(self, public_key, signature, digest):
+        try:
+            return public_key.verify_digest(
+                signature, digest, sigdecode=self.__ecdsa.util.sigdecode_der)
+        except self.__ecdsa.BadSignatureError:
+            return False
+
+
+class CoincurveBackend(_Backend):
+    """libsecp256k1 through the coincurve package."""
+    name = "coincurve"
+
+    def __init__(self):
+        import coincurve
+        self.__coincurve = coincurve
+        super().__init__()
+
+    def generate_key(self):
+        return self.__coincurve.PrivateKey()
+
+    def public_key_pem(self, private_key):
+        return _der_to_pem(
+            _SPKI_PREFIX + private_key.public_key.format(compressed=False))
+
+    def sign_digest(self, private_key, digest):
+        # hasher=None signs the 32 byte digest as it is
+        return private_key.sign(bytes(digest), hasher=None)
+
+    def load_public_key(self, pem_bytes):
+        der = _pem_to_der(pem_bytes)
+        if not der.startswith(_SPKI_PREFIX):
+            raise ValueError("Not an uncompressed SECP256k1 public key")
+        return self.__coincurve.PublicKey(der[len(_SPKI_PREFIX):])
+
+    def verify_digest(self, public_key, signature, digest):
+        # libsecp256k1 only accepts low-S signatures, other libraries
+        # may produce either
+        r, s = _decode_der_signature(signature)
+        if s > _CURVE_ORDER // 2:
+            signature = _encode_der_signature(r, _CURVE_ORDER - s)
+        return public_key.verify(bytes(signature), bytes(digest),
+                                 hasher=None)
+
+
+class CryptographyBackend(_Backend):
+    """OpenSSL through the cryptography package."""
+    name = "cryptography"
+
+    def __init__(self):
+        from cryptography.exceptions import InvalidSignature, \
+            UnsupportedAlgorithm
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec, utils
+        self.__invalid_signature = InvalidSignature
+        self.__serialization = serialization
+        self.__ec = ec
+        try:
+            # RFC 6979 nonces like the ecdsa backend, where supported by
+            # cryptography (version 43 and later) and OpenSSL (3.2 and
+            # later)
+            self.__algorithm = ec.ECDSA(utils.Prehashed(hashes.SHA256()),
+                                        deterministic_signing=True)
+        except (TypeError, UnsupportedAlgorithm):
+            self.__algorithm = ec.ECDSA(utils.Prehashed(hashes.SHA256()))
+        super().__init__()
+
+    def generate_key(self):
+        return self.__ec.generate_private_key(self.__ec.SECP256K1())
+
+    def public_key_pem(self, private_key):
+        return _der_to_pem(private_key.public_key().public_bytes(
+            self.__serialization.Encoding.DER,
+            self.__serialization.PublicFormat.SubjectPublicKeyInfo))
+
+    def sign_digest(self, private_key, digest):
+        return private_key.sign(bytes(digest), self.__algorithm)
+
+    def load_public_key(self, pem_bytes):
+        if isinstance(pem_bytes, str):
+            pem_bytes = pem_bytes.encode("ascii")
+        return self.__serialization.load_pem_public_key(pem_bytes)
+
+    def verify_digest(self, public_key, signature, digest):
+        try:
+            public_key.verify(bytes(signature), bytes(digest),
+                              self.__algorithm)
+            return True
+        except self.__invalid_signature:
+            return False
+
+
+_BACKENDS = (CoincurveBackend, CryptographyBackend, EcdsaBackend)
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """
+    Return a signing backend.
+
+    Parameters:
+        name: Optional backend name. If None, the AVALON_ECDSA_BACKEND
+            environment variable or else the first available backend
+            is used.
+    Returns:
+        Shared backend instance.
+        Raises ImportError if the backend's library is not installed.
+    """
+    name = name or os.environ.get("AVALON_ECDSA_BACKEND")
+    with _backends_lock:
+        if name in _backends:
+            return _backends[name]
+        candidates = [b for b in _BACKENDS if name in (None, b.name)]
+        if not candidates:
+            raise ValueError("Unknown ECDSA backend " + name)
+        for backend_class in candidates:
+            try:
+                backend = backend_class()
+            except ImportError:
+                if name is not None:
+                    raise
+                continue
+            logger.debug("Using %s ECDSA backend", backend.name)
+            _backends[name] = backend
+            _backends[backend.name] = backend
+            return backend
+        raise ImportError("No ECDSA backend available")
+
+
+def backend_of_key(private_key):
+    """
+    Return the backend a private key object belongs to, e.g. the ecdsa
+    backend for an ecdsa.SigningKey.
+    Raises ValueError if no backend handles keys of its type.
+    """
+    # Every backend is named after the package of its key objects
+    name = type(private_key).__module__.partition(".")[0]
+    if name not in [b.name for b in _BACKENDS]:
+        raise ValueError("Not a private key of an ECDSA backend: " +
+                         type(private_key).__name__)
+    return get_backend(name)
+
+
+def available_backends():
+    """Return the names of the backends whose library is installed."""
+    names = []
+    for backend_class in _BACKENDS:
+        try:
+            get_backend(backend_class.name)
+        except ImportError:
+            continue
+        names.append(backend_class.name)
+    return names
@@ -13,18 +13,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import sys
 import logging
-from Cryptodome.PublicKey import RSA
-from Cryptodome.Random import get_random_bytes
-from Cryptodome.Cipher import AES, PKCS1_OAEP
-from Cryptodome.Random import get_random_bytes
 
 import avalon_crypto_utils.crypto_utility as crypto_utility
+import utility.tracing as tracing
+
+# Cryptodome is imported by the methods that use it, so that importing
+# this module does not load it.
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-logger.addHandler(logging.StreamHandler(sys.stdout))
 
 # -------------------------------------------------------------------------
 
@@ -62,6 +59,8 @@ class WorkerEncrypt(object):
         """
         Generate 2048 bits RSA key pair.
         """
+        from Cryptodome.PublicKey import RSA
+
         key = RSA.generate(WorkerEncrypt.RSA_KEY_SIZE)
         self.rsa_private_key = key.export_key()
         self.rsa_public_key = key.publickey().export_key()
@@ -86,6 +85,8 @@ class WorkerEncrypt(object):
         Returns :
             32 bytes random session key
         """
+        from Cryptodome.Random import get_random_bytes
+
         return get_random_bytes(WorkerEncrypt.SYM_KEY_SIZE)
 
 # -------------------------------------------------------------------------
@@ -97,6 +98,8 @@ class WorkerEncrypt(object):
         Returns :
             12 bytes random iv
         """
+        from Cryptodome.Random import get_random_bytes
+
         return get_random_bytes(WorkerEncrypt.IV_SIZE)
 
 # -------------------------------------------------------------------------
@@ -115,6 +118,9 @@ class WorkerEncrypt(object):
             decrypted session key in bytes.
             Raises exception in case of error.
         """
+        from Cryptodome.PublicKey import RSA
+        from Cryptodome.Cipher import PKCS1_OAEP
+
         if rsa_public_key is None:
             rsa_public_key = self.rsa_public_key
         try:
@@ -142,6 +148,9 @@ class WorkerEncrypt(object):
             decrypted session key in bytes.
             Raises exception in case of error.
         """
+        from Cryptodome.PublicKey import RSA
+        from Cryptodome.Cipher import PKCS1_OAEP
+
         if rsa_private_key is None:
             rsa_private_key = self.rsa_private_key
         try:
@@ -155,91 +164,138 @@ class WorkerEncrypt(object):
 
 # -------------------------------------------------------------------------
 
-    def encrypt_data(self, data_bytes, session_key, iv=None):
+    def encrypt_data(self, data_bytes, session_key, iv=None, output=None):
         """
         Encrypt (AES-GCM) data bytes with session key (symmetric key).
 
+        The IV, ciphertext and tag are written into a single buffer
+        without intermediate copies of the data.
+
         Parameters :
-            data_bytes: data bytes to encrypt
+            data_bytes: data to encrypt as bytes, bytearray or memoryview
             session_key: symmetric key used for decryption
             iv: initialization vector corresponding to the session key
                 if iv is None then a random 12 bytes iv is generated and
                 prepended to the encrypted data.
+            output: optional writable buffer (bytearray or memoryview)
+                to write the encrypted data into. It must be at least
+                len(data_bytes) + TAG_SIZE bytes long, plus IV_SIZE if
+                iv is None.
         Returns :
-            encrypted data in bytes.
+            encrypted data as bytes, or as memoryview of the
+            written part of output if output is given.
             Raises exception in case of error.
         """
-        # If iv passed is none, generate a random iv
+        from Cryptodome.Cipher import AES
+
+        # If iv passed is none, generate a random iv, prepended
+        # in encrypted data : iv + Cipher + Tag
+        # otherwise Cipher + Tag
         if iv is None:
             iv = self.generate_iv()
-            generate_iv = True
+            iv_length = WorkerEncrypt.IV_SIZE
         else:
-            generate_iv = False
+            iv_length = 0
 
         try:
+            data_view = memoryview(data_bytes).cast("B")
+            data_length = len(data_view)
+            total_length = iv_length + data_length + WorkerEncrypt.TAG_SIZE
+            if output is None:
+                result = bytearray(total_length)
+                view = memoryview(result)
+            else:
+                view = memoryview(output).cast("B")
+                if len(view) < total_length:
+                    raise ValueError(
+                        "Output buffer too small, %d bytes needed" %
+                        total_length)
+                view = view[:total_length]
+                result = view
+            if iv_length:
+                view[:iv_length] = iv
             cipher_aes = AES.new(session_key, AES.MODE_GCM, iv)
-            ciphertext, tag = cipher_aes.encrypt_and_digest(data_bytes)
+            cipher_aes.encrypt(data_view, output=view[
+                iv_length:iv_length + data_length])
+            view[iv_length + data_length:] = cipher_aes.digest()
         except Exception as e:
             err_msg = "Encrypt data failed: " + str(e)
             logger.error(err_msg)
             raise
-
-        if generate_iv:
-            # if iv passed by user is None, iv(generated) is prepended
-            # in encrypted data : iv + Cipher + Tag
-            result = iv + ciphertext + tag
-        else:
-            # Cipher + Tag
-            result = ciphertext + tag
-        return result
+        return bytes(result) if output is None else result
 
 # -------------------------------------------------------------------------
 
-    def decrypt_data(self, enc_data_bytes, session_key, iv=None):
+    def decrypt_data(self, enc_data_bytes, session_key, iv=None,
+                     output=None):
         """
         Decrypt (AES-GCM) encrypted data bytes with
         session key (symmetric key).
 
+        The IV, ciphertext and tag are read through views of
+        enc_data_bytes without copying them.
+
         Parameters :
-            enc_data_bytes: encrypted data in bytes
+            enc_data_bytes: encrypted data as bytes, bytearray or
+                memoryview
             session_key: symmetric key used for decryption
             iv: initialization vector corresponding to the session key
                 if iv is None the it's assumed that 12 bytes iv is prepended
                 to the encrypted data.
+            output: optional writable buffer (bytearray or memoryview)
+                to write the decrypted data into. It must be at least as
+                long as the ciphertext. It is zeroed if verification
+                fails.
         Returns :
-            decrypted data in bytes.
+            decrypted data as bytes, or as memoryview of the
+            written part of output if output is given.
             Raises exception in case of error.
         """
+        from Cryptodome.Cipher import AES
+
+        enc_view = memoryview(enc_data_bytes).cast("B")
         # if iv is None the it's assumed that 12 bytes iv is prepended
         # in encrypted data
         if iv is None:
             iv_length = WorkerEncrypt.IV_SIZE
-            iv = enc_data_bytes[:iv_length]
-            use_generated_iv = True
+            iv = enc_view[:iv_length]
         else:
-            use_generated_iv = False
-
-        cipher_aes = AES.new(session_key, AES.MODE_GCM, iv)
+            iv_length = 0
         tag_size = WorkerEncrypt.TAG_SIZE
-        tag = enc_data_bytes[-tag_size:]
-        if use_generated_iv:
-            ciphertext_len = len(enc_data_bytes) - iv_length - tag_size
-            ciphertext = enc_data_bytes[iv_length: iv_length + ciphertext_len]
-        else:
-            ciphertext_len = len(enc_data_bytes) - tag_size
-            ciphertext = enc_data_bytes[: ciphertext_len]
+        ciphertext_len = len(enc_view) - iv_length - tag_size
+        ciphertext = enc_view[iv_length:iv_length + ciphertext_len]
+        tag = enc_view[iv_length + ciphertext_len:]
 
+        view = None
         try:
-            result = cipher_aes.decrypt_and_verify(ciphertext, tag)
-            logger.info("Decryption result at client - %s", result)
+            if ciphertext_len < 0:
+                raise ValueError("Encrypted data too short")
+            if output is None:
+                result = bytearray(ciphertext_len)
+                view = memoryview(result)
+            else:
+                view = memoryview(output).cast("B")
+                if len(view) < ciphertext_len:
+                    raise ValueError(
+                        "Output buffer too small, %d bytes needed" %
+                        ciphertext_len)
+                view = view[:ciphertext_len]
+                result = view
+            cipher_aes = AES.new(session_key, AES.MODE_GCM, iv)
+            cipher_aes.decrypt(ciphertext, output=view)
+            cipher_aes.verify(tag)
         except Exception as e:
+            if view is not None:
+                # Do not leave unauthenticated plaintext behind
+                view[:] = bytes(len(view))
             err_msg = "Decrypt data failed: " + str(e)
             logger.error(err_msg)
             raise
-        return result
+        return bytes(result) if output is None else result
 
 # -------------------------------------------------------------------------
 
+    @tracing.traced("WorkerEncrypt.decrypt_work_order_data_json")
     def decrypt_work_order_data_json(self, data_objects,
                                      session_key, session_iv=None):
         """
@@ -278,7 +334,7 @@ class WorkerEncrypt(object):
                 # Decrypt data key
                 data_key = self.decrypt_data_encryption_key(e_key,
                                                             iv,
-                                                            sesssion_key)
+                                                            session_key)
             if not do_decrypt:
                 item['data'] = crypto_utility.base64_to_byte_array(data)
             else:
@@ -333,14 +389,14 @@ class WorkerEncrypt(object):
                 # Decrypt data key
                 data_key = self.decrypt_data_encryption_key(e_key,
                                                             data_iv,
-                                                            sesssion_key)
+                                                            session_key)
                 enc_data = self.encrypt_data(data, data_key, data_iv)
                 item['data'] = crypto_utility.byte_array_to_base64(enc_data)
             i = i + 1
 
 # -------------------------------------------------------------------------
 
-    def decrypt_data_encryption_key(self, e_key, iv, sesssion_key):
+    def decrypt_data_encryption_key(self, e_key, iv, session_key):
         """
         Decrypts data encryption key in InData/OutData items.
         Based on TC spec v1.1 section 6.5, data encryption key is double
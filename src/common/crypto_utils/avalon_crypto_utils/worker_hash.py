@@ -13,14 +13,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import sys
+import hashlib
 import logging
-from Cryptodome.Hash import SHA256
 
+import utility.codec as codec
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-logger.addHandler(logging.StreamHandler(sys.stdout))
 
 # -------------------------------------------------------------------------
 
@@ -80,7 +78,7 @@ class WorkerHash():
         concat_bytes = concat_string.encode("UTF-8")
         # SHA-256 hashing is used
         hash_1 = self.compute_message_hash(concat_bytes)
-        hash_2 = ""
+        hash_2 = b""
         # Compute outData hash
         if "outData" in wo_response and \
                 len(wo_response["outData"]) > 0:
@@ -138,9 +136,7 @@ class WorkerHash():
         Returns :
             SHA256 message hash.
         """
-        hash_obj = SHA256.new()
-        hash_obj.update(message_bytes)
-        return hash_obj.digest()
+        return hashlib.sha256(message_bytes).digest()
 
 # -------------------------------------------------------------------------
 
@@ -156,10 +152,10 @@ class WorkerHash():
         verify_success = True
         msg_hash = self.compute_message_hash(msg)
         # Convert both hash hex string values to upper case
-        msg_hash_hex = hex_utils.byte_array_to_hex_str(msg_hash).upper()
+        msg_hash_hex = codec.hex_encode(msg_hash, upper=True)
         data_hash = data_hash.upper()
         if msg_hash_hex == data_hash:
-            logger.info("Computed hash of message matched with data hash")
+            logger.debug("Computed hash of message matched with data hash")
         else:
             logger.error(
                 "Computed hash of message does not match with data hash")
@@ -14,18 +14,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sys
 import logging
-from ecdsa import SigningKey, VerifyingKey, SECP256k1
-from ecdsa.util import sigencode_der, sigdecode_der
 import avalon_crypto_utils.crypto_utility as crypto_utility
+from enums.error_code import SignatureStatus
 from utility.hex_utils import hex_to_byte_array
 import avalon_crypto_utils.worker_hash as worker_hash
+import avalon_crypto_utils.signing_backends as signing_backends
+import utility.tracing as tracing
 
+# The ECDSA library is loaded by the first WorkerSign that needs it,
+# so that importing this module does not load it.
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-logger.addHandler(logging.StreamHandler(sys.stdout))
 
 # -------------------------------------------------------------------------
 
@@ -37,23 +37,79 @@ class WorkerSign():
 
 # -------------------------------------------------------------------------
 
-    def __init__(self):
+    def __init__(self, backend=None):
         """
         Constructor for WorkerSign.
+
+        Parameters :
+            backend: Optional name of the ECDSA backend, see
+                signing_backends. The fastest installed backend is
+                used by default.
         """
         self.sign_private_key = None
         self.sign_public_key = None
+        self.__backend_name = backend
+        self.__backend = None
+        self.__signing_context = None
+
+# -------------------------------------------------------------------------
+
+    @property
+    def backend(self):
+        """
+        ECDSA backend used for key generation, signing and verification.
+        """
+        if self.__backend is None:
+            self.__backend = signing_backends.get_backend(
+                self.__backend_name)
+        return self.__backend
+
+# -------------------------------------------------------------------------
+
+    @property
+    def signing_context(self):
+        """
+        Backend signing context of sign_private_key. It is kept for as
+        long as sign_private_key is not replaced, so that its setup is
+        shared by all messages signed with the key.
+        """
+        context = self.__signing_context
+        if context is None or \
+                context.private_key is not self.sign_private_key:
+            context = self.backend.signing_context(self.sign_private_key)
+            self.__signing_context = context
+        return context
 
 # -------------------------------------------------------------------------
 
     def generate_signing_key(self):
         """
         Generate ECDSA (SECP256k1 curve) signing key pair.
+        sign_private_key is set to the backend's private key object and
+        sign_public_key to the public key as serialized PEM bytes.
         """
-        sk = SigningKey.generate(curve=SECP256k1)
-        vk = sk.get_verifying_key()
+        sk = self.backend.generate_key()
         self.sign_private_key = sk
-        self.sign_public_key = vk
+        self.sign_public_key = self.backend.public_key_pem(sk)
+
+# -------------------------------------------------------------------------
+
+    def set_signing_key(self, private_key):
+        """
+        Use an existing ECDSA private key for signing.
+        The backend is switched to the one the key object belongs to,
+        e.g. ecdsa for an ecdsa.SigningKey, and sign_public_key is set
+        to the public key as serialized PEM bytes.
+
+        Parameters :
+            private_key: Private key object of an ECDSA backend
+            Raises ValueError if the key belongs to no backend.
+        """
+        backend = signing_backends.backend_of_key(private_key)
+        sign_public_key = backend.public_key_pem(private_key)
+        self.__backend = backend
+        self.sign_private_key = private_key
+        self.sign_public_key = sign_public_key
 
 # -------------------------------------------------------------------------
 
@@ -66,10 +122,7 @@ class WorkerSign():
         Returns :
             ECDSA Public (Verifiying) key as serialized PEM bytes.
         """
-        if self.sign_public_key:
-            return self.sign_public_key.to_pem()
-        else:
-            return None
+        return self.sign_public_key
 
 # -------------------------------------------------------------------------
 
@@ -84,17 +137,34 @@ class WorkerSign():
             Raises exception in case of error.
         """
         try:
-            private_key = self.sign_private_key
-            signed = \
-                private_key.sign_digest_deterministic(
-                    message_hash_bytes,
-                    sigencode=sigencode_der)
+            signed = self.signing_context.sign(message_hash_bytes)
         except Exception as e:
             err_msg = "Sign message failed: " + str(e)
             logger.error(err_msg)
             raise
         return signed
 
+# -------------------------------------------------------------------------
+
+    def sign_many(self, message_hashes):
+        """
+        Sign a batch of message hashes using ECDSA private key.
+
+        Parameters :
+            message_hashes: Iterable of message hashes to sign in bytes
+        Returns :
+            list of signed messages in bytes, in the order of
+            message_hashes.
+            Raises exception in case of error.
+        """
+        try:
+            signed = self.signing_context.sign_many(message_hashes)
+        except Exception as e:
+            err_msg = "Sign messages failed: " + str(e)
+            logger.error(err_msg)
+            raise
+        return signed
+
 # -------------------------------------------------------------------------
 
     def verify_signature_from_pubkey(self, signature_bytes,
@@ -111,9 +181,9 @@ class WorkerSign():
             Boolean.
         """
         try:
-            vk = VerifyingKey.from_pem(pub_key_pem_bytes)
-            return vk.verify_digest(signature_bytes, message_hash_bytes,
-                                    sigdecode=sigdecode_der)
+            vk = self.backend.public_key(pub_key_pem_bytes)
+            return self.backend.verify_digest(vk, signature_bytes,
+                                              message_hash_bytes)
         except Exception as e:
             err_msg = "Verify signature failed: " + str(e)
             logger.error(err_msg)
@@ -171,7 +241,7 @@ class WorkerSign():
 
         concat_string = wo_response["extVerificationKey"] + requester_nonce
         v_key_sig = wo_response["extVerificationKeySignature"]
-        v_key_hash = crypto_utility.compute_message_hash(
+        v_key_hash = worker_hash.WorkerHash().compute_message_hash(
             bytes(concat_string, 'UTF-8'))
         decoded_v_key_sig = crypto_utility.base64_to_byte_array(v_key_sig)
         return self.verify_signature_from_pubkey(decoded_v_key_sig,
@@ -179,6 +249,7 @@ class WorkerSign():
                                                  wo_verification_key)
 
 # -----------------------------------------------------------------------------
+    @tracing.traced("WorkerSign.verify_signature")
     def verify_signature(self, wo_response, wo_res_verification_key,
                          requester_nonce=None):
         """
@@ -229,22 +300,35 @@ class WorkerSign():
         Returns:
             enum type SignatureStatus
         """
-        input_json_params = input_json
+        return self.verify_signature_from_pubkey(
+            *self.update_receipt_signed_data(input_json))
 
-        concat_string = input_json_params["workOrderId"] + \
-            str(input_json_params["updateType"]) + \
-            input_json_params["updateData"]
+# -----------------------------------------------------------------------------
+    @staticmethod
+    def update_receipt_signed_data(input_json):
+        """
+        Extract what is needed to verify a work order receipt update
+        signature.
+
+        Parameters:
+            input_json: Dictionary which contains payload returned by the
+              WorkOrderReceiptUpdateRetrieve API as define EEA spec 7.2.7
+        Returns:
+            Tuple of (signature bytes, hash of the signed data in bytes,
+            receiptVerificationKey as PEM bytes).
+        """
+        concat_string = input_json["workOrderId"] + \
+            str(input_json["updateType"]) + \
+            input_json["updateData"]
         concat_hash = bytes(concat_string, 'UTF-8')
-        final_hash = crypto_utility.compute_message_hash(concat_hash)
-        signature = input_json_params["updateSignature"]
+        final_hash = worker_hash.WorkerHash().compute_message_hash(
+            concat_hash)
+        signature = input_json["updateSignature"]
         verification_key = \
-            input_json_params["receiptVerificationKey"].encode("ascii")
+            input_json["receiptVerificationKey"].encode("ascii")
 
         decoded_signature = crypto_utility.base64_to_byte_array(signature)
-
-        return self.verify_signature_from_pubkey(decoded_signature,
-                                                 final_hash,
-                                                 verification_key)
+        return decoded_signature, final_hash, verification_key
 
 # -----------------------------------------------------------------------------
     def verify_create_receipt_signature(self, input_json):
@@ -256,8 +340,23 @@ class WorkerSign():
         Returns:
             enum type SignatureStatus
         """
-        input_json_params = input_json['params']
+        return self.verify_signature_from_pubkey(
+            *self.create_receipt_signed_data(input_json['params']))
 
+# -----------------------------------------------------------------------------
+    @staticmethod
+    def create_receipt_signed_data(input_json_params):
+        """
+        Extract what is needed to verify a work order receipt create
+        signature.
+
+        Parameters:
+            input_json_params: Dictionary which contains request params of
+              WorkOrderReceiptCreate API as define EEA spec 7.2.2
+        Returns:
+            Tuple of (signature bytes, hash of the signed data in bytes,
+            receiptVerificationKey as PEM bytes).
+        """
         concat_string = input_json_params["workOrderId"] + \
             input_json_params["workerServiceId"] + \
             input_json_params["workerId"] + \
@@ -266,15 +365,14 @@ class WorkerSign():
             input_json_params["workOrderRequestHash"] + \
             input_json_params["requesterGeneratedNonce"]
         concat_hash = bytes(concat_string, "UTF-8")
-        final_hash = bytes(crypto_utility.compute_message_hash(concat_hash))
+        final_hash = worker_hash.WorkerHash().compute_message_hash(
+            concat_hash)
         signature = input_json_params["requesterSignature"]
         verification_key = \
             input_json_params["receiptVerificationKey"].encode("ascii")
 
         decoded_signature = crypto_utility.base64_to_byte_array(signature)
-        return self.verify_signature_from_pubkey(decoded_signature,
-                                                 final_hash,
-                                                 verification_key)
+        return decoded_signature, final_hash, verification_key
 
 # -----------------------------------------------------------------------------
     def verify_encryption_key_signature(
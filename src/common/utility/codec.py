@@ -0,0 +1,85 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Hex and base64 codecs used for keys, IVs, hashes, signatures and IDs.
+
+All encoders accept bytes, bytearray and memoryview and convert the
+whole buffer in one call into the binascii C functions, without copying
+it first. Hex strings are lowercase unless upper=True is passed, and
+base64 strings have no trailing newline. Decoders accept str or bytes
+and return bytes. Invalid input raises binascii.Error (a ValueError),
+or TypeError for objects that are not bytes-like.
+"""
+
+import binascii
+
+
+def hex_encode(data, upper=False):
+    """
+    Hex encode binary data.
+
+    Parameters:
+        data: bytes, bytearray or memoryview. Other sequences of byte
+            values, e.g. a tuple of ints, are accepted too.
+        upper: If True, use uppercase hex digits
+    Returns:
+        Hex string.
+    """
+    try:
+        hex_str = data.hex()
+    except AttributeError:
+        hex_str = bytes(data).hex()
+    return hex_str.upper() if upper else hex_str
+
+
+def hex_decode(hex_str):
+    """
+    Decode a hex string of either case, as str or bytes, to bytes.
+    """
+    return binascii.a2b_hex(hex_str)
+
+
+def b64_encode(data):
+    """
+    Base64 encode binary data (bytes, bytearray or memoryview) to str.
+    """
+    return binascii.b2a_base64(data, newline=False).decode("ascii")
+
+
+def b64_decode(b64_str):
+    """
+    Decode a base64 string, as str or bytes, to bytes. Characters
+    outside the base64 alphabet are skipped, like base64.b64decode().
+    """
+    return binascii.a2b_base64(b64_str)
+
+
+def hex_encode_array(items, upper=False):
+    """
+    Hex encode a sequence of binary values, e.g. byte32 IDs.
+
+    Returns:
+        List of hex strings in the order of items.
+    """
+    return [hex_encode(item, upper) for item in items]
+
+
+def hex_decode_array(hex_strs):
+    """
+    Decode a sequence of hex strings, e.g. worker IDs, to a list of
+    bytes.
+    """
+    a2b_hex = binascii.a2b_hex
+    return [a2b_hex(hex_str) for hex_str in hex_strs]
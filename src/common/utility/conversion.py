@@ -16,6 +16,9 @@
 Required type conversions
 """ 
 
+import utility.codec as codec
+
+
 def convert_byte32_arr_to_hex_arr(byte32_arr):
     """
     This function takes in an array of byte32 strings and
@@ -24,7 +27,4 @@ def convert_byte32_arr_to_hex_arr(byte32_arr):
     Parameters:
     byte32_arr Strings to convert from a byte32 array to a hex array
     """
-    hex_ids = []
-    for byte32_str in byte32_arr:
-        hex_ids = hex_ids + [byte32_str.hex()]
-    return hex_ids
+    return codec.hex_encode_array(byte32_arr)
@@ -17,12 +17,14 @@ import hashlib
 import logging
 import re
 
+import utility.codec as codec
+
 logger = logging.getLogger(__name__)
 
 
 # Return binary hex as UTF string
 def hex_to_utf8(binary):
-    return binascii.hexlify(binary).decode("UTF-8")
+    return codec.hex_encode(binary)
 
 
 def is_valid_hex_str(hex_str):
@@ -80,11 +82,10 @@ def byte_array_to_hex_str(in_byte_array):
     '''
     Converts tuple of bytes to hex string
     '''
-    return ''.join(format(i, '02x') for i in in_byte_array)
+    return codec.hex_encode(in_byte_array)
 
 def byte_array_to_hex(byte_array):
-    hex_value = byte_array_to_hex_str(byte_array)
-    return hex_value.upper()
+    return codec.hex_encode(byte_array, upper=True)
 
 def hex_to_byte_array(hex_str):
     """
@@ -94,7 +95,7 @@ def hex_to_byte_array(hex_str):
     @returns - array of bytes on successful conversion, otherwise return None
     """
     try:
-        return bytearray(binascii.unhexlify(hex_str))
+        return bytearray(codec.hex_decode(hex_str))
     except binascii.Error as err:
         logger.error(
             "Caught exception while converting hex string to bytearray - %s",
@@ -0,0 +1,99 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+HdrHistogram-style latency histogram shared by the load generator and
+the replay of JSON RPC recordings.
+"""
+
+import collections
+
+# Percentiles of the HdrHistogram percentile distribution output: each
+# step halves the distance to 100
+_DISTRIBUTION_STEPS = 14
+
+
+class LatencyHistogram(object):
+    """
+    Log-linear latency histogram in the style of HdrHistogram.
+
+    Latencies are counted in microsecond buckets whose width is at most
+    1/2**significant_bits of the values they hold, so any percentile is
+    reported with that relative precision (under 1% by default) whatever
+    the range of the latencies, in memory that grows only with the
+    logarithm of that range. Not thread safe.
+    """
+
+    def __init__(self, significant_bits=7):
+        self.__significant_bits = significant_bits
+        # lowest value of bucket -> count
+        self.__counts = collections.Counter()
+        self.__sum = 0
+        self.count = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, latency_secs):
+        """Count a latency given in seconds."""
+        value = max(0, int(latency_secs * 1e6))
+        shift = max(0, value.bit_length() - self.__significant_bits)
+        self.__counts[value >> shift << shift] += 1
+        self.__sum += value
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Return the latency in seconds below which the given percentage
+        of the counted latencies fall, or None if none was counted.
+        """
+        if not self.count:
+            return None
+        rank = max(1, percent / 100.0 * self.count)
+        seen = 0
+        for lowest in sorted(self.__counts):
+            seen += self.__counts[lowest]
+            if seen >= rank:
+                shift = max(0, lowest.bit_length() - self.__significant_bits)
+                # Highest value of the bucket, like HdrHistogram
+                return min(lowest + (1 << shift) - 1, self.max) / 1e6
+        return self.max / 1e6
+
+    def to_dict(self):
+        """
+        Return the summary and percentile distribution in milliseconds.
+        """
+        if not self.count:
+            return {"count": 0}
+
+        def ms(value_secs):
+            return round(value_secs * 1000, 3)
+        percents = [100 - 100 / 2 ** step
+                    for step in range(1, _DISTRIBUTION_STEPS)]
+        return {
+            "count": self.count,
+            "min": ms(self.min / 1e6),
+            "mean": ms(self.__sum / self.count / 1e6),
+            "p50": ms(self.percentile(50)),
+            "p90": ms(self.percentile(90)),
+            "p99": ms(self.percentile(99)),
+            "p99.9": ms(self.percentile(99.9)),
+            "p99.99": ms(self.percentile(99.99)),
+            "max": ms(self.max / 1e6),
+            "distribution": [[round(percent, 4), ms(self.percentile(percent))]
+                             for percent in percents + [100]],
+        }
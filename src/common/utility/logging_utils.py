@@ -0,0 +1,261 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Logging helpers keeping SDK logging cheap on the request path.
+
+The SDK never configures logging itself and does not log payloads.
+Applications can set up logging with configure_logging(), which moves
+formatting and output to a background thread behind a queue,
+caps the size of messages, optionally rate limits repeated messages
+and can write JSON lines:
+
+    listener = logging_utils.configure_logging(
+        logging.INFO, structured=True, max_per_interval=10)
+
+Values that may be large are passed to log calls wrapped in capped(),
+which converts them to text only if the record is emitted, and then
+only up to a size limit.
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+# Size limit of messages and capped() values
+DEFAULT_MAX_CHARS = 512
+
+# LogRecord attributes that are not extra fields of structured records
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord(
+    "", logging.INFO, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _cap(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    return "{}...({} more chars)".format(
+        text[:max_chars], len(text) - max_chars)
+
+
+def _cap_tail(text, max_chars):
+    """Like _cap(), keeping the end, e.g. of a traceback."""
+    if len(text) <= max_chars:
+        return text
+    return "({} more chars)...{}".format(
+        len(text) - max_chars, text[-max_chars:])
+
+
+class capped(object):
+    """
+    Log argument formatted lazily and truncated to max_chars, e.g.
+
+        logger.debug("Response %s", capped(response))
+    """
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value, max_chars=DEFAULT_MAX_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self):
+        value = self.value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            # Decode no more than needed
+            text = repr(bytes(value[:self.max_chars + 1]))
+            if len(value) > self.max_chars:
+                return "{}...({} more bytes)".format(
+                    text[:self.max_chars], len(value) - self.max_chars)
+            return text
+        return _cap(str(value), self.max_chars)
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate limits repeated log messages. Of the records logged from the
+    same place, at most max_per_interval pass per interval_secs; the
+    next record passing reports how many were dropped. Records at or
+    above exempt_level always pass.
+    """
+
+    def __init__(self, max_per_interval=10, interval_secs=1.0,
+                 exempt_level=logging.WARNING):
+        super().__init__()
+        self.max_per_interval = max_per_interval
+        self.interval_secs = interval_secs
+        self.exempt_level = exempt_level
+        # (pathname, lineno) -> [interval start, passed, dropped]
+        self.__counts = {}
+        self.__lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.exempt_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.__lock:
+            counts = self.__counts.get(key)
+            if counts is None or now - counts[0] >= self.interval_secs:
+                dropped = counts[2] if counts is not None else 0
+                counts = self.__counts[key] = [now, 0, dropped]
+            if counts[1] >= self.max_per_interval:
+                counts[2] += 1
+                return False
+            counts[1] += 1
+            dropped, counts[2] = counts[2], 0
+        if dropped:
+            record.sampled_out = dropped
+        return True
+
+
+class CappedFormatter(logging.Formatter):
+    """
+    Formatter truncating messages to max_chars and exception texts to
+    their last four times as many characters. Records let through by
+    SamplingFilter after dropping others say how many were dropped.
+    """
+
+    def __init__(self, fmt=None, datefmt=None,
+                 max_chars=DEFAULT_MAX_CHARS):
+        super().__init__(fmt, datefmt)
+        self.max_chars = max_chars
+
+    def format(self, record):
+        self._cap_exception(record)
+        return super().format(record)
+
+    def formatMessage(self, record):
+        record.message = self._message(record)
+        return super().formatMessage(record)
+
+    def _cap_exception(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = _cap_tail(record.exc_text,
+                                        self.max_chars * 4)
+
+    def _message(self, record):
+        message = _cap(record.message, self.max_chars)
+        sampled_out = getattr(record, "sampled_out", 0)
+        if sampled_out:
+            message += " ({} similar messages dropped)".format(sampled_out)
+        return message
+
+
+class StructuredFormatter(CappedFormatter):
+    """
+    Formatter writing records as JSON objects on one line, with the
+    extra fields of the log call, e.g.
+
+        logger.info("Work order submitted",
+                    extra={"work_order_id": work_order_id})
+    """
+
+    def format(self, record):
+        self._cap_exception(record)
+        record.message = record.getMessage()
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": self._message(record),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and name != "sampled_out":
+                entry[name] = value if isinstance(
+                    value, (str, int, float, bool, type(None))) \
+                    else _cap(str(value), self.max_chars)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler leaving the formatting to the handlers of the
+    QueueListener. Only the message is built in the logging thread,
+    since the log call arguments may change once it returned.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXCEPTION_FORMATTER.formatException(
+                    record.exc_info)
+            # Tracebacks hold frames, do not keep them alive in the queue
+            record.exc_info = None
+        return record
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+def configure_logging(level=logging.INFO, handlers=None, structured=False,
+                      max_chars=DEFAULT_MAX_CHARS, max_per_interval=None,
+                      interval_secs=1.0,
+                      fmt="%(asctime)s - %(levelname)s - %(message)s"):
+    """
+    Configure the root logger to hand records to a queue, from which a
+    background thread formats and writes them with the given handlers.
+    Logging calls only wait for the message to be put in the queue.
+
+    Parameters:
+    level            Level of the root logger
+    handlers         Handlers writing the records, by default a
+                     StreamHandler on stderr. Their formatter is
+                     replaced.
+    structured       If True, write JSON lines instead of fmt
+    max_chars        Size limit of messages
+    max_per_interval Optional number of records logged per interval
+                     from the same place before further ones below
+                     WARNING are dropped
+    interval_secs    Sampling interval of max_per_interval
+
+    Returns:
+    The started logging.handlers.QueueListener; call its stop() before
+    exiting to flush the queue.
+    """
+    if handlers is None:
+        handlers = [logging.StreamHandler()]
+    formatter = StructuredFormatter(max_chars=max_chars) if structured \
+        else CappedFormatter(fmt, max_chars=max_chars)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    if max_per_interval is not None:
+        queue_handler.addFilter(
+            SamplingFilter(max_per_interval, interval_secs))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
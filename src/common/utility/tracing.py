@@ -0,0 +1,233 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tracing hooks of the SDK.
+
+Spans are opened around the WorkOrderParams build steps, every JSON RPC
+request sent by HttpJrpcClient, every poll of
+JRPCWorkOrderImpl.work_order_get_result, and result signature
+verification and decryption. The trace context of the current span is
+sent to the listener in the HTTP headers of the requests.
+
+Tracing is disabled until a tracer is set. To send the spans to the
+OpenTelemetry tracer provider configured by the application:
+
+    tracing.set_tracer(tracing.OpenTelemetryTracer())
+
+RecordingTracer keeps the spans in memory instead, without requiring
+OpenTelemetry, and propagates W3C traceparent headers. While tracing is
+disabled a hook costs a global lookup and a function call.
+"""
+
+import collections
+import contextvars
+import functools
+import os
+import time
+
+_tracer = None
+# Span of RecordingTracer the current code runs in
+_current_span = contextvars.ContextVar("avalon_span", default=None)
+
+
+class _NoopSpan(object):
+    """Span returned while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def set_tracer(tracer):
+    """
+    Set the tracer the SDK opens its spans with, None to disable
+    tracing.
+
+    Parameters:
+    tracer   Object with the methods start_span(name, attributes),
+             returning a context manager that yields a span with a
+             set_attribute(key, value) method, and inject(headers),
+             adding the trace context to a dictionary of HTTP headers.
+             RecordingTracer and OpenTelemetryTracer implement them.
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer():
+    """Return the tracer set with set_tracer() or None."""
+    return _tracer
+
+
+def span(name, attributes=None):
+    """
+    Return a context manager tracing the enclosed code as a span.
+
+    Parameters:
+    name       Span name
+    attributes Optional dictionary of span attributes; values must be
+               str, bool, int or float
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP_SPAN
+    return tracer.start_span(name, attributes)
+
+
+def traced(name):
+    """Decorator tracing every call of a function as a span."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return function(*args, **kwargs)
+            with tracer.start_span(name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject(headers):
+    """Add the trace context of the current span to HTTP headers."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.inject(headers)
+
+
+def _random_id(size):
+    """Return a random non-zero ID of size bytes as int."""
+    return int.from_bytes(os.urandom(size), "big") or 1
+
+
+class Span(object):
+    """
+    Span recorded by RecordingTracer. Times are time.time() values in
+    seconds; error holds the repr() of the exception the span ended
+    with, if any.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes",
+                 "start_time", "end_time", "error", "_tracer", "_token")
+
+    def __init__(self, tracer, name, trace_id, span_id, parent_id,
+                 attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def duration(self):
+        """Duration in seconds, None while the span is open."""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    @property
+    def traceparent(self):
+        """W3C traceparent header value of the span."""
+        return "00-{:032x}-{:016x}-01".format(self.trace_id, self.span_id)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.end_time = time.time()
+        if exc is not None:
+            self.error = repr(exc)
+        _current_span.reset(self._token)
+        self._tracer._end(self)
+        return False
+
+
+class RecordingTracer(object):
+    """
+    Tracer keeping the most recent ended spans in memory.
+    """
+
+    def __init__(self, max_spans=10000, on_end=None):
+        """
+        Parameters:
+        max_spans  Number of ended spans kept in spans
+        on_end     Optional callable called with every ended Span
+        """
+        self.spans = collections.deque(maxlen=max_spans)
+        self.__on_end = on_end
+
+    def start_span(self, name, attributes=None):
+        parent = _current_span.get()
+        if parent is None:
+            trace_id, parent_id = _random_id(16), None
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        return Span(self, name, trace_id, _random_id(8), parent_id,
+                    attributes)
+
+    def inject(self, headers):
+        current = _current_span.get()
+        if current is not None:
+            headers["traceparent"] = current.traceparent
+
+    def _end(self, span):
+        self.spans.append(span)
+        if self.__on_end is not None:
+            self.__on_end(span)
+
+
+class OpenTelemetryTracer(object):
+    """
+    Tracer creating OpenTelemetry spans, propagated with the globally
+    configured OpenTelemetry propagator. Requires the opentelemetry-api
+    package.
+    """
+
+    def __init__(self, tracer_provider=None):
+        """
+        Parameters:
+        tracer_provider Optional OpenTelemetry TracerProvider, defaults
+                        to the global one
+        """
+        from opentelemetry import propagate, trace
+
+        self.__tracer = trace.get_tracer(
+            "avalon_sdk", tracer_provider=tracer_provider)
+        self.__inject = propagate.inject
+
+    def start_span(self, name, attributes=None):
+        return self.__tracer.start_as_current_span(
+            name, attributes=attributes)
+
+    def inject(self, headers):
+        self.__inject(headers)
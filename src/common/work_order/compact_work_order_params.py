@@ -0,0 +1,327 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import functools
+
+from validation.json_validator import JsonValidator
+from handler.error_handler import error_handler
+import utility.tracing as tracing
+from exceptions.invalid_parameter import InvalidParamException
+import avalon_crypto_utils.crypto_utility as crypto_utility
+import avalon_crypto_utils.worker_encryption as worker_encryption
+import avalon_crypto_utils.worker_hash as worker_hash
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=64)
+def _encode_worker_encryption_key(worker_encryption_key):
+    """
+    Hex encode a worker encryption key. Work orders sent to the same
+    worker share the returned string instead of holding a copy each.
+    """
+    return worker_encryption_key.encode("UTF-8").hex()
+
+
+class CompactWorkOrderParams():
+    """
+    Memory compact alternative to WorkOrderParams for applications that
+    buffer a large number of work orders.
+
+    Parameters are kept in slots instead of a params dictionary, inData
+    and outData items are kept as tuples, and the encryption and hash
+    helpers are shared by all instances since they hold no per-request
+    state. The dictionary and JSON forms of the request are only built by
+    to_params_obj(), to_string() and to_jrpc_string().
+    """
+
+    # (slot name, work order parameter name) in serialization order.
+    # Slots holding None are left out of the serialized request.
+    _FIELDS = (
+        ("response_timeout_msecs", "responseTimeoutMSecs"),
+        ("payload_format", "payloadFormat"),
+        ("result_uri", "resultUri"),
+        ("notify_uri", "notifyUri"),
+        ("work_order_id", "workOrderId"),
+        ("worker_id", "workerId"),
+        ("workload_id", "workloadId"),
+        ("requester_id", "requesterId"),
+        ("worker_encryption_key", "workerEncryptionKey"),
+        ("data_encryption_algorithm", "dataEncryptionAlgorithm"),
+        ("encrypted_session_key", "encryptedSessionKey"),
+        ("session_key_iv", "sessionKeyIv"),
+        ("requester_nonce", "requesterNonce"),
+        ("encrypted_request_hash", "encryptedRequestHash"),
+        ("requester_signature", "requesterSignature"),
+        ("verifying_key", "verifyingKey"),
+    )
+
+    __slots__ = tuple(name for name, _ in _FIELDS) + (
+        "in_data", "out_data", "session_key", "session_iv", "request_hash")
+
+    # Shared helpers, used only with explicitly passed keys
+    _encrypt = worker_encryption.WorkerEncrypt()
+    _hasher = worker_hash.WorkerHash()
+
+    def __init__(self):
+        for name in CompactWorkOrderParams.__slots__:
+            setattr(self, name, None)
+        self.in_data = []
+
+    @tracing.traced("CompactWorkOrderParams.create_request")
+    @error_handler
+    def create_request(
+            self, work_order_id, worker_id, workload_id,
+            requester_id, session_key, session_iv,
+            requester_nonce, verifying_key=None, payload_format="JSON-RPC",
+            response_timeout_msecs=6000, result_uri=None,
+            notify_uri=None, worker_encryption_key=None,
+            data_encryption_algorithm=None, encrypted_session_key=None):
+        """
+        Validate and create work order request with received values.
+        Takes the same parameters as WorkOrderParams.create_request.
+        """
+        self.work_order_id = work_order_id or None
+        self.response_timeout_msecs = response_timeout_msecs
+        self.payload_format = payload_format
+        self.requester_nonce = requester_nonce
+        self.workload_id = workload_id
+        self.worker_id = worker_id
+        self.requester_id = requester_id
+        self.result_uri = result_uri or None
+        self.notify_uri = notify_uri or None
+        self.worker_encryption_key = worker_encryption_key or None
+        self.data_encryption_algorithm = data_encryption_algorithm or None
+        self.encrypted_session_key = encrypted_session_key
+        self.session_key = session_key
+        self.session_iv = session_iv
+        if session_iv:
+            self.session_key_iv = crypto_utility.byte_array_to_hex(session_iv)
+
+        params_obj = self.to_params_obj()
+        if self.encrypted_session_key is None:
+            # The schema accepts a null encryptedSessionKey
+            params_obj["encryptedSessionKey"] = None
+        JsonValidator.json_validation(0, "sdk_WorkOrderSubmit", params_obj)
+
+        self.worker_encryption_key = \
+            _encode_worker_encryption_key(worker_encryption_key)
+        self.encrypted_request_hash = ""
+        self.requester_signature = ""
+        if encrypted_session_key is None:
+            try:
+                encrypted_session_key = self._encrypt.encrypt_session_key(
+                    session_key, worker_encryption_key)
+                self.encrypted_session_key = \
+                    crypto_utility.byte_array_to_hex(encrypted_session_key)
+            except Exception as err:
+                logger.error("Error while setting encrypted session key")
+                raise InvalidParamException(str(err), 0)
+
+    @tracing.traced("CompactWorkOrderParams.add_encrypted_request_hash")
+    def add_encrypted_request_hash(self):
+        """
+        Calculates request hash based on EEA trusted-computing spec 6.1.8.1
+        and set encryptedRequestHash parameter in the request.
+        """
+        try:
+            self.request_hash = self._hasher.calculate_request_hash({
+                "requesterNonce": self.requester_nonce,
+                "workOrderId": self.work_order_id,
+                "workerId": self.worker_id,
+                "workloadId": self.workload_id,
+                "requesterId": self.requester_id,
+                "inData": self.__data_to_json(self.in_data),
+                "outData": self.__data_to_json(self.out_data)
+            })
+            encrypted_request_hash = self._encrypt.encrypt_data(
+                self.request_hash, self.session_key, self.session_iv)
+            self.encrypted_request_hash = crypto_utility.byte_array_to_hex(
+                encrypted_request_hash)
+        except Exception as err:
+            raise InvalidParamException(str(err), 0)
+
+    @tracing.traced("CompactWorkOrderParams.add_requester_signature")
+    def add_requester_signature(self, signer):
+        """
+        Sign the request hash as defined in Off-Chain Trusted Compute
+        EEA spec 6.1.8.3 and set the requesterSignature and verifyingKey
+        parameters in the request. add_encrypted_request_hash() should be
+        called before calling this function.
+
+        Parameters:
+        signer    WorkerSign instance holding the requester signing key
+
+        Returns:
+        True on success and False on failure.
+        """
+        try:
+            signature = signer.sign_message(self.request_hash)
+        except Exception:
+            logger.error("Signing request failed")
+            return False
+        self.requester_signature = \
+            crypto_utility.byte_array_to_base64(signature)
+        # public signing key is shared to enclave manager to
+        # verify the signature.
+        self.verifying_key = signer.get_public_sign_key().decode("UTF-8")
+        return True
+
+    @staticmethod
+    def add_requester_signatures(params_list, signer):
+        """
+        Like add_requester_signature() for a batch of requests, signing
+        all request hashes in one WorkerSign.sign_many() call.
+
+        Parameters:
+        params_list  CompactWorkOrderParams instances with their request
+                     hash added
+        signer       WorkerSign instance holding the requester signing key
+
+        Returns:
+        True on success and False on failure, in which case no request
+        is changed.
+        """
+        try:
+            signatures = signer.sign_many(
+                [params.request_hash for params in params_list])
+        except Exception:
+            logger.error("Signing requests failed")
+            return False
+        verifying_key = signer.get_public_sign_key().decode("UTF-8")
+        for params, signature in zip(params_list, signatures):
+            params.requester_signature = \
+                crypto_utility.byte_array_to_base64(signature)
+            params.verifying_key = verifying_key
+        return True
+
+    @tracing.traced("CompactWorkOrderParams.add_in_data")
+    @error_handler
+    def add_in_data(self, data, data_hash=None,
+                    encrypted_data_encryption_key=None, data_iv=None):
+        """Add inData work order parameter."""
+        if data is None:
+            message = "Invalid data format for in data"
+            raise InvalidParamException(message, 0)
+        self.in_data.append(self.__make_data_item(
+            len(self.in_data), data, data_hash,
+            encrypted_data_encryption_key, data_iv))
+
+    @tracing.traced("CompactWorkOrderParams.add_out_data")
+    @error_handler
+    def add_out_data(self, data, data_hash=None,
+                     encrypted_data_encryption_key=None, data_iv=None):
+        """Add outData work order parameter."""
+        if data is None:
+            message = "Invalid data format for out data"
+            raise InvalidParamException(message, 0)
+        if self.out_data is None:
+            self.out_data = []
+        self.out_data.append(self.__make_data_item(
+            len(self.out_data), data, data_hash,
+            encrypted_data_encryption_key, data_iv))
+
+    def get_in_data(self):
+        """Return inData work order parameter."""
+        return self.__data_to_json(self.in_data)
+
+    def get_out_data(self):
+        """Return outData work order parameter."""
+        if self.out_data is None:
+            return None
+        return self.__data_to_json(self.out_data)
+
+    def get_params(self):
+        """Return work order parameters without inData and outData."""
+        params_obj = {}
+        for name, key in CompactWorkOrderParams._FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                params_obj[key] = value
+        return params_obj
+
+    def to_params_obj(self):
+        """
+        Return the work order parameters as a dictionary in the
+        same form as WorkOrderParams.params_obj.
+        """
+        params_obj = self.get_params()
+        params_obj["inData"] = self.__data_to_json(self.in_data)
+        if self.out_data is not None:
+            params_obj["outData"] = self.__data_to_json(self.out_data)
+        return params_obj
+
+    def to_jrpc_string(self, id):
+        """
+        Create a JRPC request in string format.
+        Parameters:
+        id         JRPC request ID
+        Returns:
+        Work order JRPC request as a string.
+        """
+        json_request = {
+            "jsonrpc": "2.0",
+            "method": "WorkOrderSubmit",
+            "id": id,
+            "params": self.to_params_obj()
+        }
+        return json.dumps(json_request)
+
+    def to_string(self):
+        """
+        Create work order request string.
+        It is used to submit a work order.
+        Returns:
+        Work order request as a string
+        """
+        return json.dumps(self.to_params_obj())
+
+    def __make_data_item(self, index, data, data_hash,
+                         encrypted_data_encryption_key, data_iv):
+        """
+        Encrypt data and return the data item as a tuple
+        (index, dataHash, data, encryptedDataEncryptionKey, iv).
+        """
+        data = data.encode("UTF-8")
+        if encrypted_data_encryption_key is None or \
+                encrypted_data_encryption_key == "" or \
+                encrypted_data_encryption_key == "null":
+            data = self._encrypt.encrypt_data(
+                data, self.session_key, self.session_iv)
+        elif encrypted_data_encryption_key != "-":
+            data = self._encrypt.encrypt_data(
+                data, encrypted_data_encryption_key, data_iv)
+        return (index, data_hash or None,
+                crypto_utility.byte_array_to_base64(data),
+                encrypted_data_encryption_key or None, data_iv or None)
+
+    @staticmethod
+    def __data_to_json(data_items):
+        """Convert data item tuples to inData/outData dictionaries."""
+        if data_items is None:
+            return []
+        result = []
+        for index, data_hash, data, e_key, data_iv in data_items:
+            item = {"index": index}
+            if data_hash:
+                item["dataHash"] = data_hash
+            if e_key:
+                item["encryptedDataEncryptionKey"] = e_key
+            if data_iv:
+                item["iv"] = data_iv
+            item["data"] = data
+            result.append(item)
+        return result
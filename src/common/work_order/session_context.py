@@ -0,0 +1,139 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+
+import avalon_crypto_utils.crypto_utility as crypto_utility
+import avalon_crypto_utils.worker_encryption as worker_encryption
+from work_order.work_order_params import WorkOrderParams
+
+logger = logging.getLogger(__name__)
+
+
+class WorkOrderSessionContext():
+    """
+    Opt-in helper that reuses one session key for many work orders
+    submitted to the same worker.
+
+    WorkOrderParams.create_request generates and RSA-OAEP encrypts a new
+    session key for every work order. This context does the RSA step once
+    and stamps out WorkOrderParams that share the encrypted session key,
+    each with a freshly generated session IV. The session key is rotated
+    once it has been used for max_uses work orders or is older than
+    max_age_secs.
+
+    Security trade-off: all work orders created from one context are
+    encrypted under the same AES-GCM key. Compromise of that key exposes
+    the inData of every work order in the session, not just one, and the
+    shared encryptedSessionKey makes the work orders linkable by anyone
+    who sees them. Random 96 bit IVs keep the probability of an IV
+    collision negligible only while the number of work orders per key
+    stays small, which is why max_uses is bounded. Use the default
+    one-key-per-work-order path unless RSA encryption is a measured
+    bottleneck.
+    """
+
+    # Upper bound of max_uses, well below the 2^32 invocations NIST
+    # SP 800-38D allows for random IVs with a single AES-GCM key.
+    MAX_USES_LIMIT = 2 ** 20
+
+    def __init__(self, worker_encryption_key, max_uses=1000,
+                 max_age_secs=300):
+        """
+        Parameters:
+        worker_encryption_key Worker RSA public encryption key (PEM) used
+                              to encrypt the session key
+        max_uses              Number of work orders a session key is used
+                              for before it is rotated
+        max_age_secs          Lifetime of a session key in seconds
+        """
+        if not 0 < max_uses <= WorkOrderSessionContext.MAX_USES_LIMIT:
+            raise ValueError("max_uses must be between 1 and {}".format(
+                WorkOrderSessionContext.MAX_USES_LIMIT))
+        if max_age_secs <= 0:
+            raise ValueError("max_age_secs must be positive")
+        self.worker_encryption_key = worker_encryption_key
+        self.max_uses = max_uses
+        self.max_age_secs = max_age_secs
+        self.encrypt = worker_encryption.WorkerEncrypt()
+        self.__lock = threading.Lock()
+        self.__session_key = None
+        self.__encrypted_session_key = None
+        self.__uses = 0
+        self.__created_at = 0
+
+    def rotate(self):
+        """
+        Generate a new session key and encrypt it with the worker
+        encryption key. Work orders created afterwards use the new key.
+        """
+        with self.__lock:
+            self.__rotate()
+
+    def create_params(self, work_order_id, worker_id, workload_id,
+                      requester_id, requester_nonce, **kwargs):
+        """
+        Create work order params encrypted under the session key of
+        this context with a fresh session IV.
+
+        Parameters:
+        work_order_id   Work order ID
+        worker_id       Worker ID value derived from the worker's DID
+        workload_id     ID of the workload to be executed by the worker
+        requester_id    Requester ID
+        requester_nonce Random string generated by the participant
+        kwargs          Other optional arguments of
+                        WorkOrderParams.create_request
+
+        Returns:
+        WorkOrderParams instance on success or a JSON RPC error
+        dictionary if the request parameters are invalid.
+        """
+        with self.__lock:
+            if self.__needs_rotation():
+                self.__rotate()
+            self.__uses += 1
+            session_key = self.__session_key
+            encrypted_session_key = self.__encrypted_session_key
+
+        session_iv = self.encrypt.generate_iv()
+        params = WorkOrderParams()
+        err = params.create_request(
+            work_order_id, worker_id, workload_id, requester_id,
+            session_key, session_iv, requester_nonce,
+            worker_encryption_key=self.worker_encryption_key,
+            encrypted_session_key=encrypted_session_key, **kwargs)
+        if err is not None:
+            return err
+        return params
+
+    def __needs_rotation(self):
+        if self.__session_key is None:
+            return True
+        if self.__uses >= self.max_uses:
+            return True
+        return time.monotonic() - self.__created_at >= self.max_age_secs
+
+    def __rotate(self):
+        session_key = self.encrypt.generate_session_key()
+        encrypted_session_key = self.encrypt.encrypt_session_key(
+            session_key, self.worker_encryption_key)
+        self.__session_key = session_key
+        self.__encrypted_session_key = \
+            crypto_utility.byte_array_to_hex(encrypted_session_key)
+        self.__uses = 0
+        self.__created_at = time.monotonic()
+        logger.debug("Session key rotated")
@@ -19,6 +19,7 @@ from utility.hex_utils import byte_array_to_hex
 from enums.error_code import WorkOrderStatus
 #import utility.jrpc_utility as util
 from handler.error_handler import error_handler
+import utility.tracing as tracing
 from exceptions.invalid_parameter import InvalidParamException
 import avalon_crypto_utils.worker_signing as worker_signing
 import avalon_crypto_utils.crypto_utility as crypto_utility
@@ -26,8 +27,7 @@ import avalon_crypto_utils.worker_encryption as worker_encryption
 import avalon_crypto_utils.worker_hash as worker_hash
 from handler.error_handler import error_handler
 
-logging.basicConfig(
-    format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 
 class WorkOrderParams():
@@ -60,6 +60,7 @@ class WorkOrderParams():
                                 work order
         """
 
+    @tracing.traced("WorkOrderParams.create_request")
     @error_handler
     def create_request(
             self, work_order_id, worker_id, workload_id,
@@ -110,8 +111,8 @@ class WorkOrderParams():
                 self.set_encrypted_session_key(
                     crypto_utility.byte_array_to_hex(encrypted_session_key))
             except Exception as err:
-                logging.info("Error while setting encrypted session key")
-                logging.info(dir(err))
+                logger.error("Error while setting encrypted session key: %s",
+                             err)
                 message = err
                 raise InvalidParamException(message, 0)
 
@@ -170,6 +171,7 @@ class WorkOrderParams():
         """Set requesterNonce work order parameter."""
         self.params_obj["requesterNonce"] = requester_nonce
 
+    @tracing.traced("WorkOrderParams.add_encrypted_request_hash")
     def add_encrypted_request_hash(self):
         """
         Calculates request hash based on EEA trusted-computing spec 6.1.8.1
@@ -185,34 +187,54 @@ class WorkOrderParams():
             self.params_obj["encryptedRequestHash"] = enc_request_hash_hex
             return None
         except Exception as err:
-            print(dir(err))
+            logger.error("Error while adding encrypted request hash: %s",
+                         err)
             message = err
             raise InvalidParamException(message, 0)
 
+    @tracing.traced("WorkOrderParams.add_requester_signature")
     def add_requester_signature(self, private_key):
         """
         Calculate the signature of the request
         as defined in Off-Chain Trusted Compute EEA spec 6.1.8.3
         and set the requesterSignature parameter in the request.
+        add_encrypted_request_hash() should be called before calling
+        this function.
+
+        Parameters:
+        private_key  Requester signing key object of any ECDSA backend,
+                     or a WorkerSign instance holding it. A WorkerSign
+                     passed for every request reuses its signing
+                     context across them.
+
+        Returns:
+        True on success and False on failure.
         """
-        signature = self.signer.sign_message(req_hash)
-        if status is True:
-            self.params_obj["requesterSignature"] = \
-                crypto_utility.byte_array_to_base64(signature)
-            # public signing key is shared to enclave manager to
-            # verify the signature.
-            # It is temporary approach to share the key with the worker.
-            verifying_key = self.signer.get_public_sign_key(private_key)
-            self.set_verifying_key(verifying_key)
-            return True
-        else:
+        try:
+            if isinstance(private_key, worker_signing.WorkerSign):
+                signer = private_key
+            else:
+                signer = self.signer
+                if signer.sign_private_key is not private_key:
+                    signer.set_signing_key(private_key)
+            signature = signer.sign_message(self.request_hash)
+        except Exception:
             logger.error("Signing request failed")
             return False
+        self.params_obj["requesterSignature"] = \
+            crypto_utility.byte_array_to_base64(signature)
+        # public signing key is shared to enclave manager to
+        # verify the signature.
+        # It is temporary approach to share the key with the worker.
+        verifying_key = signer.get_public_sign_key().decode("UTF-8")
+        self.set_verifying_key(verifying_key)
+        return True
 
     def set_verifying_key(self, verifying_key):
         """Set verifyingKey work order parameter."""
         self.params_obj["verifyingKey"] = verifying_key
 
+    @tracing.traced("WorkOrderParams.add_in_data")
     @error_handler
     def add_in_data(self, data, data_hash=None,
                     encrypted_data_encryption_key=None, data_iv=None):
@@ -229,6 +251,7 @@ class WorkOrderParams():
         self.params_obj["inData"] = new_data_list
         return None
 
+    @tracing.traced("WorkOrderParams.add_out_data")
     @error_handler
     def add_out_data(self, data, data_hash=None,
                      encrypted_data_encryption_key=None, data_iv=None):
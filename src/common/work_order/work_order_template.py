@@ -0,0 +1,175 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+
+from validation.json_validator import JsonValidator
+from handler.error_handler import error_handler
+from exceptions.invalid_parameter import InvalidParamException
+import avalon_crypto_utils.crypto_utility as crypto_utility
+from work_order.work_order_params import WorkOrderParams
+
+logger = logging.getLogger(__name__)
+
+
+class WorkOrderTemplate():
+    """
+    Template for work order requests that share everything except the
+    work order ID, requester nonce, session key and inData.
+
+    The fixed parameters are validated once when the template is created.
+    Work order params created from the template start from a shallow copy
+    of the fixed parameters and only the per-order fields are validated.
+    The fixed parameters are also serialized once and reused as a prefix
+    by to_string() and to_jrpc_string().
+    """
+
+    def __init__(self, worker_id, workload_id, requester_id,
+                 worker_encryption_key, payload_format="JSON-RPC",
+                 response_timeout_msecs=6000, result_uri=None,
+                 notify_uri=None, data_encryption_algorithm=None):
+        """
+        Parameters:
+        worker_id                 Worker ID value derived from the
+                                  worker's DID
+        workload_id               ID of the workload to be executed
+        requester_id              Requester ID
+        worker_encryption_key     Worker encryption key used to encrypt
+                                  session keys
+        payload_format            "JSON-RPC"
+        response_timeout_msecs    Timeout in msecs that the caller will
+                                  wait for response
+        result_uri                Optional uri where the work order result
+                                  will be submitted
+        notify_uri                Optional uri which is notified post work
+                                  order completion
+        data_encryption_algorithm Optional algorithm for encrypting the
+                                  data in the work orders
+
+        Raises InvalidParamException if a fixed parameter is invalid.
+        """
+        fixed = {
+            "responseTimeoutMSecs": response_timeout_msecs,
+            "payloadFormat": payload_format,
+            "workerId": worker_id,
+            "workloadId": workload_id,
+            "requesterId": requester_id,
+            "workerEncryptionKey": worker_encryption_key
+        }
+        if result_uri:
+            fixed["resultUri"] = result_uri
+        if notify_uri:
+            fixed["notifyUri"] = notify_uri
+        if data_encryption_algorithm:
+            fixed["dataEncryptionAlgorithm"] = data_encryption_algorithm
+        if None in fixed.values():
+            raise InvalidParamException(
+                "Empty params in the request", 0)
+        JsonValidator.json_field_validation(
+            0, "sdk_WorkOrderSubmit", fixed)
+
+        self.worker_encryption_key = worker_encryption_key
+        fixed["workerEncryptionKey"] = \
+            worker_encryption_key.encode("UTF-8").hex()
+        self.__fixed = fixed
+        # Constant portion of the serialized params without the braces
+        self.__fixed_json = json.dumps(fixed)[1:-1]
+
+    @error_handler
+    def create_params(self, work_order_id, requester_nonce, session_key,
+                      session_iv, encrypted_session_key=None):
+        """
+        Create work order params from the template.
+
+        Parameters:
+        work_order_id         Work order ID
+        requester_nonce       Random string generated by the participant
+        session_key           One-time symmetric key of the work order
+        session_iv            IV corresponding to the session key
+        encrypted_session_key Optional session key already encrypted with
+                              the worker encryption key, as hex string.
+                              If it is not provided, session_key is
+                              encrypted here.
+
+        Returns:
+        WorkOrderParams instance on success or a JSON RPC error
+        dictionary if the per-order parameters are invalid.
+        """
+        params = WorkOrderParams()
+        if encrypted_session_key is None:
+            try:
+                encrypted_session_key = crypto_utility.byte_array_to_hex(
+                    params.encrypt.encrypt_session_key(
+                        session_key, self.worker_encryption_key))
+            except Exception as err:
+                logger.error("Error while setting encrypted session key")
+                raise InvalidParamException(str(err), 0)
+
+        variable = {
+            "workOrderId": work_order_id,
+            "requesterNonce": requester_nonce,
+            "sessionKeyIv": crypto_utility.byte_array_to_hex(session_iv),
+            "encryptedSessionKey": encrypted_session_key
+        }
+        JsonValidator.json_field_validation(
+            0, "sdk_WorkOrderSubmit", variable)
+
+        params_obj = self.__fixed.copy()
+        params_obj.update(variable)
+        params_obj["encryptedRequestHash"] = ""
+        params_obj["requesterSignature"] = ""
+        params_obj["inData"] = list()
+        params.params_obj = params_obj
+        params.session_key = session_key
+        params.session_iv = session_iv
+        return params
+
+    def to_string(self, params):
+        """
+        Serialize the params of a work order created from this template,
+        reusing the pre-serialized fixed parameters.
+
+        Parameters:
+        params    WorkOrderParams created by create_params()
+
+        Returns:
+        Work order request params as a JSON string
+        """
+        params_obj = params.params_obj
+        for name, value in self.__fixed.items():
+            if params_obj.get(name) is not value:
+                # A fixed parameter was overridden after creation
+                return json.dumps(params_obj)
+        variable = {name: value for name, value in params_obj.items()
+                    if name not in self.__fixed}
+        if not variable:
+            return "{" + self.__fixed_json + "}"
+        return "{" + self.__fixed_json + ", " + json.dumps(variable)[1:]
+
+    def to_jrpc_string(self, params, id):
+        """
+        Create a WorkOrderSubmit JRPC request string for work order params
+        created from this template.
+
+        Parameters:
+        params    WorkOrderParams created by create_params()
+        id        JRPC request ID
+
+        Returns:
+        Work order JRPC request as a string.
+        """
+        return '{"jsonrpc": "2.0", "method": "WorkOrderSubmit", ' + \
+            '"id": ' + json.dumps(id) + ', "params": ' + \
+            self.to_string(params) + "}"
@@ -0,0 +1,256 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Client side flow control for JSON RPC requests to a listener: a token
+bucket rate limiter and an AIMD (additive increase, multiplicative
+decrease) adaptive concurrency limiter.
+"""
+
+import logging
+import threading
+import time
+
+import handler.metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+# Outcomes reported to FlowControl.release()
+SUCCESS = "success"
+BUSY = "busy"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+class FlowControlTimeout(Exception):
+    """
+    Raised if a request could not acquire a rate or concurrency slot
+    within the configured wait time.
+    """
+    pass
+
+
+class TokenBucket(object):
+    """
+    Token bucket rate limiter allowing on average rate requests per
+    second with bursts of up to burst requests.
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.__tokens = self.burst
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Take one token, waiting for it if necessary.
+
+        Returns:
+        True if a token was taken, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(
+                    self.burst,
+                    self.__tokens + (now - self.__updated) * self.rate)
+                self.__updated = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return True
+                wait = (1 - self.__tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+# Share of the concurrency limit that must be in use for successful
+# requests to raise the limit
+_GROWTH_UTILIZATION = 0.5
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """
+    AIMD concurrency limiter. The limit grows by one over roughly one
+    limit's worth of successful requests, as long as at least half of
+    it is in use, and is cut by backoff_ratio when the listener reports
+    BUSY or a request times out.
+
+    Like TCP congestion control, the limit is cut at most once per
+    window: BUSY and TIMEOUT outcomes of the requests that were already
+    in flight at the last cut report the same overload and are ignored.
+    """
+
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=256,
+                 backoff_ratio=0.5):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "expected 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.__limit = float(initial_limit)
+        self.__in_flight = 0
+        # Releases still expected from requests in flight at the last cut
+        self.__recovery = 0
+        self.__cv = threading.Condition()
+
+    @property
+    def limit(self):
+        """Current concurrency limit."""
+        return int(self.__limit)
+
+    @property
+    def in_flight(self):
+        """Number of requests currently in flight."""
+        return self.__in_flight
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a free concurrency slot.
+
+        Returns:
+        True if a slot was taken, False on timeout.
+        """
+        with self.__cv:
+            if not self.__cv.wait_for(
+                    lambda: self.__in_flight < int(self.__limit), timeout):
+                return False
+            self.__in_flight += 1
+            return True
+
+    def release(self, outcome):
+        """
+        Return a slot and adjust the limit to the outcome of the request.
+
+        Parameters:
+        outcome   One of SUCCESS, BUSY, TIMEOUT or ERROR. ERROR does not
+                  change the limit.
+        """
+        with self.__cv:
+            utilized = \
+                self.__in_flight >= self.__limit * _GROWTH_UTILIZATION
+            self.__in_flight -= 1
+            sent_before_cut = self.__recovery > 0
+            if sent_before_cut:
+                self.__recovery -= 1
+            if outcome == SUCCESS:
+                if utilized:
+                    self.__limit = min(self.max_limit,
+                                       self.__limit + 1 / self.__limit)
+            elif outcome in (BUSY, TIMEOUT) and not sent_before_cut:
+                new_limit = max(self.min_limit,
+                                self.__limit * self.backoff_ratio)
+                if int(new_limit) < int(self.__limit):
+                    logger.debug("Concurrency limit reduced to %d on %s",
+                                 int(new_limit), outcome)
+                self.__limit = new_limit
+                self.__recovery = self.__in_flight
+            self.__cv.notify_all()
+
+
+class FlowControl(object):
+    """
+    Rate and concurrency limits applied to the requests sent to one
+    listener endpoint.
+    """
+
+    def __init__(self, rate=None, burst=None, initial_limit=8, min_limit=1,
+                 max_limit=256, backoff_ratio=0.5, max_wait_secs=60):
+        """
+        Parameters:
+        rate          Optional maximum average number of requests per
+                      second. No rate limit is applied if None.
+        burst         Number of requests allowed in a burst above rate
+        initial_limit Initial number of concurrent requests
+        min_limit     Lower bound of the concurrency limit
+        max_limit     Upper bound of the concurrency limit
+        backoff_ratio Factor applied to the concurrency limit on BUSY
+                      responses and timeouts
+        max_wait_secs Longest time a request waits for a slot before
+                      FlowControlTimeout is raised
+        """
+        self.rate_limiter = TokenBucket(rate, burst) \
+            if rate is not None else None
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+            initial_limit, min_limit, max_limit, backoff_ratio)
+        self.max_wait_secs = max_wait_secs
+
+    def acquire(self):
+        """
+        Wait until a request may be sent.
+        Raises FlowControlTimeout if it takes longer than max_wait_secs.
+        """
+        deadline = time.monotonic() + self.max_wait_secs
+        if self.rate_limiter is not None and \
+                not self.rate_limiter.acquire(self.max_wait_secs):
+            raise FlowControlTimeout("Timed out waiting for rate limit")
+        remaining = max(0, deadline - time.monotonic())
+        if not self.concurrency_limiter.acquire(remaining):
+            raise FlowControlTimeout("Timed out waiting for concurrency slot")
+
+    def release(self, outcome):
+        """Report the outcome of a request sent after acquire()."""
+        self.concurrency_limiter.release(outcome)
+
+
+_flow_controls = {}
+_flow_controls_lock = threading.Lock()
+
+_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "avalon_flow_control_in_flight",
+    "Concurrency slots in use, by listener URL", ("url",))
+_LIMIT = metrics.REGISTRY.gauge(
+    "avalon_flow_control_limit",
+    "Adaptive concurrency limit, by listener URL", ("url",))
+
+
+def get_flow_control(url, settings=None):
+    """
+    Return the FlowControl shared by all clients of a listener endpoint.
+
+    Parameters:
+    url       Listener URL
+    settings  Optional dictionary of FlowControl keyword arguments used
+              if no flow control exists yet for url
+
+    Returns:
+    FlowControl instance or None if flow control is not configured
+    for url.
+    """
+    with _flow_controls_lock:
+        flow_control = _flow_controls.get(url)
+        if flow_control is None and settings is not None:
+            flow_control = FlowControl(**settings)
+            _flow_controls[url] = flow_control
+            limiter = flow_control.concurrency_limiter
+            _IN_FLIGHT.labels(url).set_function(lambda: limiter.in_flight)
+            _LIMIT.labels(url).set_function(lambda: limiter.limit)
+        return flow_control
+
+
+def remove_flow_control(url):
+    """Drop the flow control of a listener endpoint."""
+    with _flow_controls_lock:
+        _flow_controls.pop(url, None)
+        _IN_FLIGHT.remove(url)
+        _LIMIT.remove(url)
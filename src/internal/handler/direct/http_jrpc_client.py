@@ -13,13 +13,55 @@
 # limitations under the License.
 
 import json
+import re
+import socket
 import time
-import urllib.request
-import urllib.error
+
+from enums.error_code import WorkOrderStatus
+import handler.flow_control as flow_control
+import handler.jrpc_recording as jrpc_recording
+import handler.metrics as metrics
+import utility.logging_utils as logging_utils
+import utility.tracing as tracing
 
 import logging
 logger = logging.getLogger(__name__)
 
+_METHOD_PATTERN = re.compile(r'"method"\s*:\s*"([^"]{1,64})"')
+
+_REQUESTS = metrics.REGISTRY.counter(
+    "avalon_jrpc_requests_total",
+    "JSON RPC requests sent, by method and result: success, error "
+    "(JSON RPC error response) or exception (no valid response)",
+    ("method", "result"))
+_ERRORS = metrics.REGISTRY.counter(
+    "avalon_jrpc_error_responses_total",
+    "JSON RPC error responses, by method and error code",
+    ("method", "code"))
+_DURATION = metrics.REGISTRY.histogram(
+    "avalon_jrpc_request_duration_seconds",
+    "JSON RPC request latency including flow control and retries",
+    ("method",))
+_REQUEST_BYTES = metrics.REGISTRY.histogram(
+    "avalon_jrpc_request_bytes", "JSON RPC request body size",
+    ("method",), metrics.SIZE_BUCKETS)
+_RESPONSE_BYTES = metrics.REGISTRY.histogram(
+    "avalon_jrpc_response_bytes", "JSON RPC response body size",
+    ("method",), metrics.SIZE_BUCKETS)
+_RETRIES = metrics.REGISTRY.counter(
+    "avalon_jrpc_retries_total",
+    "JSON RPC requests sent again after a connection error",
+    ("method",))
+_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "avalon_jrpc_requests_in_flight",
+    "JSON RPC requests waiting for a response").labels()
+
+
+def _request_method(request):
+    """Return the method of a JSON RPC request string."""
+    match = _METHOD_PATTERN.search(request)
+    return match.group(1) if match else "unknown"
+
 
 class MessageException(Exception):
     """
@@ -34,9 +76,34 @@ class HttpJrpcClient(object):
     Class to handle HTTP JSON RPC communication by the client.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, flow_control_settings=None):
+        """
+        Parameters:
+            @param url - URL of the listener, http://host:port/ or
+                unix:///path/to/socket for a listener serving HTTP on
+                a Unix domain socket on the same host
+            @param flow_control_settings - Optional dictionary of
+                flow_control.FlowControl arguments. The rate and
+                concurrency limits are shared by all clients of the
+                same url; the settings of the first client win.
+        """
+        # urllib.request is slow to import and only needed once a
+        # client is created
+        import urllib.request
+
         self.ServiceURL = url
         self.ProxyHandler = urllib.request.ProxyHandler({})
+        # Handlers of the request opener and URL the requests are sent to
+        self.Handlers = (self.ProxyHandler,)
+        self.RequestURL = url
+        if url.startswith('unix://'):
+            import handler.unix_http as unix_http
+
+            self.Handlers += (unix_http.UnixSocketHTTPHandler(
+                unix_http.socket_path(url)),)
+            self.RequestURL = unix_http.REQUEST_URL
+        self.FlowControl = flow_control.get_flow_control(
+            url, flow_control_settings)
 
     def _postmsg(self, request, retries=0):
         """
@@ -46,45 +113,136 @@ class HttpJrpcClient(object):
             @param request - JSON string request to post
             @param retries - Number of attempts to submit request
         """
-
         data = request.encode('utf8')
         datalen = len(data)
 
         url = self.ServiceURL
 
-        logger.debug('post request to %s with DATALEN=%d, DATA=<%s>',
-                     url, datalen, data)
+        method = _request_method(request)
+        logger.debug('post %s request to %s with DATALEN=%d',
+                     method, url, datalen)
+        _REQUEST_BYTES.labels(method).observe(datalen)
+        _IN_FLIGHT.inc()
+        start = time.perf_counter()
+        recorder = jrpc_recording.get_recorder()
+        if recorder is not None:
+            start_time = time.time()
+        result = 'exception'
+        try:
+            with tracing.span(method, {'rpc.system': 'jsonrpc',
+                                       'rpc.method': method,
+                                       'http.url': url,
+                                       'http.request_content_length':
+                                       datalen}) as span:
+                value = self.__post(self.RequestURL, data, datalen,
+                                    retries, method)
+                if isinstance(value, dict) and 'error' in value:
+                    result = 'error'
+                    code = value['error'].get('code')
+                    _ERRORS.labels(method, str(code)).inc()
+                    span.set_attribute('rpc.jsonrpc.error_code', str(code))
+                elif value is not None:
+                    result = 'success'
+        except Exception as err:
+            if recorder is not None:
+                self.__record(recorder, url, method, request, start_time,
+                              time.perf_counter() - start, error=err)
+            raise
+        finally:
+            _IN_FLIGHT.dec()
+            _DURATION.labels(method).observe(time.perf_counter() - start)
+            _REQUESTS.labels(method, result).inc()
+        if recorder is not None:
+            self.__record(recorder, url, method, request, start_time,
+                          time.perf_counter() - start, response=value)
+        return value
+
+    @staticmethod
+    def __record(recorder, *args, **kwargs):
+        """
+        Record a request with a jrpc_recording recorder. Recording
+        failures, e.g. a full disk, are logged and do not affect the
+        request.
+        """
+        try:
+            recorder.record(*args, **kwargs)
+        except Exception:
+            logger.exception('recording %s request failed', args[1])
+
+    def __post(self, url, data, datalen, retries, method):
+        """
+        Send encoded request data under flow control, if configured.
+        """
+        if self.FlowControl is None:
+            return self._send(url, data, datalen, retries, method)
 
         try:
-            request = urllib.request.Request(
-                url, data,
-                {'Content-Type': 'application/json',
-                 'Content-Length': datalen})
-            opener = urllib.request.build_opener(self.ProxyHandler)
+            self.FlowControl.acquire()
+        except flow_control.FlowControlTimeout as err:
+            logger.warning('request not sent: %s', err)
+            raise MessageException('request not sent: {0}'.format(err))
+        outcome = flow_control.ERROR
+        try:
+            value = self._send(url, data, datalen, retries, method)
+            if isinstance(value, dict) and \
+                    value.get('error', {}).get('code') == \
+                    WorkOrderStatus.BUSY:
+                outcome = flow_control.BUSY
+            else:
+                outcome = flow_control.SUCCESS
+            return value
+        except MessageException as err:
+            if isinstance(err.__cause__, socket.timeout) or \
+                    isinstance(getattr(err.__cause__, 'reason', None),
+                               socket.timeout):
+                outcome = flow_control.TIMEOUT
+            raise
+        finally:
+            self.FlowControl.release(outcome)
+
+    def _send(self, url, data, datalen, retries, method='unknown'):
+        """
+        Send encoded request data and return the decoded JSON response.
+        method is the JSON RPC method the metrics are recorded for.
+        """
+        import urllib.request
+        import urllib.error
+
+        headers = {'Content-Type': 'application/json',
+                   'Content-Length': datalen}
+        # Trace context of the request span, if tracing is enabled
+        tracing.inject(headers)
+        try:
+            request = urllib.request.Request(url, data, headers)
+            opener = urllib.request.build_opener(*self.Handlers)
             response = self._open_with_retries(
-                opener, request, retries)
+                opener, request, retries, method)
 
         except urllib.error.HTTPError as err:
             logger.warn('operation failed with response: %s', err.code)
             raise MessageException(
-                'operation failed with response: {0}'.format(err.code))
+                'operation failed with response: {0}'.format(err.code)) \
+                from err
 
         except urllib.error.URLError as err:
             logger.warn('operation failed: %s', err.reason)
-            raise MessageException('operation failed: {0}'.format(err.reason))
+            raise MessageException(
+                'operation failed: {0}'.format(err.reason)) from err
 
         except Exception as err:
             logger.exception('no response from server: %s', str(err))
-            raise MessageException('no response from server: {0}'.format(err))
+            raise MessageException(
+                'no response from server: {0}'.format(err)) from err
 
         content = response.read()
         headers = response.info()
         response.close()
+        _RESPONSE_BYTES.labels(method).observe(len(content))
 
         encoding = headers.get('Content-Type')
         if encoding != 'application/json':
             logger.info('server responds with message %s of type %s',
-                        content, encoding)
+                        logging_utils.capped(content), encoding)
             return None
 
         # Attempt to decode the content if it is not already a string
@@ -95,7 +253,8 @@ class HttpJrpcClient(object):
         value = json.loads(content)
         return value
 
-    def _open_with_retries(self, opener, request, retries):
+    def _open_with_retries(self, opener, request, retries,
+                           method='unknown'):
         """
         Function to retry opening a given url/request if URLError is
         encountered. URLError for request would encompass HTTPError
@@ -105,9 +264,12 @@ class HttpJrpcClient(object):
             @param opener - An instance of OpenerDiretor
             @param request - Request to be sent to the url
             @param retries - Number of attempts to open
+            @param method - JSON RPC method, to count the retries
         Returns:
             @returns response - Response received
         """
+        import urllib.error
+
         count = 0
         while count < retries:
             try:
@@ -119,6 +281,7 @@ class HttpJrpcClient(object):
                 raise err
             # Increment counter for each handled Exception
             count += 1
+            _RETRIES.labels(method).inc()
             if count < retries:
                 logger.info("Will retry to connect.")
         # Make a final call after retries are exhausted
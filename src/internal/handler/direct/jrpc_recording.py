@@ -0,0 +1,172 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Recording of the JSON RPC traffic of HttpJrpcClient.
+
+While a recorder is set, every request sent by an HttpJrpcClient is
+appended to the recording file together with its response and timing:
+
+    recording.set_recorder(recording.JrpcRecorder("traffic.jsonl.gz"))
+
+A recording is a JSON lines file, gzip compressed if its name ends with
+.gz, with one compact JSON object per request:
+
+    time      Time the request was sent, in seconds since the epoch
+    duration  Seconds until the response was received
+    url       URL of the listener
+    method    JSON RPC method
+    request   JSON RPC request
+    response  JSON RPC response, null if it was not JSON
+    error     Instead of response, the error the request failed with
+    status    With error, the HTTP status of the response, if any
+
+Files are only appended to, so recordings of several runs can be
+collected in one file. avalon_sdk_direct.jrpc_replay replays them.
+Requests and responses are recorded in full, including the encrypted
+work order data and keys they hold; keep recordings as confidential as
+the traffic itself.
+"""
+
+import gzip
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_recorder = None
+
+
+def set_recorder(recorder):
+    """
+    Set the recorder HttpJrpcClient records its requests with, None to
+    stop recording. The previous recorder is not closed.
+    """
+    global _recorder
+    _recorder = recorder
+
+
+def get_recorder():
+    """Return the recorder set with set_recorder() or None."""
+    return _recorder
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class JrpcRecorder(object):
+    """
+    Appends JSON RPC requests and responses to a recording file.
+    Thread safe.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+        path  Recording file, created if needed. Records written to a
+              plain file are flushed one by one; gzip compressed files
+              are written in blocks and complete only once the
+              recorder is closed.
+        """
+        self.path = path
+        self.records = 0
+        self.__file = _open(path, "a")
+        self.__flush = not path.endswith(".gz")
+        self.__lock = threading.Lock()
+
+    def record(self, url, method, request, start_time, duration_secs,
+               response=None, error=None):
+        """
+        Append a request to the recording.
+
+        Parameters:
+        url           URL of the listener
+        method        JSON RPC method
+        request       JSON RPC request string
+        start_time    time.time() the request was sent at
+        duration_secs Seconds until the response was received
+        response      Decoded JSON RPC response
+        error         Exception the request failed with instead
+        """
+        try:
+            request = json.loads(request)
+        except ValueError:
+            pass
+        entry = {"time": round(start_time, 6),
+                 "duration": round(duration_secs, 6),
+                 "url": url,
+                 "method": method,
+                 "request": request}
+        if error is None:
+            entry["response"] = response
+        else:
+            entry["error"] = str(error)
+            # HTTPError causes of MessageException carry the status
+            status = getattr(error.__cause__, "code", None)
+            if isinstance(status, int):
+                entry["status"] = status
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.__lock:
+            if self.__file is None:
+                return
+            self.__file.write(line)
+            if self.__flush:
+                self.__file.flush()
+            self.records += 1
+
+    def close(self):
+        """Write out the buffered records and close the file."""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_recording(path):
+    """
+    Yield the records of a recording file as dictionaries, in the order
+    they were written. A last line or gzip block cut short, e.g. by a
+    crash of the recording process, is skipped.
+    """
+    with _open(path, "r") as f:
+        pending = None
+        try:
+            for number, line in enumerate(f, 1):
+                if pending is not None:
+                    raise ValueError("{}:{}: invalid record".format(
+                        path, pending))
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    pending = number
+                    continue
+                yield record
+        except EOFError:
+            logger.warning("%s: compressed data cut short", path)
+        if pending is not None:
+            logger.warning("%s:%d: incomplete record skipped", path,
+                           pending)
@@ -0,0 +1,337 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process metrics of the SDK: counters, gauges and histograms exported
+in the Prometheus text exposition format.
+
+The SDK records its metrics in the default REGISTRY: HttpJrpcClient
+the requests, latency, request and response sizes, errors and retries
+per JSON RPC method, and JRPCWorkOrderImpl the PENDING polls per work
+order. Recording takes a dictionary lookup and a short lock per update,
+so metrics are always on. Expose them to a Prometheus server with
+
+    metrics.start_http_server(9100)
+
+or get the text with REGISTRY.exposition().
+"""
+
+import bisect
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets of latencies in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+# Default histogram buckets of message sizes in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+                16777216)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(label_value):
+    return str(label_value).replace("\\", "\\\\").replace(
+        "\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = ['{}="{}"'.format(name, _escape(value))
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild(object):
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock):
+        self.value = 0
+        self._lock = lock
+
+    def inc(self, amount=1):
+        """Increase the counter by a non-negative amount."""
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(object):
+    __slots__ = ("value", "function", "_lock")
+
+    def __init__(self, lock):
+        self.value = 0
+        self.function = None
+        self._lock = lock
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """
+        Report the return value of function, called on export, instead
+        of the set value.
+        """
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+
+class _HistogramChild(object):
+    __slots__ = ("upper_bounds", "counts", "count", "sum", "_lock")
+
+    def __init__(self, lock, upper_bounds):
+        self.upper_bounds = upper_bounds
+        # Count per bucket, the last one being +Inf
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self._lock = lock
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+
+class _Metric(object):
+    """Metric family with one child per combination of label values."""
+
+    type = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self.__children = {}
+
+    def labels(self, *label_values):
+        """
+        Return the child metric of the given label values, in the order
+        of label_names, creating it on first use. Children are recorded
+        to with inc(), dec(), set() or observe(); metrics without labels
+        have a single child returned by labels().
+        """
+        child = self.__children.get(label_values)
+        if child is None:
+            if len(label_values) != len(self.label_names):
+                raise ValueError("Expected label values for {}".format(
+                    ", ".join(self.label_names)))
+            with self._lock:
+                child = self.__children.setdefault(
+                    label_values, self._new_child())
+        return child
+
+    def remove(self, *label_values):
+        """Drop the child metric of the given label values."""
+        with self._lock:
+            self.__children.pop(label_values, None)
+
+    def children(self):
+        """Return a list of (label values, child metric)."""
+        with self._lock:
+            return list(self.__children.items())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, label_values, child):
+        """Return a list of (name suffix, extra label, value)."""
+        raise NotImplementedError
+
+    def exposition(self):
+        """Return the metric family in Prometheus text format."""
+        lines = ["# HELP {} {}".format(
+                     self.name, self.documentation.replace("\\", "\\\\")
+                     .replace("\n", "\\n")),
+                 "# TYPE {} {}".format(self.name, self.type)]
+        for label_values, child in self.children():
+            for suffix, extra, value in self._samples(label_values, child):
+                lines.append("{}{}{} {}".format(
+                    self.name, suffix,
+                    _format_labels(self.label_names, label_values, extra),
+                    _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. of requests."""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def _samples(self, label_values, child):
+        return [("", "", child.value)]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. of requests in flight."""
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self._lock)
+
+    def _samples(self, label_values, child):
+        try:
+            return [("", "", child.get())]
+        except Exception as err:
+            logger.warning("Gauge %s not exported: %s", self.name, err)
+            return []
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(),
+                 buckets=LATENCY_BUCKETS):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_names)
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.upper_bounds)
+
+    def _samples(self, label_values, child):
+        with self._lock:
+            counts = list(child.counts)
+            count, total = child.count, child.sum
+        samples = []
+        cumulative = 0
+        for upper_bound, bucket_count in zip(
+                self.upper_bounds + (math.inf,), counts):
+            cumulative += bucket_count
+            samples.append(("_bucket",
+                            'le="{}"'.format(_format_value(upper_bound)),
+                            cumulative))
+        samples.append(("_sum", "", total))
+        samples.append(("_count", "", count))
+        return samples
+
+
+class MetricsRegistry(object):
+    """Named metric families, exported together."""
+
+    def __init__(self):
+        self.__metrics = {}
+        self.__lock = threading.Lock()
+
+    def __register(self, metric_class, name, *args, **kwargs):
+        with self.__lock:
+            metric = self.__metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, *args, **kwargs)
+                self.__metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError("Metric {} already registered as {}".format(
+                    name, metric.type))
+            return metric
+
+    def counter(self, name, documentation, label_names=()):
+        """Return the counter of the given name, creating it if needed."""
+        return self.__register(Counter, name, documentation, label_names)
+
+    def gauge(self, name, documentation, label_names=()):
+        """Return the gauge of the given name, creating it if needed."""
+        return self.__register(Gauge, name, documentation, label_names)
+
+    def histogram(self, name, documentation, label_names=(),
+                  buckets=LATENCY_BUCKETS):
+        """
+        Return the histogram of the given name, creating it with the
+        given bucket upper bounds if needed.
+        """
+        return self.__register(Histogram, name, documentation, label_names,
+                               buckets)
+
+    def get(self, name):
+        """Return the metric of the given name or None."""
+        return self.__metrics.get(name)
+
+    def exposition(self):
+        """Return all metrics in Prometheus text format."""
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        return "".join(metric.exposition() for metric in metrics)
+
+
+# Registry of the SDK metrics
+REGISTRY = MetricsRegistry()
+
+
+def start_http_server(port, host="localhost", registry=REGISTRY):
+    """
+    Serve the metrics of a registry in Prometheus text format to GET
+    requests from a background thread.
+
+    Parameters:
+    port      Port to listen on, 0 for a free port
+    host      Host name or address to listen on
+    registry  MetricsRegistry to export
+
+    Returns:
+    The http.server.ThreadingHTTPServer. Its server_address holds the
+    port listened on; call shutdown() and server_close() to stop it.
+    """
+    # http.server is only needed when metrics are served
+    import http.server
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.exposition().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info("Serving metrics on %s:%d", *server.server_address[:2])
+    return server
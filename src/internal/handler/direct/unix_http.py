@@ -0,0 +1,85 @@
+# Copyright 2020 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+HTTP over Unix domain sockets for urllib, used by HttpJrpcClient for
+unix:// listener URIs.
+
+A unix:// URI names the socket file of the listener, e.g.
+unix:///var/run/avalon/listener.sock. Requests are sent to the HTTP
+path / of that socket. Since UnixSocketHTTPHandler takes the place of
+urllib's HTTPHandler, requests go through the same urllib machinery as
+over TCP: the same headers, HTTPError and URLError exceptions, timeouts
+and connection handling.
+"""
+
+import http.client
+import socket
+import urllib.parse
+import urllib.request
+
+SCHEME = "unix://"
+
+# URL urllib is given for requests over a Unix domain socket
+REQUEST_URL = "http://localhost/"
+
+
+def socket_path(uri):
+    """
+    Return the socket file path of a unix:// URI. Percent-encoded
+    characters are decoded.
+    """
+    if not uri.startswith(SCHEME):
+        raise ValueError("Not a unix:// URI: {}".format(uri))
+    path = urllib.parse.unquote(uri[len(SCHEME):])
+    if not path:
+        raise ValueError("No socket path in {}".format(uri))
+    return path
+
+
+class UnixSocketHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection connected to a Unix domain socket."""
+
+    def __init__(self, path, host="localhost",
+                 timeout=socket._GLOBAL_DEFAULT_TIMEOUT, **kwargs):
+        super().__init__(host, timeout=timeout, **kwargs)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            if self.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class UnixSocketHTTPHandler(urllib.request.HTTPHandler):
+    """
+    urllib handler sending http:// requests to a Unix domain socket
+    instead of the host of the URL.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.socket_path = path
+
+    def _connection(self, host, **kwargs):
+        return UnixSocketHTTPConnection(self.socket_path, host, **kwargs)
+
+    def http_open(self, req):
+        return self.do_open(self._connection, req)
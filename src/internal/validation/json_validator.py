@@ -13,11 +13,14 @@
 # limitations under the License.
 
 
+import os
 import json
-import pkg_resources
-from jsonschema import validate, ValidationError, SchemaError
+import functools
 from exceptions.invalid_parameter import InvalidParamException
 
+# jsonschema and importlib.resources are imported on first use to keep
+# the import of the SDK modules cheap for short-lived processes.
+
 
 class JsonValidator(object):
     """
@@ -40,14 +43,14 @@ class JsonValidator(object):
             message = "Empty Parameters"
             raise InvalidParamException(message, id)
 
+        from jsonschema import ValidationError, SchemaError
+        from jsonschema.exceptions import best_match
         try:
-            schema = {}
-            file_name = "data/" + method + ".json"
-
-            data_file = pkg_resources.resource_string(__name__, file_name)
-            schema = json.loads(data_file)
+            validator = JsonValidator.load_validator(method)
 
-            validate(params, schema)
+            error = best_match(validator.iter_errors(params))
+            if error is not None:
+                raise error
         except ValidationError as e:
             if e.validator == 'additionalProperties' or \
                     e.validator == 'required':
@@ -59,3 +62,93 @@ class JsonValidator(object):
         except FileNotFoundError as err:
             raise InvalidParamException("API method not supported", id)
 
+    def json_field_validation(id, method, params):
+        """
+        Validate only the fields present in params dictionary against
+        their definitions in the schema of the method. Required fields
+        missing from params are not reported, which allows validating
+        a subset of the request parameters.
+
+        Parameters:
+        id        JSON RPC request ID
+        method    Name of the schema to validate against
+        params    Parameter dictionary to validate
+
+        Raises InvalidParamException on failure.
+        """
+        from jsonschema import ValidationError, SchemaError
+        from jsonschema.exceptions import best_match
+        try:
+            schema = JsonValidator.load_schema(method)
+            properties = schema.get("properties", {})
+            for name, value in params.items():
+                if name not in properties:
+                    if schema.get("additionalProperties", True) is False:
+                        raise InvalidParamException(
+                            "Additional properties are not allowed " +
+                            "('{}' was unexpected)".format(name), id)
+                    continue
+                validator = JsonValidator.load_validator(method, name)
+                error = best_match(validator.iter_errors(value))
+                if error is not None:
+                    raise error
+        except ValidationError as e:
+            raise InvalidParamException(
+                e.schema.get("error_msg", e.message), id)
+        except SchemaError as err:
+            raise InvalidParamException(err.message, id)
+        except FileNotFoundError:
+            raise InvalidParamException("API method not supported", id)
+
+    @functools.lru_cache(maxsize=None)
+    def load_schema(method):
+        """
+        Load the JSON schema of a method. Schemas are read from
+        the package data once and cached afterwards.
+
+        Parameters:
+        method    Name of the schema file without extension
+
+        Returns:
+        Schema as a dictionary. The cached dictionary is shared,
+        callers must not modify it.
+        """
+        file_name = method + ".json"
+        try:
+            from importlib.resources import files
+        except ImportError:
+            # importlib.resources.files() is only available from Python 3.9
+            files = None
+        if files is not None:
+            data_file = files(__package__).joinpath(
+                "data").joinpath(file_name).read_bytes()
+        else:
+            with open(os.path.join(os.path.dirname(__file__),
+                                   "data", file_name), "rb") as f:
+                data_file = f.read()
+        return json.loads(data_file)
+
+    @functools.lru_cache(maxsize=None)
+    def load_validator(method, field=None):
+        """
+        Return a validator for the schema of a method, or for the
+        definition of a single field of that schema. The schema is
+        checked once when the validator is created and the validator
+        is cached afterwards.
+
+        Parameters:
+        method    Name of the schema file without extension
+        field     Optional name of a property of the schema
+
+        Returns:
+        jsonschema validator instance.
+        Raises SchemaError if the schema is invalid.
+        """
+        from jsonschema.validators import validator_for
+
+        schema = JsonValidator.load_schema(method)
+        if field is not None:
+            schema = schema["properties"][field]
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        return validator_class(schema)
@@ -32,16 +32,30 @@ setup(name='avalon_sdk_direct',
                      'interfaces' : 'common/interfaces',
                      'exceptions' : 'internal/exceptions',
                      'validation' : 'internal/validation',
+                     'avalon_crypto_utils' :
+                         'common/crypto_utils/avalon_crypto_utils',
+                     'utility' : 'common/utility',
+                     'work_order' : 'common/work_order',
                      'avalon_sdk_direct' : 'avalon_sdk_direct'},      
       packages=['enums',
                 'handler', 
                 'interfaces',
                 'exceptions',
                 'validation',
+                'avalon_crypto_utils',
+                'utility',
+                'work_order',
                 'avalon_sdk_direct'
                ],
 
       package_data={'validation': ['data/*.json']},
       include_package_data=True,
-      install_requires=['jsonschema'],
-      entry_points={})
+      install_requires=['jsonschema', 'pycryptodomex', 'ecdsa'],
+      entry_points={
+          'console_scripts': [
+              'avalon-load-generator = '
+              'avalon_sdk_direct.load_generator:main',
+              'avalon-mock-listener = avalon_sdk_direct.mock_listener:main',
+              'avalon-jrpc-replay = avalon_sdk_direct.jrpc_replay:main',
+          ]
+      })